@@ -2,15 +2,26 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime, date
-from typing import Annotated, List
+from typing import Annotated, AsyncIterator, List, Literal, Optional
 
 import asyncpg
-from fastapi import APIRouter, Depends, Query
-from pydantic import BaseModel, ConfigDict
+import orjson
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 
-from app.db.pool import get_conn
-from app.services.capacity_service import CapacityService
+from app.api.limits import concurrency_limit
+from app.db.pool import get_read_conn
+from app.repositories.capacity_repository import Corridor, DEFAULT_CORRIDOR, REGION_PATTERN
+from app.services.capacity_export import EXPORT_FORMATS, accepted_media_types, negotiate_export_format
+from app.services.capacity_service import (
+    BATCH_CACHE_POLICY,
+    CAPACITY_CACHE_POLICY,
+    CapacityService,
+    get_capacity_service,
+)
 from app.exceptions import (
+    CapacityServiceException,
     CapacityValidationException,
     CapacityDatabaseException,
     CapacityUnexpectedException,
@@ -19,6 +30,15 @@ from app.exceptions import (
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Capacity"])
 
+# Upper bound of items in one batch request (keeps a single request's work bounded)
+MAX_BATCH_ITEMS = 100
+
+# Media type of streamed responses: one JSON object per line
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Accept ranges that select the (buffered) JSON body of /capacity
+_JSON_MEDIA_RANGES = ("application/json", "application/*", "*/*")
+
 
 # ------------------------------------------------------------
 # Response Model
@@ -40,24 +60,108 @@ class CapacityRow(BaseModel):
     offered_capacity_teu_4w_rolling_avg: int
 
 
+# ------------------------------------------------------------
+# Batch Request / Response Models
+# ------------------------------------------------------------
+class CapacityBatchItem(BaseModel):
+    """One corridor and date range of a batch request (corridor defaults as in `GET /capacity`)."""
+    origin: str = Field(DEFAULT_CORRIDOR.origin, pattern=REGION_PATTERN, description="Corridor origin region")
+    destination: str = Field(
+        DEFAULT_CORRIDOR.destination, pattern=REGION_PATTERN, description="Corridor destination region"
+    )
+    date_from: date
+    date_to: date
+
+
+class CapacityBatchRequest(BaseModel):
+    """List of corridor/date range queries answered together."""
+    items: List[CapacityBatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class CapacityBatchResult(BaseModel):
+    """Weekly capacity rows of one batch item, echoing the item it answers."""
+    origin: str
+    destination: str
+    date_from: date
+    date_to: date
+    rows: List[CapacityRow]
+
+
+def _json_response(body: bytes) -> Response:
+    """Return a pre-serialized JSON body as is.
+
+    FastAPI skips `response_model` validation for `Response` objects; the models
+    above still define the documented (OpenAPI) schema, which the body matches.
+    """
+    return Response(content=body, media_type="application/json")
+
+
+async def _ndjson_response(chunks: AsyncIterator[bytes]) -> StreamingResponse:
+    """Stream NDJSON chunks, reading the first one up front.
+
+    Errors raised before any row is read (validation, query failure) thus still get a
+    regular error response; a failure once the stream has started truncates the body.
+    """
+    first = await anext(chunks, b"")
+
+    async def body() -> AsyncIterator[bytes]:
+        if first:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def _prefers_ndjson(accept: Optional[str]) -> bool:
+    """Whether `accept` ranks NDJSON above JSON (by quality, then order; JSON when neither is listed)."""
+    for media_type in accepted_media_types(accept):
+        if media_type == NDJSON_MEDIA_TYPE:
+            return True
+        if media_type in _JSON_MEDIA_RANGES:
+            return False
+    return False
+
+
 # ------------------------------------------------------------
 # Capacity Endpoint
 # ------------------------------------------------------------
-@router.get("/capacity", response_model=List[CapacityRow])
+@router.get(
+    "/capacity",
+    response_model=List[CapacityRow],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {"schema": {"$ref": "#/components/schemas/CapacityRow"}}}}},
+    dependencies=[Depends(concurrency_limit("capacity"))],
+)
 async def get_capacity(
-    date_from: Annotated[str, Query(..., regex=r"^\d{4}-\d{2}-\d{2}$")],
-    date_to: Annotated[str, Query(..., regex=r"^\d{4}-\d{2}-\d{2}$")],
-    conn: Annotated[asyncpg.Connection, Depends(get_conn)],
+    date_from: Annotated[str, Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$")],
+    date_to: Annotated[str, Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$")],
+    conn: Annotated[asyncpg.Connection, Depends(get_read_conn)],
+    capacity_service: Annotated[CapacityService, Depends(get_capacity_service)],
+    origin: Annotated[
+        str, Query(pattern=REGION_PATTERN, description="Corridor origin region")
+    ] = DEFAULT_CORRIDOR.origin,
+    destination: Annotated[
+        str, Query(pattern=REGION_PATTERN, description="Corridor destination region")
+    ] = DEFAULT_CORRIDOR.destination,
+    stream: Annotated[
+        bool, Query(description="Stream the rows as NDJSON (same as `Accept: application/x-ndjson`)")
+    ] = False,
+    accept: Annotated[Optional[str], Header()] = None,
 ):
     """
-    Returns weekly offered capacity and 4-week rolling averages for a given date range.
+    Returns weekly offered capacity and 4-week rolling averages of a corridor for a given date range.
 
     Workflow:
-    1. Validate and parse query parameters as ISO dates.
+    1. Validate and parse query parameters as ISO dates (corridor defaults to China Main → North Europe Main).
     2. Check for logical errors (start date > end date).
-    3. Delegate to `CapacityService` for business logic including caching and DB queries.
+    3. Delegate to the application-scoped `CapacityService` for caching and DB queries.
     4. Catch and translate database or unexpected errors into standardized API exceptions.
-    5. Serialize and return response using `CapacityRow` Pydantic model for consistency.
+    5. Return the JSON body pre-serialized by the service (shaped as a list of `CapacityRow`).
+
+    With `stream=true` or an `Accept` header ranking `application/x-ndjson` above
+    `application/json` (q-values, then order), rows are instead streamed as NDJSON
+    (one `CapacityRow` per line) from a database cursor as they are read, uncached, so that
+    memory stays flat however long the range.
     """
 
     # Parse query parameters into date objects
@@ -70,12 +174,17 @@ async def get_capacity(
     if start > end:
         raise CapacityValidationException("'date_from' must be <= 'date_to'")
 
-    # Initialize service layer
-    capacity_service = CapacityService()
-
     # Fetch capacity data with error handling
     try:
-        rows = await capacity_service.get_capacity_rolling_average(conn, start, end)
+        if stream or _prefers_ndjson(accept):
+            return await _ndjson_response(
+                capacity_service.stream_capacity_ndjson(conn, start, end, Corridor(origin, destination))
+            )
+        body = await capacity_service.get_capacity_json(
+            conn, start, end, Corridor(origin, destination), policy=CAPACITY_CACHE_POLICY
+        )
+    except CapacityServiceException:
+        raise
     except asyncpg.PostgresError as exc:
         # Known database-related errors
         raise CapacityDatabaseException("Database operation failed") from exc
@@ -83,17 +192,122 @@ async def get_capacity(
         # Unknown/unexpected errors
         raise CapacityUnexpectedException("Unhandled server error") from exc
 
-    # Serialize response consistently using Pydantic model
-    return [
-        CapacityRow(
-            week_start_date=(
-                r["week_start_date"].isoformat()
-                if isinstance(r["week_start_date"], date)
-                else str(r["week_start_date"])
-            ),
-            week_no=int(r["week_no"]),
-            offered_capacity_teu=int(r["offered_capacity_teu"]),
-            offered_capacity_teu_4w_rolling_avg=int(r["offered_capacity_teu_4w_rolling_avg"]),
+    return _json_response(body)
+
+
+# ------------------------------------------------------------
+# Columnar Export Endpoint
+# ------------------------------------------------------------
+@router.get(
+    "/capacity/export",
+    response_class=Response,
+    responses={
+        200: {
+            "description": "Weekly capacity rows as columns, in the negotiated format",
+            "content": {fmt.media_type: {} for fmt in EXPORT_FORMATS.values()},
+        },
+        406: {"description": "None of the accepted media types is available"},
+    },
+    dependencies=[Depends(concurrency_limit("capacity_export"))],
+)
+async def export_capacity(
+    date_from: Annotated[date, Query(description="Start date (YYYY-MM-DD)")],
+    date_to: Annotated[date, Query(description="End date (YYYY-MM-DD)")],
+    conn: Annotated[asyncpg.Connection, Depends(get_read_conn)],
+    capacity_service: Annotated[CapacityService, Depends(get_capacity_service)],
+    origin: Annotated[
+        str, Query(pattern=REGION_PATTERN, description="Corridor origin region")
+    ] = DEFAULT_CORRIDOR.origin,
+    destination: Annotated[
+        str, Query(pattern=REGION_PATTERN, description="Corridor destination region")
+    ] = DEFAULT_CORRIDOR.destination,
+    format_: Annotated[
+        Optional[Literal["arrow", "parquet", "csv"]],
+        Query(alias="format", description="Export format, overriding the Accept header"),
+    ] = None,
+    accept: Annotated[Optional[str], Header()] = None,
+):
+    """
+    Returns the rows of `GET /capacity` as a columnar file for analytics tools.
+
+    Workflow:
+    1. Pick the format from `format`, else from the Accept header: Arrow IPC stream
+       (`application/vnd.apache.arrow.stream`), Parquet (`application/vnd.apache.parquet`)
+       or CSV (`text/csv`, also the default); 406 if none is acceptable.
+    2. Delegate to `CapacityService.get_capacity_export`: the same cached weeks (or query)
+       as `GET /capacity`, composed as columns and encoded once, then cached as a blob.
+    3. Return the file as an attachment.
+    """
+    if date_from > date_to:
+        raise CapacityValidationException("'date_from' must be <= 'date_to'")
+    export_format = negotiate_export_format(accept, format_)
+
+    try:
+        body = await capacity_service.get_capacity_export(
+            conn, date_from, date_to, export_format, Corridor(origin, destination), policy=CAPACITY_CACHE_POLICY
+        )
+    except CapacityServiceException:
+        raise
+    except asyncpg.PostgresError as exc:
+        raise CapacityDatabaseException("Database operation failed") from exc
+    except Exception as exc:
+        raise CapacityUnexpectedException("Unhandled server error") from exc
+
+    filename = f"capacity_{origin}_{destination}_{date_from}_{date_to}.{export_format.extension}"
+    return Response(
+        content=body,
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept"},
+    )
+
+
+# ------------------------------------------------------------
+# Batch Capacity Endpoint
+# ------------------------------------------------------------
+@router.post(
+    "/capacity/batch",
+    response_model=List[CapacityBatchResult],
+    dependencies=[Depends(concurrency_limit("capacity_batch"))],
+)
+async def get_capacity_batch(
+    batch: CapacityBatchRequest,
+    conn: Annotated[asyncpg.Connection, Depends(get_read_conn)],
+    capacity_service: Annotated[CapacityService, Depends(get_capacity_service)],
+):
+    """
+    Returns weekly offered capacity for many corridors and date ranges in one call.
+
+    Workflow:
+    1. Validate the body (at most `MAX_BATCH_ITEMS` items, ISO dates, corridor regions).
+    2. Reject any item whose start date is after its end date.
+    3. Delegate to `CapacityService.get_capacity_batch`, which resolves all items with
+       one Redis MGET and one set-based SQL query on a single pooled connection.
+    4. Return one `CapacityBatchResult` per item, in request order (serialized with orjson).
+    """
+    for index, item in enumerate(batch.items):
+        if item.date_from > item.date_to:
+            raise CapacityValidationException(f"items[{index}]: 'date_from' must be <= 'date_to'")
+
+    try:
+        results = await capacity_service.get_capacity_batch(
+            conn,
+            [(Corridor(i.origin, i.destination), i.date_from, i.date_to) for i in batch.items],
+            policy=BATCH_CACHE_POLICY,
         )
-        for r in rows
-    ]
+    except CapacityServiceException:
+        raise
+    except asyncpg.PostgresError as exc:
+        raise CapacityDatabaseException("Database operation failed") from exc
+    except Exception as exc:
+        raise CapacityUnexpectedException("Unhandled server error") from exc
+
+    return _json_response(orjson.dumps([
+        {
+            "origin": item.origin,
+            "destination": item.destination,
+            "date_from": item.date_from,
+            "date_to": item.date_to,
+            "rows": rows,
+        }
+        for item, rows in zip(batch.items, results)
+    ]))
@@ -21,6 +21,7 @@ async def capacity_exception_handler(
     - Logs the error with structured fields for observability.
     - Returns a standardized JSON payload including error type, message, and status code.
     - Ensures consistent API error responses across the service.
+    - Adds a Retry-After header to overload responses (`CapacityUnavailableException`).
     """
     logger.error(
         f"[{exc.__class__.__name__}] {exc.message}",
@@ -30,6 +31,7 @@ async def capacity_exception_handler(
             "status_code": exc.status_code,
         },
     )
+    retry_after = getattr(exc, "retry_after", None)
     return JSONResponse(
         status_code=exc.status_code,
         content={
@@ -37,6 +39,7 @@ async def capacity_exception_handler(
             "message": exc.message,
             "status_code": exc.status_code,
         },
+        headers={"Retry-After": str(retry_after)} if retry_after is not None else None,
     )
 
 
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+
+router = APIRouter(tags=["health"])
+
+
+# ------------------------------------------------------------
+# Health Probe Endpoints
+# ------------------------------------------------------------
+@router.get("/health")
+async def health():
+    """Lightweight health probe for container orchestration systems."""
+    return {"status": "ok"}
+
+
+@router.get("/live")
+async def live():
+    """
+    Liveness probe: the process is up and its event loop answers.
+
+    Independent of Postgres and Redis, so an outage of either never gets the service restarted.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready(request: Request) -> JSONResponse:
+    """
+    Readiness probe, answered from the health monitor's last results without touching any dependency.
+
+    Returns 200 while the service can serve capacity reads, 503 otherwise; the body details the
+    status of each dependency and the age of the check.
+    """
+    monitor = getattr(request.app.state, "health_monitor", None)
+    if monitor is None:
+        return JSONResponse(
+            {"status": "unready", "age_seconds": None, "dependencies": {}},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    report = monitor.report()
+    return JSONResponse(
+        report,
+        status_code=status.HTTP_200_OK if report["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
@@ -0,0 +1,86 @@
+import os
+from typing import AsyncIterator, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core import logging
+from app.core.monitoring import ROUTE_IN_FLIGHT_REQUESTS, ROUTE_SHED_REQUESTS_COUNT
+from app.exceptions import CapacityUnavailableException
+
+logger = logging.get_logger(__name__)
+
+
+# ------------------------------------------------------------
+# Concurrency Limit Configuration
+# ------------------------------------------------------------
+class ConcurrencyLimitConfig(BaseModel):
+    """
+    Per-route caps on concurrent requests, for shedding load before it queues on the database.
+
+    `limits` maps route names (`capacity`, `capacity_batch`, `capacity_export`, `sailings_bulk`)
+    to the number of requests a worker serves at once; routes without a limit are not capped.
+    """
+    limits: dict[str, int] = Field(default_factory=dict, description="Max concurrent requests per route and worker")
+    retry_after: int = Field(1, ge=1, description="Retry-After (seconds) of shed requests")
+
+    @classmethod
+    def from_env(cls) -> "ConcurrencyLimitConfig":
+        """Load configuration from environment variables (all optional).
+
+        ROUTE_CONCURRENCY_LIMITS lists `route=limit` pairs, e.g. "capacity=200,sailings_bulk=2".
+        """
+        limits = {}
+        for pair in os.getenv("ROUTE_CONCURRENCY_LIMITS", "").split(","):
+            if pair.strip():
+                route, _, limit = pair.partition("=")
+                limits[route.strip()] = int(limit)
+        return cls(limits=limits, retry_after=int(os.getenv("ROUTE_RETRY_AFTER_SECONDS", "1")))
+
+
+# ------------------------------------------------------------
+# Concurrency Limiter
+# ------------------------------------------------------------
+class ConcurrencyLimiter:
+    """
+    FastAPI dependency capping the concurrent requests of one route in this worker.
+
+    Responsibilities:
+    - Admit a request while fewer than `limit` are in flight, for its whole duration.
+    - Reject the others at once with a 503 and Retry-After (no queueing: a queued request
+      would hold its client as long as a slow one).
+    - Report in-flight and shed requests per route.
+
+    Declared in the route decorator's `dependencies` so it runs before any connection is acquired.
+    """
+
+    def __init__(self, route: str, limit: Optional[int], retry_after: int = 1):
+        self.route = route
+        self.limit = limit
+        self.retry_after = retry_after
+        self.in_flight = 0
+
+    async def __call__(self) -> AsyncIterator[None]:
+        if self.limit is None:
+            yield
+            return
+        if self.in_flight >= self.limit:
+            ROUTE_SHED_REQUESTS_COUNT.labels(route=self.route).inc()
+            raise CapacityUnavailableException(
+                f"Too many concurrent '{self.route}' requests, retry later", retry_after=self.retry_after
+            )
+        self.in_flight += 1
+        ROUTE_IN_FLIGHT_REQUESTS.labels(route=self.route).inc()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            ROUTE_IN_FLIGHT_REQUESTS.labels(route=self.route).dec()
+
+
+# Limits are read once at import, like the cache policies
+ROUTE_LIMITS = ConcurrencyLimitConfig.from_env()
+
+
+def concurrency_limit(route: str) -> ConcurrencyLimiter:
+    """Return the limiter of `route` as configured by ROUTE_CONCURRENCY_LIMITS."""
+    return ConcurrencyLimiter(route, ROUTE_LIMITS.limits.get(route), ROUTE_LIMITS.retry_after)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+from typing import Annotated, Optional
+
+import asyncpg
+from fastapi import APIRouter, Depends, Query, Request
+
+from app.api.limits import concurrency_limit
+from app.db.pool import get_conn
+from app.services.sailings_ingest import (
+    ErrorPolicy,
+    IngestFormat,
+    IngestReport,
+    SailingsIngestService,
+    get_sailings_ingest_service,
+    gunzip,
+)
+from app.exceptions import (
+    CapacityServiceException,
+    CapacityUnsupportedMediaException,
+    CapacityDatabaseException,
+    CapacityUnexpectedException,
+)
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["Sailings"])
+
+# Content types accepted by the bulk endpoint (overridable with ?format=)
+CONTENT_TYPE_FORMATS = {
+    "text/csv": IngestFormat.CSV,
+    "application/csv": IngestFormat.CSV,
+    "application/x-ndjson": IngestFormat.NDJSON,
+    "application/ndjson": IngestFormat.NDJSON,
+    "application/jsonl": IngestFormat.NDJSON,
+}
+
+_BULK_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "text/csv": {"schema": {"type": "string", "format": "binary"}},
+        "application/x-ndjson": {"schema": {"type": "string", "format": "binary"}},
+    },
+}
+
+
+def _upload_format(request: Request, fmt: Optional[IngestFormat]) -> IngestFormat:
+    """Resolve the upload format from `?format=` or else the Content-Type header."""
+    if fmt is not None:
+        return fmt
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        return CONTENT_TYPE_FORMATS[content_type]
+    except KeyError:
+        raise CapacityUnsupportedMediaException(
+            f"Unsupported Content-Type '{content_type}'; send text/csv or application/x-ndjson"
+        ) from None
+
+
+# ------------------------------------------------------------
+# Bulk Ingestion Endpoint
+# ------------------------------------------------------------
+@router.post(
+    "/sailings/bulk",
+    response_model=IngestReport,
+    openapi_extra={"requestBody": _BULK_REQUEST_BODY},
+    dependencies=[Depends(concurrency_limit("sailings_bulk"))],
+)
+async def bulk_load_sailings(
+    request: Request,
+    conn: Annotated[asyncpg.Connection, Depends(get_conn)],
+    ingest_service: Annotated[SailingsIngestService, Depends(get_sailings_ingest_service)],
+    fmt: Annotated[
+        Optional[IngestFormat], Query(alias="format", description="Upload format (default: from Content-Type)")
+    ] = None,
+    on_error: Annotated[
+        ErrorPolicy, Query(description="'abort' rejects the upload on an invalid row, 'skip' loads the valid rows")
+    ] = ErrorPolicy.ABORT,
+):
+    """
+    Loads sailings from a CSV or NDJSON upload (optionally gzip-encoded) into the database.
+
+    Workflow:
+    1. Resolve the format from `?format=` or the Content-Type (`text/csv`, `application/x-ndjson`).
+    2. Stream the body chunk by chunk (`Content-Encoding: gzip` is decompressed on the fly);
+       the upload is never held in memory as a whole.
+    3. Validate each row as it arrives and `COPY` it into a staging table.
+    4. Upsert into `sailings` in the same transaction: new rows are inserted, rows whose
+       offered capacity changed are updated; rows of archived voyages are skipped.
+    5. Return row counts and throughput (`IngestReport`).
+    """
+    upload_format = _upload_format(request, fmt)
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise CapacityUnsupportedMediaException(f"Unsupported Content-Encoding '{encoding}'; send gzip or identity")
+    chunks = gunzip(request.stream()) if encoding == "gzip" else request.stream()
+
+    try:
+        return await ingest_service.ingest(conn, chunks, upload_format, on_error)
+    except CapacityServiceException:
+        raise
+    except asyncpg.PostgresError as exc:
+        raise CapacityDatabaseException("Database operation failed") from exc
+    except Exception as exc:
+        raise CapacityUnexpectedException("Unhandled server error") from exc
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import os
+import json
+import struct
+import logging
+from typing import Literal, Optional, Union
+
+from pydantic import BaseModel, Field
+
+try:  # Optional: msgpack codec
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+try:  # Optional: zstd compression (stdlib from Python 3.14, backport before)
+    from compression import zstd
+except ImportError:  # pragma: no cover - depends on the environment
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+logger = logging.getLogger(__name__)
+
+# Stored values are framed as <header byte><payload>: the low 7 bits carry the codec
+# version, the high bit marks a zstd-compressed payload.
+#
+# Versions 1-3 (and unframed JSON, written before framing existed) held only the latest
+# sailing of each voyage, without superseded sailings: they cannot answer ranges that
+# end before a voyage's revision, so they are no longer read (misses, until they expire).
+_COMPRESSED = 0x80
+_VERSION_MASK = 0x7F
+
+
+# ------------------------------------------------------------
+# Codec Configuration
+# ------------------------------------------------------------
+class CacheCodecConfig(BaseModel):
+    """
+    Configuration of the encoding of cached weeks in Redis.
+
+    Only writes use the configured codec: every current format stays readable, so
+    switching codecs needs no flush; old entries are replaced as they expire.
+    """
+    codec: Literal["packed", "msgpack", "json"] = Field("packed", description="Format of newly written entries")
+    compress_threshold: int = Field(
+        1024, ge=0, description="Compress encoded entries of at least this many bytes with zstd (0 disables)"
+    )
+    compress_level: int = Field(3, ge=1, le=22, description="zstd compression level")
+
+    @classmethod
+    def from_env(cls) -> "CacheCodecConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            codec=os.getenv("CAPACITY_CACHE_CODEC", "packed").lower(),
+            compress_threshold=int(os.getenv("CAPACITY_CACHE_COMPRESS_THRESHOLD", "1024")),
+            compress_level=int(os.getenv("CAPACITY_CACHE_COMPRESS_LEVEL", "3")),
+        )
+
+
+# ------------------------------------------------------------
+# Entry Codecs
+# ------------------------------------------------------------
+class JsonCodec:
+    """Compact JSON: `{"t": computed_at, "d": duration, "v": [[ts_us, teu, superseded_us], ...]}`."""
+    name = "json"
+    version = 4
+
+    def encode(self, entry: dict) -> bytes:
+        return json.dumps(entry, separators=(",", ":")).encode()
+
+    def decode(self, payload: bytes) -> dict:
+        entry = json.loads(payload)
+        if not isinstance(entry, dict):
+            raise ValueError("cached week is not an object")
+        return entry
+
+
+class MsgpackCodec:
+    """msgpack array `[computed_at, duration, [ts_us, ...], [teu, ...], [superseded_us, ...]]`."""
+    name = "msgpack"
+    version = 5
+
+    def encode(self, entry: dict) -> bytes:
+        voyages = entry["v"]
+        columns = [list(column) for column in zip(*voyages)] if voyages else [[], [], []]
+        return msgpack.packb([entry["t"], entry["d"], *columns])
+
+    def decode(self, payload: bytes) -> dict:
+        computed_at, duration, timestamps, teus, superseded = msgpack.unpackb(payload)
+        return {"t": computed_at, "d": duration, "v": list(zip(timestamps, teus, superseded))}
+
+
+class PackedCodec:
+    """
+    Fixed-width columnar layout, little-endian:
+    `<f64 computed_at><f64 duration><u32 n><n x i64 epoch µs><n x i32 TEU><n x i64 superseded µs>`.
+    """
+    name = "packed"
+    version = 6
+    _header = struct.Struct("<ddI")
+
+    def encode(self, entry: dict) -> bytes:
+        voyages = entry["v"]
+        count = len(voyages)
+        timestamps, teus, superseded = zip(*voyages) if count else ((), (), ())
+        # struct.error past int64 / int32 (TEU)
+        return struct.pack(
+            f"<ddI{count}q{count}i{count}q", entry["t"], entry["d"], count, *timestamps, *teus, *superseded
+        )
+
+    def decode(self, payload: bytes) -> dict:
+        computed_at, duration, count = self._header.unpack_from(payload)
+        if len(payload) != self._header.size + 20 * count:
+            raise ValueError("truncated packed week")
+        columns = struct.unpack_from(f"<{count}q{count}i{count}q", payload, self._header.size)
+        voyages = list(zip(columns[:count], columns[count:2 * count], columns[2 * count:]))
+        return {"t": computed_at, "d": duration, "v": voyages}
+
+
+_CODECS = {codec.name: codec for codec in (JsonCodec(), MsgpackCodec(), PackedCodec())}
+
+
+# ------------------------------------------------------------
+# Versioned Entry Encoding
+# ------------------------------------------------------------
+class EntryCodec:
+    """
+    Encodes cached weeks into versioned, optionally compressed Redis values.
+
+    Responsibilities:
+    - Write entries with the configured codec, prefixed by its version byte.
+    - Compress encoded entries above the size threshold with zstd, when available.
+    - Read every current version, so formats can be migrated without flushing the cache.
+    - Report unreadable values as None (treated as cache misses) instead of failing.
+    """
+    def __init__(self, config: Optional[CacheCodecConfig] = None) -> None:
+        self.config = config or CacheCodecConfig()
+        name = self.config.codec
+        if name == "msgpack" and msgpack is None:
+            logger.warning("msgpack is not installed, caching with the packed codec instead")
+            name = "packed"
+        self.codec = _CODECS[name]
+        self.compress_threshold = self.config.compress_threshold
+        if self.compress_threshold and zstd is None:
+            logger.warning("zstd is not available, cache compression disabled")
+            self.compress_threshold = 0
+        self._readers = {
+            codec.version: codec
+            for codec in _CODECS.values()
+            if codec.name != "msgpack" or msgpack is not None
+        }
+
+    def encode(self, entry: dict) -> bytes:
+        """Encode a cached week into a framed Redis value."""
+        codec = self.codec
+        try:
+            payload = codec.encode(entry)
+        except struct.error:
+            # Values outside the fixed-width layout (e.g. TEU beyond int32): keep them exact
+            codec = _CODECS["json"]
+            payload = codec.encode(entry)
+        header = codec.version
+        if self.compress_threshold and len(payload) >= self.compress_threshold:
+            payload = zstd.compress(payload, level=self.config.compress_level)
+            header |= _COMPRESSED
+        return bytes((header,)) + payload
+
+    def decode(self, value: Union[bytes, str]) -> Optional[dict]:
+        """Decode a Redis value; unknown, corrupt or unreadable entries yield None."""
+        if isinstance(value, str):
+            value = value.encode()
+        if not value:
+            return None
+        header = value[0]
+        try:
+            codec = self._readers.get(header & _VERSION_MASK)
+            if codec is None:
+                return None
+            payload = value[1:]
+            if header & _COMPRESSED:
+                if zstd is None:
+                    return None
+                payload = zstd.decompress(payload)
+            return codec.decode(payload)
+        except Exception as e:
+            logger.warning(f"Ignoring undecodable cache entry: {e}")
+            return None
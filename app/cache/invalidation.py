@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+from datetime import date
+from typing import Optional
+
+import orjson
+from pydantic import BaseModel, Field
+
+from app.repositories.capacity_repository import Corridor
+
+# NOTIFY channel written by the weekly_capacity triggers (migrations/004_notify_capacity_changes)
+CAPACITY_CHANGES_CHANNEL = "capacity_changes"
+
+
+# ------------------------------------------------------------
+# Change Listener Configuration
+# ------------------------------------------------------------
+class ChangeListenerConfig(BaseModel):
+    """
+    Configuration of the cache invalidation driven by database change notifications.
+
+    Every worker listens on `CAPACITY_CHANGES_CHANNEL` and evicts the cached weeks a
+    committed write touched, in Redis and in its own L1. Weeks this worker held in L1
+    (the hot ones) are recomputed right away, up to `refresh_limit` per batch of
+    notifications, so readers do not pay for the miss.
+    """
+    enabled: bool = Field(True, description="Evict cached weeks on database change notifications")
+    refresh_limit: int = Field(64, ge=0, description="Hot weeks recomputed per notification batch (0: evict only)")
+
+    @classmethod
+    def from_env(cls) -> "ChangeListenerConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            enabled=os.getenv("CAPACITY_CACHE_LISTEN", "true").lower() in ("1", "true", "yes"),
+            refresh_limit=int(os.getenv("CAPACITY_CACHE_CHANGE_REFRESH_LIMIT", "64")),
+        )
+
+
+# ------------------------------------------------------------
+# Notification Payloads
+# ------------------------------------------------------------
+def parse_capacity_change(payload: str) -> Optional[tuple[Corridor, date, date]]:
+    """Decode a change notification into `(corridor, first week, last week)`.
+
+    Returns None when every corridor and week changed (`{"all": true}`, sent on TRUNCATE).
+
+    Raises:
+        ValueError: If the payload is malformed.
+    """
+    try:
+        change = orjson.loads(payload)
+        if change.get("all"):
+            return None
+        return (
+            Corridor(change["origin"], change["destination"]),
+            date.fromisoformat(change["from"]),
+            date.fromisoformat(change["to"]),
+        )
+    except (orjson.JSONDecodeError, AttributeError, KeyError, TypeError) as e:
+        raise ValueError(f"Malformed capacity change notification: {payload!r}") from e
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.monitoring import (
+    L1_CACHE_HITS_COUNT,
+    L1_CACHE_MISSES_COUNT,
+    L1_CACHE_EVICTIONS_COUNT,
+    L1_CACHE_BYTES,
+    L1_CACHE_ENTRIES,
+    L1_CACHE_HIT_RATIO,
+)
+
+
+# ------------------------------------------------------------
+# L1 Cache Configuration
+# ------------------------------------------------------------
+class LocalCacheConfig(BaseModel):
+    """
+    Configuration of the in-process (L1) cache placed in front of Redis.
+
+    The TTL bounds how long a worker may keep an entry if an invalidation message
+    is lost; freshness itself is still decided by the endpoint's `CachePolicy`.
+    """
+    enabled: bool = Field(True, description="Keep parsed cache entries in process memory")
+    max_bytes: int = Field(64 * 1024 * 1024, ge=0, description="Memory budget (estimated bytes) of the L1 cache")
+    ttl: float = Field(60.0, gt=0, description="Max seconds an entry stays in L1 without being re-read from Redis")
+    channel: str = Field("capacity:invalidate", description="Redis pub/sub channel carrying invalidations")
+
+    @classmethod
+    def from_env(cls) -> "LocalCacheConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            enabled=os.getenv("CAPACITY_L1_CACHE", "true").lower() in ("1", "true", "yes"),
+            max_bytes=int(os.getenv("CAPACITY_L1_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            ttl=float(os.getenv("CAPACITY_L1_CACHE_TTL", "60")),
+            channel=os.getenv("CAPACITY_CACHE_INVALIDATION_CHANNEL", "capacity:invalidate"),
+        )
+
+
+# ------------------------------------------------------------
+# Bounded LRU/TTL Cache
+# ------------------------------------------------------------
+class LocalCache:
+    """
+    Least-recently-used cache with per-entry expiry, bounded by (estimated) bytes.
+
+    Responsibilities:
+    - Serve hot entries without a Redis round-trip or re-parsing.
+    - Evict least-recently-used entries once the byte budget is exceeded.
+    - Drop entries on expiry or on explicit invalidation.
+    - Drop derived entries (tagged with the keys they were built from) whenever one of
+      their source entries is replaced or removed.
+    - Report hits, misses, evictions, entries and memory use to Prometheus.
+
+    Not thread-safe: meant to be used from a single event loop.
+    """
+    def __init__(self, max_bytes: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (expires_at, size, value, tags), least recently used first
+        self._entries: OrderedDict[str, tuple[float, int, Any, tuple[str, ...]]] = OrderedDict()
+        # source key -> keys of the entries derived from it
+        self._dependents: dict[str, set[str]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._register_metrics()
+
+    def _register_metrics(self) -> None:
+        """Bind gauges to live cache state so they are evaluated at scrape time."""
+        L1_CACHE_BYTES.set_function(lambda: self.bytes)
+        L1_CACHE_ENTRIES.set_function(lambda: len(self._entries))
+        L1_CACHE_HIT_RATIO.set_function(lambda: self.hits / ((self.hits + self.misses) or 1))
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Return the cached value without touching recency or hit statistics."""
+        item = self._entries.get(key)
+        if item is None or item[0] <= self._clock():
+            return None
+        return item[2]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value (refreshing its recency), or None if absent or expired."""
+        item = self._entries.get(key)
+        if item is not None and item[0] <= self._clock():
+            self._remove(key)
+            L1_CACHE_EVICTIONS_COUNT.labels(reason="expired").inc()
+            item = None
+        if item is None:
+            self.misses += 1
+            L1_CACHE_MISSES_COUNT.inc()
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        L1_CACHE_HITS_COUNT.inc()
+        return item[2]
+
+    def set(self, key: str, value: Any, size: int, tags: Iterable[str] = ()) -> None:
+        """Store a value of `size` estimated bytes, evicting LRU entries to stay within budget.
+
+        `tags` are the keys the value was derived from: replacing or removing any of
+        them drops this entry as well.
+        """
+        if key in self._entries:
+            self._remove(key)
+        else:
+            # A new version of a source invalidates whatever was derived from the old one
+            self._remove_dependents(key)
+        if size > self.max_bytes:
+            return
+        tags = tuple(tags)
+        self._entries[key] = (self._clock() + self.ttl, size, value, tags)
+        self.bytes += size
+        for tag in tags:
+            self._dependents.setdefault(tag, set()).add(key)
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            L1_CACHE_EVICTIONS_COUNT.labels(reason="capacity").inc()
+
+    def invalidate(self, keys: Iterable[str]) -> int:
+        """Drop the given keys; return how many were present."""
+        dropped = 0
+        for key in keys:
+            if key in self._entries:
+                self._remove(key)
+                dropped += 1
+            else:
+                self._remove_dependents(key)
+        L1_CACHE_EVICTIONS_COUNT.labels(reason="invalidated").inc(dropped)
+        return dropped
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        L1_CACHE_EVICTIONS_COUNT.labels(reason="invalidated").inc(len(self._entries))
+        self._entries.clear()
+        self._dependents.clear()
+        self.bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _, tags = self._entries.pop(key)
+        self.bytes -= size
+        for tag in tags:
+            dependents = self._dependents.get(tag)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[tag]
+        self._remove_dependents(key)
+
+    def _remove_dependents(self, key: str) -> None:
+        for dependent in self._dependents.pop(key, ()):
+            if dependent in self._entries:
+                self._remove(dependent)
+
+    def __len__(self) -> int:
+        return len(self._entries)
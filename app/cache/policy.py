@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+import math
+import random
+from enum import Enum
+from typing import Callable, Optional
+
+from pydantic import BaseModel, Field
+
+
+# ------------------------------------------------------------
+# Entry Freshness
+# ------------------------------------------------------------
+class Freshness(str, Enum):
+    """How a cached entry may be used by a reader."""
+    FRESH = "fresh"      # serve as is
+    EARLY = "early"      # serve, and recompute in the background ahead of expiry (XFetch)
+    STALE = "stale"      # past its TTL but within grace: serve, and recompute in the background
+    EXPIRED = "expired"  # past grace: treat as a miss
+
+
+# ------------------------------------------------------------
+# Cache Policy
+# ------------------------------------------------------------
+class CachePolicy(BaseModel):
+    """
+    Freshness policy applied when an endpoint reads or writes cached weeks.
+
+    - `ttl`: soft expiry; entries younger than this are fresh.
+    - `grace`: how long past `ttl` a stale entry is still served while it is refreshed
+      in the background (the Redis key itself expires after `ttl + grace`).
+    - `beta`: XFetch factor; entries are recomputed early with a probability that grows
+      as expiry approaches and with the entry's recompute duration. 0 disables it.
+
+    Policies are evaluated by the reader, so endpoints with different policies can share
+    the same cached entries.
+    """
+    name: str = Field("capacity", description="Endpoint (or use case) the policy applies to")
+    ttl: float = Field(6 * 60 * 60, gt=0, description="Seconds before an entry becomes stale")
+    grace: float = Field(60 * 60, ge=0, description="Seconds a stale entry is still served while refreshing")
+    beta: float = Field(1.0, ge=0, description="XFetch early-recomputation factor (0 disables)")
+
+    @property
+    def hard_ttl(self) -> int:
+        """Redis expiry (seconds) of entries written under this policy."""
+        return math.ceil(self.ttl + self.grace)
+
+    def freshness(
+        self,
+        computed_at: float,
+        duration: float,
+        now: float,
+        rand: Callable[[], float] = random.random,
+    ) -> Freshness:
+        """Classify an entry computed at `computed_at` (epoch seconds) that took `duration` seconds."""
+        age = now - computed_at
+        if age >= self.ttl + self.grace:
+            return Freshness.EXPIRED
+        if age >= self.ttl:
+            return Freshness.STALE
+        # XFetch: recompute early when now - duration * beta * ln(u) >= expiry, u in (0, 1]
+        if self.beta and age - duration * self.beta * math.log(1.0 - rand()) >= self.ttl:
+            return Freshness.EARLY
+        return Freshness.FRESH
+
+    @classmethod
+    def from_env(
+        cls, name: str, prefix: str = "CAPACITY_CACHE", default: Optional["CachePolicy"] = None
+    ) -> "CachePolicy":
+        """Load `<prefix>_TTL`, `<prefix>_GRACE` and `<prefix>_BETA` (falling back to `default`)."""
+        base = default or cls()
+        return cls(
+            name=name,
+            ttl=float(os.getenv(f"{prefix}_TTL", base.ttl)),
+            grace=float(os.getenv(f"{prefix}_GRACE", base.grace)),
+            beta=float(os.getenv(f"{prefix}_BETA", base.beta)),
+        )
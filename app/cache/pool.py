@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import logging
+from typing import Optional
+
+import redis.asyncio as aioredis
+from fastapi import FastAPI
+from pydantic import BaseModel, Field
+
+from app.core.monitoring import (
+    REDIS_POOL_MAX_CONNECTIONS,
+    REDIS_POOL_IN_USE_CONNECTIONS,
+    REDIS_POOL_IDLE_CONNECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------
+# Redis Configuration
+# ------------------------------------------------------------
+class RedisConfig(BaseModel):
+    """
+    Configuration model for the shared Redis connection pool.
+
+    Provides validation and default values for pool sizing, timeouts and warm-up.
+    Can be loaded from environment variables for flexible deployment.
+    """
+    host: str = Field("localhost", description="Redis server hostname")
+    port: int = Field(6379, description="Redis server port")
+    db: int = Field(0, ge=0, description="Redis logical database index")
+    password: Optional[str] = Field(None, description="Optional Redis password")
+    max_connections: int = Field(20, ge=1, description="Upper bound of connections in the pool")
+    pool_timeout: float = Field(2.0, gt=0, description="Max wait (seconds) for a free pooled connection")
+    socket_timeout: float = Field(1.0, gt=0, description="Read/write timeout (seconds) per command")
+    socket_connect_timeout: float = Field(1.0, gt=0, description="Timeout (seconds) for opening a connection")
+    warmup_connections: int = Field(4, ge=0, description="Connections opened eagerly at startup")
+
+    @property
+    def url(self) -> str:
+        """Build a redis:// URL, supporting both password-protected and open instances."""
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}{self.host}:{self.port}/{self.db}"
+
+    @classmethod
+    def from_env(cls) -> "RedisConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            db=int(os.getenv("REDIS_DB", "0")),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "20")),
+            pool_timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "2.0")),
+            socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "1.0")),
+            socket_connect_timeout=float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "1.0")),
+            warmup_connections=int(os.getenv("REDIS_WARMUP_CONNECTIONS", "4")),
+        )
+
+
+# ------------------------------------------------------------
+# Redis Pool Manager
+# ------------------------------------------------------------
+class RedisPool:
+    """
+    Manages the lifecycle of a single, bounded Redis connection pool.
+
+    Responsibilities:
+    - Create one blocking connection pool shared by every request (no per-request clients).
+    - Warm up a few connections at startup so the first requests skip the TCP/AUTH handshake.
+    - Expose pool usage through Prometheus gauges.
+    - Gracefully close all connections on app termination.
+    """
+    def __init__(self) -> None:
+        self.pool: Optional[aioredis.BlockingConnectionPool] = None
+        self.client: Optional[aioredis.Redis] = None
+        self.config: Optional[RedisConfig] = None
+
+    async def initialize(self, config: Optional[RedisConfig] = None) -> None:
+        """Create the pooled Redis client; degrade gracefully (no cache) on failure."""
+        self.config = config or RedisConfig.from_env()
+        try:
+            self.pool = aioredis.BlockingConnectionPool.from_url(
+                self.config.url,
+                max_connections=self.config.max_connections,
+                timeout=self.config.pool_timeout,
+                socket_timeout=self.config.socket_timeout,
+                socket_connect_timeout=self.config.socket_connect_timeout,
+                # Raw bytes: cached weeks are binary (see app.cache.codec)
+                decode_responses=False,
+            )
+            self.client = aioredis.Redis.from_pool(self.pool)
+        except Exception as e:
+            # Graceful degradation: continue without Redis
+            logger.warning(f"Failed to initialize Redis: {e}")
+            self.pool = None
+            self.client = None
+            return
+
+        self._register_metrics()
+        await self._warm_up()
+        logger.info(
+            "✅ Redis connection pool initialized",
+            extra={
+                "host": self.config.host,
+                "port": self.config.port,
+                "db": self.config.db,
+                "max_connections": self.config.max_connections,
+            },
+        )
+
+    async def _warm_up(self) -> None:
+        """Open `warmup_connections` connections eagerly and hand them back to the pool."""
+        count = min(self.config.warmup_connections, self.config.max_connections)
+        if count == 0:
+            return
+        results = await asyncio.gather(
+            *(self.pool.get_connection() for _ in range(count)),
+            return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        for conn in results:
+            if not isinstance(conn, BaseException):
+                await self.pool.release(conn)
+        if failures:
+            # Keep the client: Redis may become reachable later and cache errors are non-fatal
+            logger.warning(f"Redis warm-up incomplete ({len(failures)}/{count} failed): {failures[0]}")
+
+    def _register_metrics(self) -> None:
+        """Bind pool gauges to live pool state so they are evaluated at scrape time."""
+        REDIS_POOL_MAX_CONNECTIONS.set_function(lambda: self.stats()["max"])
+        REDIS_POOL_IN_USE_CONNECTIONS.set_function(lambda: self.stats()["in_use"])
+        REDIS_POOL_IDLE_CONNECTIONS.set_function(lambda: self.stats()["idle"])
+
+    def stats(self) -> dict:
+        """Return current pool usage (max, in-use and idle connection counts)."""
+        if not self.pool:
+            return {"max": 0, "in_use": 0, "idle": 0}
+        return {
+            "max": self.pool.max_connections,
+            "in_use": len(self.pool._in_use_connections),
+            "idle": len(self.pool._available_connections),
+        }
+
+    async def close(self) -> None:
+        """Close the client together with its connection pool."""
+        if self.client:
+            await self.client.aclose()
+            logger.info("🔒 Redis pool closed")
+        self.client = None
+        self.pool = None
+
+
+# Singleton instance of RedisPool for app-wide use
+redis_pool = RedisPool()
+
+
+# ------------------------------------------------------------
+# FastAPI Lifecycle Helpers
+# ------------------------------------------------------------
+async def init_redis_pool(app: FastAPI) -> None:
+    """Attach the shared Redis client to FastAPI app state on startup."""
+    await redis_pool.initialize()
+    app.state.redis = redis_pool.client
+
+
+async def close_redis_pool(app: FastAPI) -> None:
+    """Close the Redis pool during FastAPI shutdown."""
+    await redis_pool.close()
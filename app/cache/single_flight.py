@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import os
+import asyncio
+import logging
+import secrets
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+import redis.asyncio as aioredis
+from pydantic import BaseModel, Field
+
+from app.core.monitoring import CACHE_COALESCED_REQUESTS_COUNT, CACHE_COALESCED_WAITERS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# ------------------------------------------------------------
+# Cache Lock Configuration
+# ------------------------------------------------------------
+class CacheLockConfig(BaseModel):
+    """
+    Configuration of the optional cross-worker Redis lock guarding cache recomputation.
+
+    In-process coalescing is always on; the Redis lock additionally makes a single
+    worker recompute a missing key (or refresh a stale one) across the whole deployment.
+    """
+    enabled: bool = Field(False, description="Use a Redis lock so one worker recomputes a missing key")
+    lock_ttl: float = Field(10.0, gt=0, description="Lock expiry (seconds); bounds a crashed holder")
+    wait_timeout: float = Field(5.0, ge=0, description="Max wait (seconds) for another worker's result")
+    poll_interval: float = Field(0.05, gt=0, description="Delay (seconds) between cache re-reads while waiting")
+
+    @classmethod
+    def from_env(cls) -> "CacheLockConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            enabled=os.getenv("CAPACITY_CACHE_LOCK", "false").lower() in ("1", "true", "yes"),
+            lock_ttl=float(os.getenv("CAPACITY_CACHE_LOCK_TTL", "10")),
+            wait_timeout=float(os.getenv("CAPACITY_CACHE_LOCK_WAIT", "5")),
+            poll_interval=float(os.getenv("CAPACITY_CACHE_LOCK_POLL", "0.05")),
+        )
+
+
+# ------------------------------------------------------------
+# In-Process Request Coalescing
+# ------------------------------------------------------------
+class SingleFlight:
+    """
+    Coalesces concurrent identical loads within one worker.
+
+    Responsibilities:
+    - Run the first caller's load and let concurrent callers with the same key await its result.
+    - Share exceptions too, so a failing query is not retried by every waiter at once.
+    - Hand over leadership when the leading request is cancelled (e.g. client disconnect):
+      waiters then retry instead of failing with the leader's cancellation.
+    """
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        """Return `await load()`, sharing one in-flight execution per key."""
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                return await self._lead(key, load)
+
+            CACHE_COALESCED_REQUESTS_COUNT.labels(scope="local").inc()
+            CACHE_COALESCED_WAITERS.inc()
+            try:
+                # Shielded: a cancelled waiter must not cancel the shared load
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled; loop to join or lead a new flight
+            finally:
+                CACHE_COALESCED_WAITERS.dec()
+
+    async def _lead(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved so an exception without waiters is not reported as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+# ------------------------------------------------------------
+# Cross-Worker Lock
+# ------------------------------------------------------------
+# Compare-and-delete: only the holder (same token) may release the lock
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLock:
+    """
+    Minimal `SET NX PX` lock shared by all workers of the deployment.
+
+    Lock errors are treated as "not acquired by anyone": callers fall back to
+    computing the value themselves, so Redis trouble never blocks a request.
+    """
+    def __init__(self, redis: aioredis.Redis, ttl: float) -> None:
+        self.redis = redis
+        self.ttl_ms = int(ttl * 1000)
+
+    async def acquire(self, key: str) -> Optional[str]:
+        """Try once to take the lock; return the holder token, or None if held elsewhere."""
+        token = secrets.token_hex(8)
+        try:
+            if await self.redis.set(key, token, nx=True, px=self.ttl_ms):
+                return token
+            return None
+        except Exception as e:
+            logger.warning(f"Redis lock unavailable, computing without it: {e}")
+            return token
+
+    async def release(self, key: str, token: str) -> None:
+        """Release the lock if still held with `token` (an expired lock is left alone)."""
+        try:
+            await self.redis.eval(_RELEASE_SCRIPT, 1, key, token)
+        except Exception as e:
+            logger.warning(f"Failed to release Redis lock {key}: {e}")
@@ -0,0 +1,93 @@
+"""
+Bulk-load sailings from a CSV or NDJSON file into PostgreSQL (same path as `POST /sailings/bulk`).
+
+The file is streamed in chunks straight into `COPY`, so memory stays bounded whatever
+its size; `.gz` files are decompressed on the fly and `-` reads standard input.
+
+Usage:
+    python -m app.cli.ingest_sailings data/sailings_sample.csv
+    python -m app.cli.ingest_sailings feed.ndjson.gz --on-error skip
+    zcat feed.csv.gz | python -m app.cli.ingest_sailings - --format csv
+
+DATABASE_URL (or --database-url) selects the database.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import asyncio
+import argparse
+from typing import AsyncIterator, BinaryIO, Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+from app.core import logging
+from app.exceptions import CapacityServiceException
+from app.services.sailings_ingest import ErrorPolicy, IngestFormat, SailingsIngestService, gunzip
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _format_from_path(path: str) -> Optional[IngestFormat]:
+    name = path.lower().removesuffix(".gz")
+    if name.endswith(".csv"):
+        return IngestFormat.CSV
+    if name.endswith((".ndjson", ".jsonl")):
+        return IngestFormat.NDJSON
+    return None
+
+
+async def _read_chunks(stream: BinaryIO, chunk_size: int) -> AsyncIterator[bytes]:
+    """Read the file off the event loop so disk reads overlap with COPY."""
+    while chunk := await asyncio.to_thread(stream.read, chunk_size):
+        yield chunk
+
+
+async def ingest_file(
+    dsn: str, path: str, fmt: IngestFormat, on_error: ErrorPolicy, chunk_size: int = CHUNK_SIZE
+):
+    """Stream one file (or stdin for "-") into `sailings` and return the `IngestReport`."""
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    conn = await asyncpg.connect(dsn)
+    try:
+        chunks = _read_chunks(stream, chunk_size)
+        if path.lower().endswith(".gz"):
+            chunks = gunzip(chunks)
+        return await SailingsIngestService().ingest(conn, chunks, fmt, on_error)
+    finally:
+        await conn.close()
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV/NDJSON file (optionally .gz), or - for stdin")
+    parser.add_argument("--format", choices=[f.value for f in IngestFormat], help="Default: from the file suffix")
+    parser.add_argument("--on-error", choices=[p.value for p in ErrorPolicy], default=ErrorPolicy.ABORT.value)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="Default: $DATABASE_URL")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Bytes read per chunk")
+    args = parser.parse_args(argv)
+
+    fmt = IngestFormat(args.format) if args.format else _format_from_path(args.path)
+    if fmt is None:
+        parser.error("cannot infer the format from the file name; pass --format")
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set; pass --database-url")
+    logging.setup_logging(os.getenv("LOG_LEVEL", "WARNING"))
+
+    try:
+        report = asyncio.run(
+            ingest_file(args.database_url, args.path, fmt, ErrorPolicy(args.on_error), args.chunk_size)
+        )
+    except CapacityServiceException as e:
+        print(f"Ingestion failed: {e.message}", file=sys.stderr)
+        return 1
+    print(report.model_dump_json(indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Maintain the monthly partitions of `sailings` (migrations/006_partition_sailings).
+
+`create` adds the missing partitions from the current month to --months-ahead months
+later (the service also does this in the background). `detach` archives every month
+ending on or before --before: the partitions become standalone tables named
+sailings_pYYYY_MM, to dump and drop at will; the capacity already summarized for
+those weeks is kept, and later sailings of their voyages are no longer loaded.
+
+Usage:
+    python -m app.cli.sailings_partitions create --months-ahead 6
+    python -m app.cli.sailings_partitions detach --before 2024-01-01
+
+DATABASE_URL (or --database-url) selects the database.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import asyncio
+import argparse
+from datetime import date
+from typing import Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+from app.core import logging
+from app.exceptions import CapacityServiceException
+from app.repositories.sailings_repository import SailingsRepository
+
+
+async def run(dsn: str, args: argparse.Namespace) -> str:
+    """Run the selected command and return its summary line."""
+    repository = SailingsRepository()
+    conn = await asyncpg.connect(dsn)
+    try:
+        if args.command == "create":
+            created = await repository.create_partitions(conn, args.months_ahead)
+            return f"Created {created} partition(s)"
+        detached = await repository.detach_partitions(conn, args.before)
+        return f"Detached {len(detached)} partition(s)" + "".join(f"\n  {name}" for name in detached)
+    finally:
+        await conn.close()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="Default: $DATABASE_URL")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="Create the partitions of the coming months")
+    create.add_argument("--months-ahead", type=int, default=3, help="Months after the current one")
+    detach = commands.add_parser("detach", help="Detach the months ending on or before a date")
+    detach.add_argument("--before", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set; pass --database-url")
+    logging.setup_logging(os.getenv("LOG_LEVEL", "WARNING"))
+
+    try:
+        print(asyncio.run(run(args.database_url, args)))
+    except CapacityServiceException as e:
+        print(f"Partition maintenance failed: {e.message}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
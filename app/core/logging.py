@@ -1,7 +1,29 @@
-import logging
-import json
 import sys
-from datetime import datetime
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+from prometheus_client import Counter
+
+# Defined here rather than in app.core.monitoring, which itself logs through this module
+LOG_RECORDS_DROPPED = Counter(
+    "capacity_log_records_dropped",
+    "Log records discarded because the logging queue was full"
+)
+
+# Record attributes that are not relevant for structured logging
+_EXCLUDED_KEYS = frozenset({
+    "args", "msg", "exc_info", "exc_text", "stack_info",
+    "lineno", "pathname", "filename", "module", "funcName",
+    "created", "msecs", "relativeCreated", "thread",
+    "threadName", "processName", "process", "taskName",
+    "color_message",
+})
 
 
 # ------------------------------------------------------------
@@ -14,67 +36,155 @@ class JsonFormatter(logging.Formatter):
     Features:
     - Converts log records to JSON with timestamp, level, logger, and message.
     - Includes user-defined `extra` fields while excluding irrelevant internal attributes.
+    - Encodes with orjson; values it cannot serialize natively are rendered with `str`.
     - Designed for structured logging pipelines and observability dashboards.
     """
     def format(self, record: logging.LogRecord) -> str:
         log_record = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            # Time of the logging call, not of the (possibly deferred) formatting
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
 
-        # Exclude internal fields that are not relevant for structured logging
-        exclude_keys = {
-            "args", "msg", "exc_info", "exc_text", "stack_info",
-            "lineno", "pathname", "filename", "module", "funcName",
-            "created", "msecs", "relativeCreated", "thread",
-            "threadName", "processName", "process", "taskName",
-            "color_message",
-        }
-
         # Include custom extra fields from log record
         for key, value in record.__dict__.items():
-            if key not in log_record and key not in exclude_keys:
+            if key not in log_record and key not in _EXCLUDED_KEYS:
                 log_record[key] = value
 
-        return json.dumps(log_record, ensure_ascii=False)
+        return orjson.dumps(log_record, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+# ------------------------------------------------------------
+# Non-Blocking Queue Handler
+# ------------------------------------------------------------
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a bounded queue drained by a background writer thread.
+
+    Responsibilities:
+    - Keep formatting and stream I/O off the event loop: callers only enqueue.
+    - Freeze the message (merge `args`) at call time, since arguments may change
+      before the writer thread formats the record.
+    - Apply the queue-full policy: drop the record (counted in `LOG_RECORDS_DROPPED`)
+      or block the caller until the writer catches up.
+    """
+    def __init__(self, log_queue: queue.Queue, block: bool = False) -> None:
+        super().__init__(log_queue)
+        self.block = block
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        # Tracebacks hold frames alive; they are not part of the JSON output anyway
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.block:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+# ------------------------------------------------------------
+# Logging Pipeline
+# ------------------------------------------------------------
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than failing to stop when the queue is full
+        self.queue.put(self._sentinel)
+
+
+class _LoggingPipeline:
+    """The process-wide queue, its writer thread and the handler feeding it (created once)."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.stream_handler: Optional[logging.Handler] = None
+        self.queue_handler: Optional[NonBlockingQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+
+    def start(self, queue_size: int, block: bool) -> logging.Handler:
+        """Start the writer thread (once) and return the handler loggers should use."""
+        with self.lock:
+            if self.listener is None:
+                self.stream_handler = logging.StreamHandler(sys.stdout)
+                self.stream_handler.setFormatter(JsonFormatter())
+                self.queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size), block=block)
+                self.listener = _Listener(self.queue_handler.queue, self.stream_handler)
+                self.listener.start()
+                atexit.register(self.stop)
+            return self.queue_handler
+
+    def stop(self) -> None:
+        """Flush queued records, stop the writer and route any later records synchronously."""
+        with self.lock:
+            if self.listener is None:
+                return
+            self.listener.stop()
+            self.listener = None
+            for log in _configured_loggers():
+                if self.queue_handler in log.handlers:
+                    log.removeHandler(self.queue_handler)
+                    log.addHandler(self.stream_handler)
+
+
+_pipeline = _LoggingPipeline()
+
+# Loggers that get their own handler (Uvicorn/FastAPI do not propagate to the root logger)
+_OWN_HANDLER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access", "fastapi", "capacity-service")
+
+
+def _configured_loggers() -> list[logging.Logger]:
+    return [logging.getLogger()] + [logging.getLogger(name) for name in _OWN_HANDLER_LOGGERS]
 
 
 # ------------------------------------------------------------
 # Logging Setup
 # ------------------------------------------------------------
-def setup_logging(level: str = "INFO"):
+def setup_logging(level: str = "INFO", queue_size: int = 10000, block: bool = False, lean_records: bool = False):
     """
     Configure global JSON logging for the application.
 
     Responsibilities:
     - Sets up a single structured logging pipeline for Uvicorn, FastAPI, and the application.
     - Ensures logs are emitted in JSON for observability, monitoring, and correlation.
-    - Overrides default handlers to prevent mixed log formats.
+    - Writes from a background thread through a bounded queue (`queue_size` records); when it
+      is full, records are dropped (and counted) unless `block` is set.
+    - Overrides default handlers to prevent mixed log formats. Safe to call more than once.
+    - With `lean_records` (opt-in), records skip the attributes the JSON output excludes.
     """
-    handler = logging.StreamHandler()
-    handler.setFormatter(JsonFormatter())
-
-    # Configure root logger
-    root = logging.getLogger()
-    root.setLevel(level)
-    root.handlers.clear()
-    root.addHandler(handler)
-
-    # Align Uvicorn/FastAPI logs with same JSON format
-    for name in ("uvicorn", "uvicorn.error", "uvicorn.access", "fastapi"):
-        log = logging.getLogger(name)
+    handler = _pipeline.start(queue_size, block)
+
+    if lean_records:
+        # Interpreter-wide switches of the logging module, not of our handlers: every record
+        # created in the process (third-party handlers and formatters included) loses its
+        # caller frame, thread and process attributes. Only for processes that log through
+        # this pipeline alone.
+        logging._srcfile = None
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+        logging.logAsyncioTasks = False
+
+    for log in _configured_loggers():
         log.handlers.clear()
         log.addHandler(handler)
         log.setLevel(level)
-        log.propagate = False
+        if log is not logging.getLogger():
+            log.propagate = False
+
 
-    # Configure dedicated app logger
-    app_logger = logging.getLogger("capacity-service")
-    app_logger.setLevel(level)
-    app_logger.propagate = False
-    app_logger.addHandler(handler)
+def shutdown_logging() -> None:
+    """Flush pending records and stop the writer thread (also run at interpreter exit)."""
+    _pipeline.stop()
 
 
 def get_logger(name: str):
@@ -82,12 +192,7 @@ def get_logger(name: str):
     Returns a structured JSON logger instance for the given name.
 
     - Useful for per-module logging with consistent formatting.
-    - Prevents duplicate logs via `propagate = False`.
+    - Records propagate to the root logger configured by `setup_logging`, so repeated
+      calls never stack up handlers (or duplicate log lines).
     """
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JsonFormatter())
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
-    logger.propagate = False
-    return logger
+    return logging.getLogger(name)
@@ -1,10 +1,20 @@
+import os
+import json
+import math
 import time
+import random
+import asyncio
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from app.core import logging
+from app.core.tracing import tracing
 from functools import wraps
-from typing import Callable, Any
-from prometheus_client import Histogram, Counter, generate_latest, CONTENT_TYPE_LATEST
-from fastapi import Request, Response
+from typing import Annotated, AsyncContextManager, Callable, Any, Optional
+from prometheus_client import Histogram, Counter, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from fastapi import HTTPException, Query, Request, Response
 from fastapi.routing import APIRouter
+from pydantic import BaseModel, Field
 
 logger = logging.get_logger(__name__)
 
@@ -25,15 +35,204 @@ REQUEST_COUNT = Counter(
     ["method", "path", "status_code"],
 )
 
-# Cache metrics to monitor cache efficiency
+# Cache metrics to monitor cache efficiency (counted per cached week)
 CACHE_HITS_COUNT = Counter(
     "capacity_cache_hits",
-    "Cache hit count"
+    "Cache hit count (fresh weeks served from the L1 cache or Redis)"
 )
 
 CACHE_MISSES_COUNT = Counter(
     "capacity_cache_misses",
-    "Cache miss count"
+    "Cache miss count (weeks loaded from the database)"
+)
+
+CACHE_STALE_HITS_COUNT = Counter(
+    "capacity_cache_stale_hits",
+    "Stale cache hit count (weeks served past their TTL, within grace, while refreshed)"
+)
+
+CACHE_REFRESH_COUNT = Counter(
+    "capacity_cache_refreshes",
+    "Cached weeks recomputed in the background",
+    ["trigger"],  # "stale" (past TTL), "early" (probabilistic early expiry) or "changed" (data changed)
+)
+
+CACHE_CHANGE_EVICTIONS_COUNT = Counter(
+    "capacity_cache_change_evictions",
+    "Cached weeks evicted because their data changed in the database"
+)
+
+# In-process (L1) cache in front of Redis (counted per cached week)
+L1_CACHE_HITS_COUNT = Counter(
+    "capacity_l1_cache_hits",
+    "L1 cache hit count (weeks served from process memory)"
+)
+
+L1_CACHE_MISSES_COUNT = Counter(
+    "capacity_l1_cache_misses",
+    "L1 cache miss count (weeks looked up in Redis)"
+)
+
+L1_CACHE_EVICTIONS_COUNT = Counter(
+    "capacity_l1_cache_evictions",
+    "Entries removed from the L1 cache",
+    ["reason"],  # "capacity", "expired" or "invalidated"
+)
+
+L1_CACHE_HIT_RATIO = Gauge(
+    "capacity_l1_cache_hit_ratio",
+    "L1 cache hit ratio since startup"
+)
+
+L1_CACHE_BYTES = Gauge(
+    "capacity_l1_cache_bytes",
+    "Estimated memory held by L1 cache entries (bytes)"
+)
+
+L1_CACHE_ENTRIES = Gauge(
+    "capacity_l1_cache_entries",
+    "Entries currently held by the L1 cache"
+)
+
+# Stampede protection: requests served by another request's in-flight load
+CACHE_COALESCED_REQUESTS_COUNT = Counter(
+    "capacity_cache_coalesced_requests",
+    "Requests that reused an identical in-flight load instead of querying the database",
+    ["scope"],  # "local" (same worker) or "redis_lock" (another worker)
+)
+
+CACHE_COALESCED_WAITERS = Gauge(
+    "capacity_cache_coalesced_waiters",
+    "Requests currently waiting on an identical in-flight load"
+)
+
+# Shared Redis connection pool usage (bound to live pool state at startup)
+REDIS_POOL_MAX_CONNECTIONS = Gauge(
+    "capacity_redis_pool_max_connections",
+    "Configured upper bound of Redis pool connections"
+)
+
+REDIS_POOL_IN_USE_CONNECTIONS = Gauge(
+    "capacity_redis_pool_in_use_connections",
+    "Redis connections currently checked out of the pool"
+)
+
+REDIS_POOL_IDLE_CONNECTIONS = Gauge(
+    "capacity_redis_pool_idle_connections",
+    "Idle Redis connections available in the pool"
+)
+
+# Database pools: the primary ("primary") and each read replica ("replica1", ...)
+DB_POOL_MAX_CONNECTIONS = Gauge(
+    "capacity_db_pool_max_connections",
+    "Configured upper bound of connections in a database pool",
+    ["pool"],
+)
+
+DB_POOL_IN_USE_CONNECTIONS = Gauge(
+    "capacity_db_pool_in_use_connections",
+    "Database connections currently checked out of a pool",
+    ["pool"],
+)
+
+DB_POOL_IDLE_CONNECTIONS = Gauge(
+    "capacity_db_pool_idle_connections",
+    "Idle open connections of a database pool",
+    ["pool"],
+)
+
+DB_POOL_SIZE = Gauge(
+    "capacity_db_pool_size",
+    "Open connections of a database pool (in use and idle)",
+    ["pool"],
+)
+
+DB_POOL_WAITING_REQUESTS = Gauge(
+    "capacity_db_pool_waiting_requests",
+    "Acquires currently waiting for a free connection of a database pool",
+    ["pool"],
+)
+
+DB_POOL_ACQUIRE_WAIT = Histogram(
+    "capacity_db_pool_acquire_wait_seconds",
+    "Time spent waiting for a pooled database connection (seconds)",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+DB_POOL_ACQUIRE_TIMEOUTS_COUNT = Counter(
+    "capacity_db_pool_acquire_timeouts",
+    "Acquires that found no free connection within the acquire timeout (answered 503)",
+    ["pool"],
+)
+
+DB_READ_ROUTES_COUNT = Counter(
+    "capacity_db_read_routes",
+    "Read-only connections handed out, by the pool that served them",
+    ["pool"],  # "primary" when no replica is eligible
+)
+
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "capacity_db_replica_lag_seconds",
+    "Replay lag of a read replica at its last check",
+    ["pool"],
+)
+
+DB_REPLICA_AVAILABLE = Gauge(
+    "capacity_db_replica_available",
+    "Whether a read replica currently receives reads (reachable and within the lag limit)",
+    ["pool"],
+)
+
+# Load shedding of routes over their concurrency limit
+ROUTE_IN_FLIGHT_REQUESTS = Gauge(
+    "capacity_route_in_flight_requests",
+    "Requests currently holding a slot of a concurrency-limited route",
+    ["route"],
+)
+
+ROUTE_SHED_REQUESTS_COUNT = Counter(
+    "capacity_route_shed_requests",
+    "Requests rejected with 503 because their route was at its concurrency limit",
+    ["route"],
+)
+
+# Dependency health, as last checked by the background health monitor
+DEPENDENCY_UP = Gauge(
+    "capacity_dependency_up",
+    "Whether a dependency passed its last health check (1) or not (0)",
+    ["dependency"],  # "postgres" or "redis"
+)
+
+DEPENDENCY_CHECK_DURATION = Gauge(
+    "capacity_dependency_check_duration_seconds",
+    "Duration of the last health check of a dependency",
+    ["dependency"],
+)
+
+DEPENDENCY_LAST_CHECK = Gauge(
+    "capacity_dependency_last_check_timestamp_seconds",
+    "Unix time of the last health check of a dependency",
+    ["dependency"],
+)
+
+SERVICE_READY = Gauge(
+    "capacity_ready",
+    "Whether the service reports ready (1) on /ready"
+)
+
+# Bulk ingestion of sailings
+INGESTED_ROWS_COUNT = Counter(
+    "capacity_ingested_rows",
+    "Sailing rows received by bulk loads",
+    ["outcome"],  # "inserted", "updated", "archived", "unchanged" or "rejected"
+)
+
+# Hot queries run through statements prepared on their connection
+PREPARED_STATEMENT_LOOKUPS_COUNT = Counter(
+    "capacity_prepared_statement_lookups",
+    "Hot query executions by whether the connection already had the statement prepared",
+    ["statement", "result"],  # "hit" (bind and execute only) or "miss" (prepared on first use)
 )
 
 # Query-level performance monitoring
@@ -43,39 +242,243 @@ QUERY_DURATION = Histogram(
     ["query_name"],
 )
 
+QUERY_ROWS = Histogram(
+    "capacity_query_rows",
+    "Rows returned by a monitored query",
+    ["query_name"],
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000),
+)
+
+# Captured query plans (EXPLAIN ANALYZE of slow or sampled calls)
+QUERY_PLANS_CAPTURED_COUNT = Counter(
+    "capacity_query_plans_captured",
+    "Query plans captured with EXPLAIN ANALYZE",
+    ["query_name", "reason"],  # "slow" or "sampled"
+)
+
+QUERY_RESULT_BYTES = Histogram(
+    "capacity_query_result_bytes",
+    "Result size of captured plans (actual rows x plan width, as estimated by Postgres)",
+    ["query_name"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+)
+
+QUERY_PLAN_NODE_SECONDS = Histogram(
+    "capacity_query_plan_node_seconds",
+    "Time spent in a plan node itself (children excluded) in captured plans",
+    ["query_name", "node_type"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+
+
+# ------------------------------------------------------------
+# Slow Query Diagnostics
+# ------------------------------------------------------------
+class SlowQueryConfig(BaseModel):
+    """
+    Thresholds of the slow-query log and of query plan capture.
+
+    Calls slower than `threshold_seconds`, plus a `sample_rate` fraction of the others, get
+    their statement re-run with `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` in the background,
+    at most once per `min_interval_seconds` per query and one at a time.
+    """
+    threshold_seconds: float = Field(1.0, gt=0, description="Duration past which a query is slow")
+    sample_rate: float = Field(0.0, ge=0, le=1, description="Fraction of other calls whose plan is captured")
+    capture: bool = Field(True, description="Capture plans (EXPLAIN ANALYZE) of slow and sampled calls")
+    min_interval_seconds: float = Field(60.0, ge=0, description="Min seconds between two captures of a query")
+    explain_timeout_seconds: float = Field(10.0, gt=0, description="statement_timeout of a capture")
+    history: int = Field(50, ge=1, description="Captured plans kept for /debug/slow-queries")
+    debug_endpoint: bool = Field(
+        False, description="Serve /debug/slow-queries (exposes query parameters; keep it off in production)"
+    )
+
+    @classmethod
+    def from_env(cls) -> "SlowQueryConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            threshold_seconds=float(os.getenv("SLOW_QUERY_THRESHOLD_SECONDS", "1.0")),
+            sample_rate=float(os.getenv("QUERY_PLAN_SAMPLE_RATE", "0")),
+            capture=os.getenv("QUERY_PLAN_CAPTURE", "true").lower() in ("1", "true", "yes"),
+            min_interval_seconds=float(os.getenv("QUERY_PLAN_MIN_INTERVAL_SECONDS", "60")),
+            explain_timeout_seconds=float(os.getenv("QUERY_PLAN_TIMEOUT_SECONDS", "10")),
+            history=int(os.getenv("SLOW_QUERY_HISTORY", "50")),
+            debug_endpoint=os.getenv("SLOW_QUERY_DEBUG_ENDPOINT", "false").lower() in ("1", "true", "yes"),
+        )
+
+
+# Statements (query text, arguments) run by the monitored call in progress; see `fetch_prepared`
+executed_statements: ContextVar[Optional[list[tuple[str, tuple]]]] = ContextVar("executed_statements", default=None)
+
+
+def plan_node_times(plan: dict) -> list[tuple[str, float]]:
+    """
+    (node type, seconds spent in the node itself) for every node of an EXPLAIN ANALYZE plan.
+
+    Node times are inclusive of their children and per loop: a node's own time is its total
+    over all loops minus its children's totals.
+    """
+    def total(node: dict) -> float:
+        return node.get("Actual Total Time", 0.0) * node.get("Actual Loops", 1) / 1000
+
+    times = []
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        children = node.get("Plans", [])
+        times.append((node["Node Type"], max(0.0, total(node) - sum(total(child) for child in children))))
+        nodes.extend(children)
+    return times
+
+
+class QueryPlanCapture:
+    """
+    Re-runs the statements of slow (or sampled) monitored calls under EXPLAIN ANALYZE, out of band.
+
+    Responsibilities:
+    - Run the capture as a background task on a connection of its own (from the application's
+      read pool), inside a transaction that is always rolled back.
+    - Rate-limit captures per query and run one at a time, so a burst of slow calls does not
+      double the load that made them slow.
+    - Export the result size and per-node times of captured plans, and keep the last
+      `history` ones for `/debug/slow-queries`.
+
+    Only statements run through `fetch_prepared` are captured (the registered read queries);
+    bulk loads are timed and logged, never re-executed.
+    """
+
+    def __init__(self, config: Optional[SlowQueryConfig] = None) -> None:
+        self.config = config or SlowQueryConfig()
+        self.recent: deque[dict] = deque(maxlen=self.config.history)
+        self._acquire: Optional[Callable[[], AsyncContextManager[Any]]] = None
+        self._last: dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def bind(self, acquire: Optional[Callable[[], AsyncContextManager[Any]]]) -> None:
+        """Set how capture connections are acquired (None disables captures)."""
+        self._acquire = acquire
+
+    def maybe_capture(self, query_name: str, duration: float, statements: list[tuple[str, tuple]]) -> None:
+        """Schedule a capture of the call's last statement if it is slow or sampled."""
+        slow = duration > self.config.threshold_seconds
+        if not statements or not self.config.capture or self._acquire is None:
+            return
+        if not slow and (self.config.sample_rate == 0 or random.random() >= self.config.sample_rate):
+            return
+        now = time.monotonic()
+        if self._task is not None or now - self._last.get(query_name, -math.inf) < self.config.min_interval_seconds:
+            return
+        self._last[query_name] = now
+        query, args = statements[-1]
+        self._task = asyncio.create_task(
+            self._capture(query_name, "slow" if slow else "sampled", duration, query, args)
+        )
+
+    async def _capture(self, query_name: str, reason: str, duration: float, query: str, args: tuple) -> None:
+        try:
+            async with self._acquire() as conn:
+                transaction = conn.transaction()
+                await transaction.start()
+                try:
+                    await conn.execute(
+                        f"SET LOCAL statement_timeout = {int(self.config.explain_timeout_seconds * 1000)}"
+                    )
+                    explain = await conn.fetchval("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, *args)
+                finally:
+                    await transaction.rollback()
+            self.record(query_name, reason, duration, args, json.loads(explain)[0])
+        except Exception as e:
+            logger.warning("Query plan capture failed", extra={"query_name": query_name, "error_msg": str(e)})
+        finally:
+            self._task = None
+
+    def record(self, query_name: str, reason: str, duration: float, args: tuple, explain: dict) -> dict:
+        """Export a captured plan's metrics and keep it in the recent history."""
+        plan = explain["Plan"]
+        result_bytes = plan.get("Actual Rows", 0) * plan.get("Plan Width", 0)
+        QUERY_PLANS_CAPTURED_COUNT.labels(query_name=query_name, reason=reason).inc()
+        QUERY_RESULT_BYTES.labels(query_name=query_name).observe(result_bytes)
+        for node_type, seconds in plan_node_times(plan):
+            QUERY_PLAN_NODE_SECONDS.labels(query_name=query_name, node_type=node_type).observe(seconds)
+        entry = {
+            "query_name": query_name,
+            "reason": reason,
+            "captured_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "duration_seconds": round(duration, 4),
+            "execution_ms": explain.get("Execution Time"),
+            "planning_ms": explain.get("Planning Time"),
+            "rows": plan.get("Actual Rows"),
+            "result_bytes": result_bytes,
+            "shared_hit_blocks": plan.get("Shared Hit Blocks"),
+            "shared_read_blocks": plan.get("Shared Read Blocks"),
+            "parameters": [str(arg) if not isinstance(arg, (int, float)) else arg for arg in args],
+            "plan": explain,
+        }
+        self.recent.append(entry)
+        logger.info(
+            "Query plan captured",
+            extra={k: entry[k] for k in ("query_name", "reason", "execution_ms", "rows", "shared_read_blocks")},
+        )
+        return entry
+
+    async def aclose(self) -> None:
+        """Cancel a capture in progress and stop capturing (before the pools close)."""
+        self._acquire = None
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+# Shared by every monitored query; captures start once the DB pool binds it (see init_db_pool)
+query_plans = QueryPlanCapture(SlowQueryConfig.from_env())
+
 
 # ------------------------------------------------------------
 # Query Monitoring Decorator
 # ------------------------------------------------------------
-def monitor_query(query_name: str):
+def monitor_query(query_name: str, rows: Optional[Callable[[Any], int]] = len):
     """
-    Decorator to measure database query execution time and log slow queries.
+    Decorator to measure database query execution time and diagnose slow queries.
+
+    `rows` counts the rows in the decorated function's result (default: `len`, for lists
+    of rows); None records no row count.
 
     Responsibilities:
-    - Updates Prometheus histogram for query duration.
-    - Logs queries exceeding 1 second as warnings.
+    - Updates Prometheus histograms for query duration and rows returned.
+    - Logs queries exceeding SLOW_QUERY_THRESHOLD_SECONDS as warnings.
+    - Hands slow and sampled calls to `query_plans` for an EXPLAIN ANALYZE in the background.
     - Captures and logs query errors without disrupting business logic flow.
+    - Runs the call in a `db.query` span (statement execution and row conversion nest in it).
     """
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs) -> Any:
+            statements: list[tuple[str, tuple]] = []
+            token = executed_statements.set(statements)
             start_time = time.time()
             try:
-                result = await func(*args, **kwargs)
-                duration = time.time() - start_time
+                with tracing.span("db.query", {"db.system": "postgresql", "db.query.name": query_name}) as span:
+                    result = await func(*args, **kwargs)
+                    duration = time.time() - start_time
 
-                # Record duration for Prometheus
-                QUERY_DURATION.labels(query_name=query_name).observe(duration)
+                    # Record duration and size for Prometheus
+                    QUERY_DURATION.labels(query_name=query_name).observe(duration)
+                    returned = rows(result) if rows is not None else None
+                    if returned is not None:
+                        QUERY_ROWS.labels(query_name=query_name).observe(returned)
+                        span.set_attribute("db.response.returned_rows", returned)
 
                 # Warn on slow queries for operational observability
-                if duration > 1.0:
+                if duration > query_plans.config.threshold_seconds:
                     logger.warning(
                         "Slow query detected",
                         extra={
                             "query_name": query_name,
                             "duration": round(duration, 4),
+                            "rows": returned,
                         },
                     )
+                query_plans.maybe_capture(query_name, duration, statements)
 
                 return result
 
@@ -89,6 +492,8 @@ def monitor_query(query_name: str):
                     },
                 )
                 raise
+            finally:
+                executed_statements.reset(token)
 
         return wrapper
 
@@ -109,7 +514,26 @@ async def metrics() -> Response:
     Provides all defined metrics including:
     - Request latency and count
     - Cache hits/misses
+    - Redis pool usage
     - Query execution durations
     """
     data = generate_latest()
     return Response(data, media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/debug/slow-queries")
+async def slow_queries(limit: Annotated[int, Query(ge=1, le=500)] = 20) -> dict:
+    """
+    Most recent captured query plans (newest first), with their parameters, timings,
+    buffer usage and full EXPLAIN (ANALYZE, BUFFERS) output.
+
+    Unauthenticated, so it answers 404 unless `SLOW_QUERY_DEBUG_ENDPOINT` is enabled.
+    """
+    if not query_plans.config.debug_endpoint:
+        raise HTTPException(status_code=404, detail="Not Found")
+    plans = list(query_plans.recent)[::-1][:limit]
+    return {
+        "threshold_seconds": query_plans.config.threshold_seconds,
+        "sample_rate": query_plans.config.sample_rate,
+        "plans": plans,
+    }
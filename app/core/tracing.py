@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import os
+import logging
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, ContextManager, Iterable, Literal, Mapping, Optional
+
+from pydantic import BaseModel, Field
+
+try:  # Optional: OpenTelemetry tracing (API and SDK)
+    from opentelemetry import trace
+    from opentelemetry.propagate import extract
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SimpleSpanProcessor,
+        SpanExporter,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+except ImportError:  # pragma: no cover - depends on the environment
+    trace = None
+    SpanProcessor = object
+
+logger = logging.getLogger(__name__)
+
+# Request ID of the request being served, set by the instrumentation middleware and
+# copied onto every span started while serving it (background tasks it spawns included)
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+
+# Span attribute carrying the request ID
+REQUEST_ID_ATTRIBUTE = "request.id"
+
+
+# ------------------------------------------------------------
+# Tracing Configuration
+# ------------------------------------------------------------
+class TracingConfig(BaseModel):
+    """
+    Configuration of OpenTelemetry tracing.
+
+    Disabled by default. When enabled, a `sample_ratio` share of the traces started here is
+    recorded and exported; requests arriving with a W3C `traceparent` follow the caller's
+    sampling decision instead. Unsampled requests cost a few microseconds per span.
+    """
+    enabled: bool = Field(False, description="Record and export traces")
+    sample_ratio: float = Field(0.01, ge=0, le=1, description="Share of new traces that are recorded")
+    exporter: Literal["otlp", "console"] = Field("otlp", description="Where finished spans are sent")
+    endpoint: Optional[str] = Field(
+        None, description="OTLP/HTTP traces endpoint (default: the exporter's OTEL_EXPORTER_OTLP_* settings)"
+    )
+    service_name: str = Field("capacity-service", description="`service.name` resource attribute")
+
+    @classmethod
+    def from_env(cls) -> "TracingConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            enabled=os.getenv("TRACING_ENABLED", "false").lower() == "true",
+            sample_ratio=float(os.getenv("TRACING_SAMPLE_RATIO", "0.01")),
+            exporter=os.getenv("TRACING_EXPORTER", "otlp").lower(),
+            endpoint=os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or None,
+            service_name=os.getenv("OTEL_SERVICE_NAME", "capacity-service"),
+        )
+
+
+# ------------------------------------------------------------
+# Tracer
+# ------------------------------------------------------------
+class _NoopSpan:
+    """Stands for a span while tracing is disabled."""
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Mapping[str, Any]) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_DISABLED = nullcontext(_NoopSpan())
+
+
+class _RequestIdProcessor(SpanProcessor):
+    """Tags every span started while serving a request with that request's ID."""
+
+    def on_start(self, span, parent_context=None) -> None:
+        request_id = current_request_id.get()
+        if request_id is not None:
+            span.set_attribute(REQUEST_ID_ATTRIBUTE, request_id)
+
+
+class Tracing:
+    """
+    Process-wide tracer of the service.
+
+    Responsibilities:
+    - Build the tracer provider (ratio sampler, exporter, request ID tagging) on `setup`.
+    - Start spans for the API, cache and repository layers through `span`, which returns a
+      shared no-op context manager while tracing is disabled or OpenTelemetry is missing.
+    - Flush pending spans on `shutdown`.
+
+    The provider is kept here rather than installed as the global OpenTelemetry provider,
+    which can be set only once per process: tests set up tracing again with their own exporter.
+    """
+
+    def __init__(self) -> None:
+        self.config = TracingConfig()
+        self.provider = None
+        self._tracer = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._tracer is not None
+
+    def setup(self, config: TracingConfig, exporter: Optional["SpanExporter"] = None) -> None:
+        """
+        Start tracing per `config`; a given `exporter` (e.g. an `InMemorySpanExporter` in
+        tests) replaces the configured one and receives each span as soon as it ends.
+        """
+        self.shutdown()
+        self.config = config
+        if not config.enabled:
+            return
+        if trace is None:
+            logger.warning("Tracing is enabled but OpenTelemetry is not installed; tracing stays off")
+            return
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": config.service_name}),
+            sampler=ParentBased(TraceIdRatioBased(config.sample_ratio)),
+        )
+        provider.add_span_processor(_RequestIdProcessor())
+        if exporter is not None:
+            provider.add_span_processor(SimpleSpanProcessor(exporter))
+        else:
+            exporter = self._make_exporter(config)
+            if exporter is None:
+                return
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+        self.provider = provider
+        self._tracer = provider.get_tracer("capacity-service")
+        logger.info(f"Tracing enabled (exporter={type(exporter).__name__}, sample_ratio={config.sample_ratio})")
+
+    @staticmethod
+    def _make_exporter(config: TracingConfig) -> Optional["SpanExporter"]:
+        if config.exporter == "console":
+            return ConsoleSpanExporter()
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning(
+                "Tracing exporter otlp needs opentelemetry-exporter-otlp-proto-http; tracing stays off"
+            )
+            return None
+        return OTLPSpanExporter(endpoint=config.endpoint)
+
+    def shutdown(self) -> None:
+        """Export the spans still buffered and stop tracing."""
+        provider, self.provider, self._tracer = self.provider, None, None
+        if provider is not None:
+            provider.shutdown()
+
+    def span(self, name: str, attributes: Optional[Mapping[str, Any]] = None) -> ContextManager:
+        """
+        Context manager running its block in a child span of the current one.
+
+        Yields the span; attributes known only at the end of the block are set on it
+        (cheaply skipped when `is_recording()` is false). Exceptions are recorded on the span.
+        Within an unsampled trace no span is started at all: the sampler follows the parent,
+        so it would not be recorded, and starting it costs more than the no-op.
+        """
+        if self._tracer is None:
+            return _DISABLED
+        parent = trace.get_current_span()
+        if not parent.is_recording() and parent.get_span_context().is_valid:
+            return _DISABLED
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+    def server_span(
+        self, name: str, headers: Iterable[tuple[bytes, bytes]], attributes: Mapping[str, Any]
+    ) -> ContextManager:
+        """Like `span`, for a request: continues the trace of a W3C `traceparent` header if any."""
+        if self._tracer is None:
+            return _DISABLED
+        carrier = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in headers
+            if key in (b"traceparent", b"tracestate")
+        }
+        return self._tracer.start_as_current_span(
+            name,
+            context=extract(carrier) if carrier else None,
+            kind=trace.SpanKind.SERVER,
+            attributes=attributes,
+        )
+
+    @staticmethod
+    def finish_server_span(span, method: str, route: str, status_code: int) -> None:
+        """Name a recording server span after its route template and set the response status."""
+        span.update_name(f"{method} {route}")
+        span.set_attributes({"http.route": route, "http.response.status_code": status_code})
+        if status_code >= 500:
+            span.set_status(trace.StatusCode.ERROR)
+
+
+# Global tracer instance
+tracing = Tracing()
+
+
+def init_tracing(config: Optional[TracingConfig] = None, exporter: Optional["SpanExporter"] = None) -> None:
+    """Set up the global tracer (configuration from the environment by default)."""
+    tracing.setup(config or TracingConfig.from_env(), exporter)
+
+
+def close_tracing() -> None:
+    """Flush and stop the global tracer."""
+    tracing.shutdown()
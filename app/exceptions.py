@@ -35,6 +35,26 @@ class CapacityValidationException(CapacityServiceException):
         super().__init__(message, status.HTTP_400_BAD_REQUEST)
 
 
+class CapacityUnsupportedMediaException(CapacityServiceException):
+    """Raised when an upload is sent in a format or encoding the service cannot read.
+
+    The message names the accepted content types so clients can resend correctly.
+    """
+
+    def __init__(self, message: str = "Unsupported media type"):
+        super().__init__(message, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+class CapacityNotAcceptableException(CapacityServiceException):
+    """Raised when a client accepts none of the formats a response can be produced in.
+
+    The message names the available content types so clients can negotiate again.
+    """
+
+    def __init__(self, message: str = "Not acceptable"):
+        super().__init__(message, status.HTTP_406_NOT_ACCEPTABLE)
+
+
 class CapacityDatabaseException(CapacityServiceException):
     """Raised when a database-related operation fails.
 
@@ -46,6 +66,19 @@ class CapacityDatabaseException(CapacityServiceException):
         super().__init__(message, status.HTTP_502_BAD_GATEWAY)
 
 
+class CapacityUnavailableException(CapacityServiceException):
+    """Raised when the service sheds a request because it is saturated.
+
+    Covers a database pool with no free connection within the acquire timeout and
+    routes over their concurrency limit. `retry_after` (seconds) is returned in the
+    Retry-After header so clients back off instead of queueing.
+    """
+
+    def __init__(self, message: str = "Service temporarily overloaded", retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__(message, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
 class CapacityUnexpectedException(CapacityServiceException):
     """Raised for unhandled or unexpected internal service errors.
 
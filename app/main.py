@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,25 +7,65 @@ from fastapi.exceptions import RequestValidationError
 import os
 from app.core import logging
 
-from app.db.pool import init_db_pool, close_db_pool
+from app.db.pool import init_db_pool, close_db_pool, db_pool
+from app.cache.pool import init_redis_pool, close_redis_pool, redis_pool
+from app.services.capacity_service import init_capacity_service, close_capacity_service
+from app.services.sailings_partitions import init_partition_maintenance, close_partition_maintenance
+from app.services.health_monitor import init_health_monitor, close_health_monitor
+from app.api.health import router as health_router
 from app.api.capacity import router as capacity_router
+from app.api.sailings import router as sailings_router
 from app.exceptions import CapacityServiceException
 from app.api.exception_handlers import (
     capacity_exception_handler,
     validation_exception_handler,
 )
-from app.middleware.logging import RequestLoggingMiddleware
-from app.middleware.metrics import MetricsMiddleware
+from app.middleware.instrumentation import InstrumentationConfig, InstrumentationMiddleware
 from app.core.monitoring import router as monitoring_router
+from app.core.tracing import init_tracing, close_tracing
 
 # Load environment variables early to configure logging and other dependencies
 load_dotenv()
 
-# Initialize logging with dynamic level control via environment variable
+# Initialize logging with dynamic level control via environment variable. Records are written
+# by a background thread; when its queue is full they are dropped unless the policy is "block".
+# LOG_LEAN_RECORDS turns off the collection of caller, thread and process details process-wide.
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-logging.setup_logging(LOG_LEVEL)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_QUEUE_FULL_POLICY = os.getenv("LOG_QUEUE_FULL_POLICY", "drop").lower()
+LOG_LEAN_RECORDS = os.getenv("LOG_LEAN_RECORDS", "false").lower() == "true"
+logging.setup_logging(
+    LOG_LEVEL, queue_size=LOG_QUEUE_SIZE, block=LOG_QUEUE_FULL_POLICY == "block", lean_records=LOG_LEAN_RECORDS
+)
 logger = logging.get_logger(__name__)
 
+# ------------------------------------------------------------
+# Application Lifespan
+# ------------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources once (DB pool, Redis pool, service) and release them on shutdown."""
+    logger.info("Starting app and initializing DB and Redis pools")
+    init_tracing()
+    await init_db_pool(app)
+    await init_redis_pool(app)
+    await init_capacity_service(app, redis=redis_pool.client, db_pool=db_pool.reader, listener=db_pool)
+    await init_partition_maintenance(app, db_pool=db_pool.pool)
+    await init_health_monitor(app, database=db_pool, redis=redis_pool.client)
+    logger.info("DB and Redis pools initialized")
+
+    yield
+
+    logger.info("Shutting down app and closing DB and Redis pools")
+    await close_health_monitor(app)
+    await close_partition_maintenance(app)
+    await close_capacity_service(app)
+    await close_redis_pool(app)
+    await close_db_pool(app)
+    close_tracing()
+    logger.info("DB and Redis pools closed")
+
+
 # ------------------------------------------------------------
 # FastAPI Application Setup
 # ------------------------------------------------------------
@@ -31,6 +73,7 @@ app = FastAPI(
     title="Capacity Service",
     description="Compute 4-week rolling average offered capacity (TEU) per week.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # ------------------------------------------------------------
@@ -52,35 +95,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Custom middleware for structured request logging and performance metrics
-app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(MetricsMiddleware)
-
-# ------------------------------------------------------------
-# Lifecycle Events
-# ------------------------------------------------------------
-@app.on_event("startup")
-async def on_startup():
-    """Initialize application resources such as DB connection pool."""
-    logger.info("Starting app and initializing DB pool")
-    await init_db_pool(app)
-    logger.info("DB pool initialized")
-
-
-@app.on_event("shutdown")
-async def on_shutdown():
-    """Gracefully close resources during application shutdown."""
-    logger.info("Shutting down app and closing DB pool")
-    await close_db_pool(app)
-    logger.info("DB pool closed")
-
-# ------------------------------------------------------------
-# Health Check Endpoint
-# ------------------------------------------------------------
-@app.get("/health", tags=["health"])
-async def health():
-    """Lightweight health probe for container orchestration systems."""
-    return {"status": "ok"}
+# Request IDs, performance metrics and (sampled) structured access logs in one pure ASGI layer
+app.add_middleware(InstrumentationMiddleware, config=InstrumentationConfig.from_env())
 
 # ------------------------------------------------------------
 # Routers Registration
@@ -88,5 +104,11 @@ async def health():
 # Monitoring routes expose metrics and system health insights
 app.include_router(monitoring_router, prefix="", tags=["monitoring"])
 
+# Liveness and readiness probes (readiness served from the background health monitor)
+app.include_router(health_router, prefix="")
+
 # Business logic endpoints for capacity computation
 app.include_router(capacity_router, prefix="", tags=["capacity"])
+
+# Bulk loading of sailings
+app.include_router(sailings_router, prefix="", tags=["sailings"])
@@ -0,0 +1,155 @@
+import os
+import re
+import time
+import uuid
+import random
+from typing import Optional
+
+from pydantic import BaseModel, Field
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import logging
+from app.core.monitoring import REQUEST_DURATION, REQUEST_COUNT
+from app.core.tracing import current_request_id, tracing
+
+logger = logging.get_logger(__name__)
+
+# Path label of requests that matched no route (keeps scanners from creating label series)
+UNMATCHED_ROUTE = "unmatched"
+
+# Incoming request IDs are reused only if they are short and made of safe characters
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+# ------------------------------------------------------------
+# Instrumentation Configuration
+# ------------------------------------------------------------
+class InstrumentationConfig(BaseModel):
+    """
+    Configuration of request instrumentation (request IDs, metrics and access logs).
+
+    Metrics cover every request; access logs may be sampled, except for server
+    errors and slow requests, which are always logged.
+    """
+    request_id_header: str = Field("X-Request-ID", description="Header carrying the request ID (in and out)")
+    log_sample_rate: float = Field(1.0, ge=0, le=1, description="Fraction of requests written to the access log")
+    log_slow_seconds: float = Field(1.0, ge=0, description="Requests at least this slow are always logged")
+
+    @classmethod
+    def from_env(cls) -> "InstrumentationConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            request_id_header=os.getenv("REQUEST_ID_HEADER", "X-Request-ID"),
+            log_sample_rate=float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0")),
+            log_slow_seconds=float(os.getenv("ACCESS_LOG_SLOW_SECONDS", "1.0")),
+        )
+
+
+# ------------------------------------------------------------
+# Request Instrumentation Middleware
+# ------------------------------------------------------------
+class InstrumentationMiddleware:
+    """
+    Pure ASGI middleware for request tracing, metrics and access logging.
+
+    Responsibilities:
+    - Assign each request an ID (reusing a well-formed incoming one), expose it as
+      `request.state.request_id` and return it in the response headers.
+    - Record request duration and count in Prometheus, labelled with the route template
+      (e.g. `/capacity`) rather than the raw path to keep label cardinality bounded.
+    - Write one structured access log line per request, optionally sampled.
+    - Run the request in a server span (see `app.core.tracing`) named after the route
+      template; the request ID is set on it and on every span started within.
+
+    Unlike `BaseHTTPMiddleware`, it wraps neither the request in a new task nor the
+    response body stream; it only observes the `http.response.start` message.
+    """
+
+    def __init__(self, app: ASGIApp, config: Optional[InstrumentationConfig] = None) -> None:
+        self.app = app
+        self.config = config or InstrumentationConfig()
+        self._header = self.config.request_id_header.lower().encode("latin-1")
+        # (method, route, status) -> (histogram child, counter child)
+        self._metrics: dict[tuple[str, str, int], tuple] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter_ns()
+        request_id = self._request_id(scope)
+        scope.setdefault("state", {})["request_id"] = request_id
+        header = (self._header, request_id.encode("latin-1"))
+        status_code = 500
+        request_id_token = current_request_id.set(request_id)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        try:
+            with tracing.server_span(
+                scope["method"], scope["headers"], {"http.request.method": scope["method"], "url.path": scope["path"]}
+            ) as span:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    if span.is_recording():
+                        tracing.finish_server_span(span, scope["method"], self._route_template(scope), status_code)
+        finally:
+            current_request_id.reset(request_id_token)
+            duration = (time.perf_counter_ns() - started) / 1e9
+            route = self._route_template(scope)
+            self._observe(scope["method"], route, status_code, duration)
+            if self._should_log(status_code, duration):
+                logger.info(
+                    "Request processed",
+                    extra={
+                        "request_id": request_id,
+                        "method": scope["method"],
+                        "route": route,
+                        "path": scope["path"],
+                        "status_code": status_code,
+                        "duration": round(duration, 4),
+                    },
+                )
+
+    def _request_id(self, scope: Scope) -> str:
+        """Reuse the caller's request ID when it is well-formed, otherwise generate one."""
+        for name, value in scope["headers"]:
+            if name == self._header:
+                incoming = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(incoming):
+                    return incoming
+                break
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _route_template(scope: Scope) -> str:
+        """Return the template of the matched route (set on the scope by the router)."""
+        route = scope.get("route")
+        if route is None:
+            return UNMATCHED_ROUTE
+        return getattr(route, "path_format", None) or getattr(route, "path", UNMATCHED_ROUTE)
+
+    def _observe(self, method: str, route: str, status_code: int, duration: float) -> None:
+        """Update request metrics, reusing labelled children (label lookup is not free)."""
+        key = (method, route, status_code)
+        children = self._metrics.get(key)
+        if children is None:
+            labels = {"method": method, "path": route, "status_code": status_code}
+            children = (REQUEST_DURATION.labels(**labels), REQUEST_COUNT.labels(**labels))
+            self._metrics[key] = children
+        children[0].observe(duration)
+        children[1].inc()
+
+    def _should_log(self, status_code: int, duration: float) -> bool:
+        """Errors and slow requests are always logged, the rest according to the sample rate."""
+        rate = self.config.log_sample_rate
+        if rate >= 1.0 or status_code >= 500 or duration >= self.config.log_slow_seconds:
+            return True
+        return rate > 0.0 and random.random() < rate
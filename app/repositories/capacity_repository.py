@@ -1,13 +1,35 @@
-from typing import List, Dict, Optional
-from datetime import date
+import time
+from typing import AsyncIterator, List, Dict, NamedTuple, Optional, Sequence, Tuple
+from datetime import date, timedelta
 import asyncpg
-from app.core.monitoring import monitor_query
+from app.core.monitoring import QUERY_DURATION, QUERY_ROWS, monitor_query
+from app.core.tracing import tracing
 from app.core import logging
+from app.db.pool import cursor_prepared, fetch_prepared, register_statement
 from app.exceptions import CapacityDatabaseException
 
 logger = logging.get_logger(__name__)
 
 
+class Corridor(NamedTuple):
+    """A trade lane identified by its origin and destination regions."""
+    origin: str
+    destination: str
+
+    def __str__(self) -> str:
+        return f"{self.origin}:{self.destination}"
+
+
+# Corridor served when callers do not specify one
+DEFAULT_CORRIDOR = Corridor("china_main", "north_europe_main")
+
+# Columns of the capacity query, in select order
+CAPACITY_COLUMNS = ("week_start_date", "week_no", "offered_capacity_teu", "offered_capacity_teu_4w_rolling_avg")
+
+# Corridor regions are lowercase identifiers (e.g. "china_main"); also keeps cache keys well-formed
+REGION_PATTERN = r"^[a-z0-9_]+$"
+
+
 class CapacityRepository:
     """
     Repository layer responsible for fetching weekly capacity data from the database.
@@ -15,59 +37,124 @@ class CapacityRepository:
     Responsibilities:
     - Encapsulates SQL queries and DB access.
     - Provides monitoring hooks for query performance.
+    - Runs its hot queries through statements prepared once per pooled connection.
     - Handles errors gracefully, translating DB errors into service-specific exceptions.
     """
 
     def __init__(self):
         # Prepare commonly used SQL queries once to avoid repeated string parsing
         self._prepare_queries()
+        # ...and have every pooled connection prepare them once to skip parse and plan per request
+        register_statement("fetch_capacity", self.capacity_query)
+        register_statement("fetch_weekly_voyages", self.weekly_voyages_query)
 
     def _prepare_queries(self) -> None:
         """
         Initializes the SQL query for retrieving weekly capacity with a 4-week rolling average.
 
-        - Uses CTEs for intermediate aggregation.
-        - Applies ROW_NUMBER() to deduplicate sailings per week per service.
+        The capacity query takes the corridor (origin, destination) as its first two parameters.
+
+        - Reads weeks fully inside the range from the `weekly_capacity` summary table.
+        - Aggregates the partial weeks at the range edges from `sailing_voyages`
+          (the latest sailing of each voyage, maintained by triggers on `sailings`).
+        - Adds the earlier sailings of voyages whose next sailing departs after the range
+          (`superseded_sailings`): each voyage counts at its latest sailing within the range.
         - Calculates a rolling 4-week average using a window function.
+
+        Also prepares the per-week voyages query that feeds the week-granular cache;
+        it takes parallel arrays of origins, destinations and week starts.
         """
         self.capacity_query = """
-        WITH base AS (
+        WITH weekly AS (
             SELECT 
-                date_trunc('week', origin_at_utc) AS week_start_date,
-                offered_capacity_teu,
-                ROW_NUMBER() OVER (
-                    PARTITION BY 
-                        service_version_and_roundtrip_identfiers,
-                        origin_service_version_and_master,
-                        destination_service_version_and_master
-                    ORDER BY origin_at_utc DESC
-                ) AS rn
-            FROM sailings
+                week_start_date,
+                offered_capacity_teu
+            FROM weekly_capacity
             WHERE 
-                origin = 'china_main'
-                AND destination = 'north_europe_main'
-                AND origin_at_utc BETWEEN $1 AND $2
-        ),
-        weekly_capacity AS (
+                origin = $1
+                AND destination = $2
+                AND week_start_date >= $5
+                AND week_start_date < $6
+                AND voyage_count > 0
+            UNION ALL
+            SELECT 
+                date_trunc('week', origin_at_utc)::date AS week_start_date,
+                SUM(offered_capacity_teu) AS offered_capacity_teu
+            FROM sailing_voyages
+            WHERE 
+                origin = $1
+                AND destination = $2
+                AND origin_at_utc BETWEEN $3 AND $4
+                AND (
+                    (origin_at_utc >= $3 AND origin_at_utc < $5::date)
+                    OR (origin_at_utc >= $6::date AND origin_at_utc <= $4)
+                )
+            GROUP BY 1
+            UNION ALL
             SELECT 
                 week_start_date,
                 SUM(offered_capacity_teu) AS offered_capacity_teu
-            FROM base
-            WHERE rn = 1
-            GROUP BY week_start_date
+            FROM superseded_sailings
+            WHERE 
+                origin = $1
+                AND destination = $2
+                AND origin_at_utc BETWEEN $3 AND $4
+                AND superseded_at > $4
+            GROUP BY 1
+        ),
+        totals AS (
+            SELECT 
+                week_start_date,
+                SUM(offered_capacity_teu)::bigint AS offered_capacity_teu
+            FROM weekly
+            GROUP BY 1
         )
         SELECT 
-            week_start_date::date AS week_start_date,
+            week_start_date,
             EXTRACT(WEEK FROM week_start_date)::int AS week_no,
             offered_capacity_teu,
             AVG(offered_capacity_teu) OVER (
                 ORDER BY week_start_date
                 ROWS BETWEEN 3 PRECEDING AND CURRENT ROW
             )::integer AS offered_capacity_teu_4w_rolling_avg
-        FROM weekly_capacity
+        FROM totals
         ORDER BY week_start_date;
         """
 
+        # Every sailing of a set of weeks that some range may count: the latest of each
+        # voyage (superseded_at NULL) and the superseded ones with their successor's
+        # departure. The week-granular cache filters them to the requested range and
+        # aggregates them in Python.
+        self.weekly_voyages_query = """
+        SELECT 
+            w.origin,
+            w.destination,
+            w.week_start_date,
+            v.origin_at_utc,
+            v.offered_capacity_teu,
+            NULL::timestamptz AS superseded_at
+        FROM unnest($1::text[], $2::text[], $3::date[]) AS w(origin, destination, week_start_date)
+        JOIN sailing_voyages v
+            ON v.origin = w.origin
+            AND v.destination = w.destination
+            AND v.origin_at_utc >= w.week_start_date
+            AND v.origin_at_utc < w.week_start_date + 7
+        UNION ALL
+        SELECT 
+            w.origin,
+            w.destination,
+            w.week_start_date,
+            s.origin_at_utc,
+            s.offered_capacity_teu,
+            s.superseded_at
+        FROM unnest($1::text[], $2::text[], $3::date[]) AS w(origin, destination, week_start_date)
+        JOIN superseded_sailings s
+            ON s.origin = w.origin
+            AND s.destination = w.destination
+            AND s.origin_at_utc >= w.week_start_date
+            AND s.origin_at_utc < w.week_start_date + 7;
+        """
+
     # ------------------------------------------------------------
     # Core Repository Method
     # ------------------------------------------------------------
@@ -77,21 +164,26 @@ class CapacityRepository:
             conn: asyncpg.Connection,
             start_date: date,
             end_date: date,
-            corridor: Optional[str] = None
+            corridor: Optional[Corridor] = None
     ) -> List[Dict]:
         """
-        Retrieves weekly capacity data within the specified date range.
+        Retrieves weekly capacity data for a corridor within the specified date range.
 
         - Returns a list of dictionaries representing each week.
-        - Decorated with a monitoring hook to track query performance.
+        - Cost grows with the number of weeks returned (plus superseded sailings in the range),
+          not the number of sailings.
+        - Decorated with a monitoring hook to track query performance; traced as a `db.query`
+          span holding the statement execution and the conversion of its rows.
 
         Raises:
             CapacityDatabaseException: For database errors or closed connections.
         """
+        corridor = corridor or DEFAULT_CORRIDOR
         try:
-            rows = await conn.fetch(self.capacity_query, start_date, end_date)
+            rows = await fetch_prepared(conn, "fetch_capacity", *self._capacity_args(start_date, end_date, corridor))
             # Convert asyncpg Record objects to plain dictionaries for downstream use
-            return [dict(r) for r in rows]
+            with tracing.span("db.convert_rows"):
+                return [dict(r) for r in rows]
 
         except Exception as e:
             # Structured logging for easier observability
@@ -101,7 +193,7 @@ class CapacityRepository:
                     "error_msg": str(e),
                     "start_date": str(start_date),
                     "end_date": str(end_date),
-                    "corridor": corridor
+                    "corridor": str(corridor)
                 }
             )
 
@@ -111,3 +203,140 @@ class CapacityRepository:
 
             # Reraise unexpected exceptions (could be programming errors)
             raise
+
+    @monitor_query("fetch_capacity_columns", rows=lambda columns: len(columns["week_start_date"]))
+    async def fetch_capacity_columns(
+            self,
+            conn: asyncpg.Connection,
+            start_date: date,
+            end_date: date,
+            corridor: Optional[Corridor] = None
+    ) -> Dict[str, Tuple]:
+        """
+        Retrieves the rows of `fetch_capacity` as columns: one tuple per field of `CAPACITY_COLUMNS`.
+
+        - Transposes the asyncpg records directly, without building a dict per row.
+        - Feeds the columnar (Arrow / Parquet / CSV) exports.
+
+        Raises:
+            CapacityDatabaseException: For database errors or closed connections.
+        """
+        corridor = corridor or DEFAULT_CORRIDOR
+        try:
+            rows = await fetch_prepared(conn, "fetch_capacity", *self._capacity_args(start_date, end_date, corridor))
+            with tracing.span("db.convert_rows"):
+                columns = list(zip(*rows)) or [()] * len(CAPACITY_COLUMNS)
+                return dict(zip(CAPACITY_COLUMNS, columns))
+
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error(
+                "Database error while fetching capacity columns",
+                extra={
+                    "error_msg": str(e),
+                    "start_date": str(start_date),
+                    "end_date": str(end_date),
+                    "corridor": str(corridor)
+                }
+            )
+            raise CapacityDatabaseException(f"Database operation failed: {e}") from e
+
+    @staticmethod
+    def _capacity_args(start_date: date, end_date: date, corridor: Corridor) -> tuple:
+        """Parameters of the capacity query."""
+        # Weeks lying entirely within [start_date, end_date] are served by the summary table.
+        # Within a single week full_weeks_from passes full_weeks_to: the edge branches then
+        # overlap, so the query also bounds them by the range itself.
+        full_weeks_from = start_date + timedelta(days=(7 - start_date.weekday()) % 7)
+        full_weeks_to = end_date - timedelta(days=end_date.weekday())
+        return corridor.origin, corridor.destination, start_date, end_date, full_weeks_from, full_weeks_to
+
+    async def stream_capacity(
+            self,
+            conn: asyncpg.Connection,
+            start_date: date,
+            end_date: date,
+            corridor: Optional[Corridor] = None,
+            batch_rows: int = 500,
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Yields the rows of `fetch_capacity` in batches of up to `batch_rows`, as they are read.
+
+        - Reads through a server-side cursor in a read-only transaction held until the
+          last batch, so only one batch is in memory at a time whatever the range.
+        - Records duration and rows under query name `stream_capacity` once exhausted.
+
+        Raises:
+            CapacityDatabaseException: For database errors or closed connections.
+        """
+        corridor = corridor or DEFAULT_CORRIDOR
+        start_time = time.time()
+        rows = 0
+        try:
+            async with conn.transaction(readonly=True):
+                cursor = await cursor_prepared(
+                    conn, "fetch_capacity", *self._capacity_args(start_date, end_date, corridor)
+                )
+                while batch := await cursor.fetch(batch_rows):
+                    rows += len(batch)
+                    yield [dict(r) for r in batch]
+
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error(
+                "Database error while streaming capacity",
+                extra={
+                    "error_msg": str(e),
+                    "start_date": str(start_date),
+                    "end_date": str(end_date),
+                    "corridor": str(corridor),
+                    "rows": rows,
+                }
+            )
+            raise CapacityDatabaseException(f"Database operation failed: {e}") from e
+
+        QUERY_DURATION.labels(query_name="stream_capacity").observe(time.time() - start_time)
+        QUERY_ROWS.labels(query_name="stream_capacity").observe(rows)
+
+    @monitor_query("fetch_weekly_voyages")
+    async def fetch_weekly_voyages(
+            self,
+            conn: asyncpg.Connection,
+            slots: Sequence[Tuple[Corridor, date]]
+    ) -> List[Dict]:
+        """
+        Retrieves the sailings departing in the given (corridor, week start) slots that
+        some range may count, for any mix of corridors, in one round-trip.
+
+        - Joins `sailing_voyages` and `superseded_sailings` against the slots passed as
+          `unnest()` arrays, each slot becoming index range scans on the corridor/date indexes.
+        - Returns one row per sailing, tagged with its slot, with `superseded_at` (None for
+          the latest sailing of its voyage); see `compose_weekly_capacity` for the aggregation.
+
+        Raises:
+            CapacityDatabaseException: For database errors or closed connections.
+        """
+        if not slots:
+            return []
+        try:
+            rows = await fetch_prepared(
+                conn,
+                "fetch_weekly_voyages",
+                [corridor.origin for corridor, _ in slots],
+                [corridor.destination for corridor, _ in slots],
+                [week for _, week in slots],
+            )
+            return [dict(r) for r in rows]
+
+        except Exception as e:
+            logger.error(
+                "Database error while fetching weekly voyages",
+                extra={
+                    "error_msg": str(e),
+                    "slots": len(slots),
+                    "corridors": sorted({str(corridor) for corridor, _ in slots})
+                }
+            )
+
+            if isinstance(e, (asyncpg.PostgresError, asyncpg.InterfaceError)) or "closed" in str(e).lower():
+                raise CapacityDatabaseException(f"Database operation failed: {e}") from e
+
+            raise
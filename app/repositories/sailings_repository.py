@@ -0,0 +1,243 @@
+import re
+from datetime import date
+from typing import AsyncIterable, Dict, Iterable, List, Tuple, Union
+
+import asyncpg
+
+from app.core.monitoring import monitor_query
+from app.core import logging
+from app.exceptions import CapacityDatabaseException
+
+logger = logging.get_logger(__name__)
+
+# Columns of a sailing as ingested (everything but the surrogate `id`), in COPY order
+SAILING_COLUMNS = (
+    "origin",
+    "destination",
+    "origin_port_code",
+    "destination_port_code",
+    "service_version_and_roundtrip_identfiers",
+    "origin_service_version_and_master",
+    "destination_service_version_and_master",
+    "origin_at_utc",
+    "offered_capacity_teu",
+)
+
+# Natural key of a sailing (unique index `uq_sailings_natural_key`): the digest of its voyage
+# identifiers (generated `voyage_key` column), its departure and its ports
+NATURAL_KEY_COLUMNS = ("voyage_key", "origin_at_utc", "origin_port_code", "destination_port_code")
+
+# Staged rows carry their position in the upload (later rows win over earlier duplicates)
+STAGING_COLUMNS = ("row_no",) + SAILING_COLUMNS
+
+# Monthly partitions of `sailings` (migrations/006_partition_sailings), named after their UTC month
+PARTITION_NAME = re.compile(r"^sailings_p(\d{4})_(\d{2})$")
+
+
+class SailingsRepository:
+    """
+    Repository layer responsible for writing sailings in bulk.
+
+    Responsibilities:
+    - Stream rows into a per-transaction staging table with `COPY` (binary protocol).
+    - Upsert the staged rows into `sailings` on their natural key in one set-based
+      statement, so the summary triggers refresh each touched voyage once per load.
+    - Create the monthly partitions of `sailings` ahead of time and for the months a
+      load writes, and detach old ones for archival.
+    - Translate DB errors into service-specific exceptions.
+    """
+
+    def __init__(self):
+        self._prepare_queries()
+
+    def _prepare_queries(self) -> None:
+        """
+        Initializes the staging and upsert statements.
+
+        - The staging table is temporary and dropped on commit (no WAL, no cleanup).
+          It computes the voyage digest like `sailings` does, so rows are compared on
+          16 bytes rather than on the long identifier texts.
+        - Duplicates within one upload keep the last occurrence (ON CONFLICT may not
+          touch a row twice in one statement).
+        - A staged row is inserted, or updates the sailing with the same natural key
+          when its capacity differs. The unique index arbitrates concurrent loads.
+        - Rows of archived voyages (`archived_voyages`, migration 008) are skipped and
+          counted: their summary is final.
+        - The months the upload covers get their partition first, so rows do not pile
+          up in the default partition.
+        """
+        key = ", ".join(NATURAL_KEY_COLUMNS)
+        columns = ", ".join(SAILING_COLUMNS)
+
+        self.create_staging_query = """
+        CREATE TEMP TABLE sailings_staging (
+            row_no BIGINT NOT NULL,
+            origin TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            origin_port_code TEXT NOT NULL,
+            destination_port_code TEXT NOT NULL,
+            service_version_and_roundtrip_identfiers TEXT NOT NULL,
+            origin_service_version_and_master TEXT NOT NULL,
+            destination_service_version_and_master TEXT NOT NULL,
+            origin_at_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+            offered_capacity_teu INTEGER NOT NULL,
+            voyage_key BYTEA NOT NULL GENERATED ALWAYS AS (sailing_voyage_digest(
+                origin,
+                destination,
+                service_version_and_roundtrip_identfiers,
+                origin_service_version_and_master,
+                destination_service_version_and_master
+            )) STORED
+        ) ON COMMIT DROP;
+        """
+
+        self.staged_partitions_query = """
+        SELECT create_sailings_partitions(min(origin_at_utc), max(origin_at_utc))
+        FROM sailings_staging;
+        """
+
+        self.partitions_ahead_query = """
+        SELECT create_sailings_partitions(now(), now() + make_interval(months => $1));
+        """
+
+        self.partitions_query = """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'sailings'::regclass;
+        """
+
+        # Ids issued so far: RETURNING cannot read xmax on a partitioned table, so rows
+        # inserted by the upsert are told from updated ones by their new, higher id (a row
+        # a concurrent load inserted in between and this one updates counts as inserted)
+        self.last_id_query = """
+        SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM sailings_id_seq;
+        """
+
+        self.upsert_query = f"""
+        WITH deduplicated AS (
+            SELECT DISTINCT ON ({key}) {columns}, voyage_key
+            FROM sailings_staging
+            ORDER BY {key}, row_no DESC
+        ),
+        incoming AS (
+            SELECT {columns}
+            FROM deduplicated d
+            WHERE NOT EXISTS (SELECT 1 FROM archived_voyages a WHERE a.voyage_key = d.voyage_key)
+        ),
+        upserted AS (
+            INSERT INTO sailings AS s ({columns})
+            SELECT {columns}
+            FROM incoming
+            ON CONFLICT ({key}) DO UPDATE
+            SET offered_capacity_teu = EXCLUDED.offered_capacity_teu
+            WHERE s.offered_capacity_teu <> EXCLUDED.offered_capacity_teu
+            RETURNING s.id > $1 AS inserted
+        )
+        SELECT
+            (SELECT count(*) FROM deduplicated) AS distinct_rows,
+            (SELECT count(*) FROM deduplicated) - (SELECT count(*) FROM incoming) AS archived,
+            count(*) FILTER (WHERE inserted) AS inserted,
+            count(*) FILTER (WHERE NOT inserted) AS updated
+        FROM upserted;
+        """
+
+    @monitor_query("bulk_upsert_sailings", rows=lambda counts: counts["distinct"])
+    async def bulk_upsert(
+            self,
+            conn: asyncpg.Connection,
+            records: Union[Iterable[Tuple], AsyncIterable[Tuple]],
+    ) -> Dict[str, int]:
+        """
+        Copies `(row_no, *SAILING_COLUMNS)` records into staging and upserts them into `sailings`.
+
+        - Records are consumed as they are produced, so an async generator keeps memory
+          bounded whatever the upload size.
+        - Runs in one transaction: an exception raised by `records` (e.g. an invalid row)
+          rolls the whole load back.
+        - Returns the number of staged, distinct, archived (skipped), inserted and updated rows.
+
+        Raises:
+            CapacityDatabaseException: For database errors or closed connections.
+        """
+        try:
+            async with conn.transaction():
+                await conn.execute(self.create_staging_query)
+                copied = await conn.copy_records_to_table(
+                    "sailings_staging", records=records, columns=STAGING_COLUMNS
+                )
+                # Temporary tables are never auto-analyzed; give the upsert real row estimates
+                await conn.execute("ANALYZE sailings_staging;")
+                await conn.execute(self.staged_partitions_query)
+                last_id = await conn.fetchval(self.last_id_query)
+                counts = await conn.fetchrow(self.upsert_query, last_id)
+            return {
+                "staged": int(copied.split()[-1]),
+                "distinct": counts["distinct_rows"],
+                "archived": counts["archived"],
+                "inserted": counts["inserted"],
+                "updated": counts["updated"],
+            }
+
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error("Database error while bulk loading sailings", extra={"error_msg": str(e)})
+            raise CapacityDatabaseException(f"Database operation failed: {e}") from e
+
+    # ------------------------------------------------------------
+    # Partition Maintenance
+    # ------------------------------------------------------------
+    async def create_partitions(self, conn: asyncpg.Connection, months_ahead: int) -> int:
+        """
+        Creates the missing partitions from the current month to `months_ahead` months later.
+
+        Returns the number of partitions created.
+
+        Raises:
+            CapacityDatabaseException: For database errors or closed connections.
+        """
+        try:
+            return await conn.fetchval(self.partitions_ahead_query, months_ahead)
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error("Database error while creating sailings partitions", extra={"error_msg": str(e)})
+            raise CapacityDatabaseException(f"Database operation failed: {e}") from e
+
+    async def detach_partitions(self, conn: asyncpg.Connection, before: date) -> List[str]:
+        """
+        Detaches the monthly partitions that end on or before `before` and returns their names.
+
+        - Each partition is detached in its own short transaction and stays as a standalone
+          table (same name) to archive or drop. Its month is not recreated: late sailings
+          of it stay in the default partition.
+        - The summary tables are left as they are: archived weeks keep their capacity.
+          The voyages of the partition are added to `archived_voyages` in the same
+          transaction, which freezes their summary rows (later sailings of those voyages
+          are not loaded, see `bulk_upsert`).
+
+        Raises:
+            CapacityDatabaseException: For database errors or closed connections.
+        """
+        try:
+            names = sorted(
+                name for (name,) in await conn.fetch(self.partitions_query)
+                if (match := PARTITION_NAME.match(name))
+                and _next_month(int(match[1]), int(match[2])) <= before
+            )
+            for name in names:
+                # Not CONCURRENTLY: it is not allowed next to a default partition. The archived
+                # table keeps the digests but no longer depends on the function computing them.
+                async with conn.transaction():
+                    await conn.execute(f'ALTER TABLE sailings DETACH PARTITION "{name}";')
+                    await conn.execute(
+                        f'INSERT INTO archived_voyages SELECT DISTINCT voyage_key FROM "{name}" ON CONFLICT DO NOTHING;'
+                    )
+                    await conn.execute(f'ALTER TABLE "{name}" ALTER COLUMN voyage_key DROP EXPRESSION;')
+                logger.info("Detached sailings partition", extra={"partition": name})
+            return names
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error("Database error while detaching sailings partitions", extra={"error_msg": str(e)})
+            raise CapacityDatabaseException(f"Database operation failed: {e}") from e
+
+
+def _next_month(year: int, month: int) -> date:
+    """First day of the month after `year`-`month`."""
+    return date(year + month // 12, month % 12 + 1, 1)
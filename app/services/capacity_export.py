@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import io
+import csv
+import os
+from typing import Callable, List, Mapping, NamedTuple, Optional, Sequence
+
+from app.exceptions import CapacityNotAcceptableException
+from app.repositories.capacity_repository import CAPACITY_COLUMNS
+
+try:  # Optional: Arrow IPC and Parquet exports
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+
+# Weekly capacity as columns: one sequence per name of `CAPACITY_COLUMNS`, in row order
+Columns = Mapping[str, Sequence]
+
+# Compression of Parquet exports (any codec pyarrow supports, or "none")
+PARQUET_COMPRESSION = os.getenv("CAPACITY_EXPORT_PARQUET_COMPRESSION", "zstd").lower()
+
+if pa is not None:
+    _ARROW_SCHEMA = pa.schema([
+        ("week_start_date", pa.date32()),
+        ("week_no", pa.int16()),
+        ("offered_capacity_teu", pa.int64()),
+        ("offered_capacity_teu_4w_rolling_avg", pa.int64()),
+    ])
+
+
+# ------------------------------------------------------------
+# Encoders
+# ------------------------------------------------------------
+def _arrow_table(columns: Columns) -> "pa.Table":
+    return pa.Table.from_pydict({name: columns[name] for name in CAPACITY_COLUMNS}, schema=_ARROW_SCHEMA)
+
+
+def encode_arrow(columns: Columns) -> bytes:
+    """Arrow IPC streaming format, read with `pyarrow.ipc.open_stream`."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, _ARROW_SCHEMA) as writer:
+        writer.write_table(_arrow_table(columns))
+    return sink.getvalue().to_pybytes()
+
+
+def encode_parquet(columns: Columns) -> bytes:
+    """Single row group Parquet file, compressed with `PARQUET_COMPRESSION`."""
+    sink = pa.BufferOutputStream()
+    pq.write_table(_arrow_table(columns), sink, compression=PARQUET_COMPRESSION)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_csv(columns: Columns) -> bytes:
+    """CSV with a header line; dates as YYYY-MM-DD."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CAPACITY_COLUMNS)
+    writer.writerows(zip(*(columns[name] for name in CAPACITY_COLUMNS)))
+    return buffer.getvalue().encode()
+
+
+# ------------------------------------------------------------
+# Formats and Content Negotiation
+# ------------------------------------------------------------
+class ExportFormat(NamedTuple):
+    """A columnar export format: its `format` parameter value, media type and encoder."""
+    name: str
+    media_type: str
+    extension: str
+    encode: Callable[[Columns], bytes]
+    requires_arrow: bool = False
+
+    @property
+    def available(self) -> bool:
+        return pa is not None or not self.requires_arrow
+
+
+EXPORT_FORMATS = {
+    "csv": ExportFormat("csv", "text/csv", "csv", encode_csv),
+    "arrow": ExportFormat("arrow", "application/vnd.apache.arrow.stream", "arrows", encode_arrow, True),
+    "parquet": ExportFormat("parquet", "application/vnd.apache.parquet", "parquet", encode_parquet, True),
+}
+
+# Served when the client accepts anything (or sends no Accept header)
+DEFAULT_EXPORT_FORMAT = EXPORT_FORMATS["csv"]
+
+_MEDIA_TYPES = {fmt.media_type: fmt for fmt in EXPORT_FORMATS.values()}
+_MEDIA_TYPES["application/x-parquet"] = EXPORT_FORMATS["parquet"]
+
+
+def _not_acceptable(requested: str) -> CapacityNotAcceptableException:
+    available = ", ".join(fmt.media_type for fmt in EXPORT_FORMATS.values() if fmt.available)
+    return CapacityNotAcceptableException(f"Cannot export as {requested}; available: {available}")
+
+
+def accepted_media_types(accept: Optional[str]) -> List[str]:
+    """
+    The media ranges of an Accept header the client accepts (quality above 0), lowercased,
+    best first (earliest first on ties).
+    """
+    ranges = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, *params = (item.strip() for item in part.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            ranges.append((-quality, position, media_type.lower()))
+    return [media_type for _, _, media_type in sorted(ranges)]
+
+
+def negotiate_export_format(accept: Optional[str], requested: Optional[str] = None) -> ExportFormat:
+    """
+    Pick the export format: the `requested` format name if given, otherwise the available
+    media type of `accept` with the highest quality (earliest first on ties).
+
+    Raises:
+        CapacityNotAcceptableException: Nothing acceptable is available (e.g. Parquet
+            without pyarrow installed).
+    """
+    if requested is not None:
+        fmt = EXPORT_FORMATS.get(requested)
+        if fmt is None or not fmt.available:
+            raise _not_acceptable(requested)
+        return fmt
+
+    if not accept:
+        return DEFAULT_EXPORT_FORMAT
+    for media_type in accepted_media_types(accept):
+        if media_type in ("*/*", "text/*"):
+            return DEFAULT_EXPORT_FORMAT
+        fmt = _MEDIA_TYPES.get(media_type)
+        if fmt is not None and fmt.available:
+            return fmt
+    raise _not_acceptable(accept)
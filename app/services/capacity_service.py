@@ -1,21 +1,75 @@
 import os
 import json
-import decimal
-from datetime import date, datetime
+import time
+import uuid
+import asyncio
+import hashlib
+from datetime import date
+from itertools import chain
+from typing import AsyncIterator, Iterable, Optional, Sequence, Union
 
 import asyncpg
+import orjson
 import redis.asyncio as aioredis
-from fastapi import HTTPException
+from fastapi import FastAPI, Request
 
+from app.cache.codec import CacheCodecConfig, EntryCodec
+from app.cache.invalidation import CAPACITY_CHANGES_CHANNEL, ChangeListenerConfig, parse_capacity_change
+from app.cache.local import LocalCache, LocalCacheConfig
+from app.cache.policy import CachePolicy, Freshness
+from app.cache.single_flight import CacheLockConfig, RedisLock, SingleFlight
+from app.db.pool import DatabasePool, ReadPool, max_staleness
 from app.exceptions import CapacityValidationException, CapacityDatabaseException
-from app.repositories.capacity_repository import CapacityRepository
-from app.core.monitoring import CACHE_HITS_COUNT, CACHE_MISSES_COUNT
+from app.repositories.capacity_repository import CapacityRepository, Corridor, DEFAULT_CORRIDOR
+from app.services.capacity_export import ExportFormat
+from app.services.weekly_capacity import (
+    NOT_SUPERSEDED,
+    Voyage,
+    compose_weekly_capacity,
+    compose_weekly_columns,
+    to_epoch_us,
+    weeks_in_range,
+)
+from app.core.monitoring import (
+    CACHE_HITS_COUNT,
+    CACHE_MISSES_COUNT,
+    CACHE_COALESCED_REQUESTS_COUNT,
+    CACHE_COALESCED_WAITERS,
+    CACHE_STALE_HITS_COUNT,
+    CACHE_REFRESH_COUNT,
+    CACHE_CHANGE_EVICTIONS_COUNT,
+)
 from app.core import logging
+from app.core.tracing import tracing
 
 logger = logging.get_logger(__name__)
 
-# Cache time-to-live for Redis in seconds (default: 6 hours)
-CACHE_TTL_SECONDS = int(os.getenv("CAPACITY_CACHE_TTL", 6 * 60 * 60))
+# Per-endpoint freshness of cached weeks (CAPACITY_CACHE_TTL/_GRACE/_BETA; batch overrides
+# with CAPACITY_BATCH_CACHE_*). Default: fresh for 6 hours, served stale for 1 more hour.
+CAPACITY_CACHE_POLICY = CachePolicy.from_env("capacity")
+BATCH_CACHE_POLICY = CachePolicy.from_env("capacity_batch", "CAPACITY_BATCH_CACHE", default=CAPACITY_CACHE_POLICY)
+
+# Largest export blob (bytes) kept in the L1 cache; bigger ones are rebuilt on every request
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("CAPACITY_EXPORT_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+# Rows read per round-trip when streaming a range (`stream_capacity_ndjson`)
+STREAM_BATCH_ROWS = int(os.getenv("CAPACITY_STREAM_BATCH_ROWS", "500"))
+
+# One cached unit: the voyages of a corridor departing in the week starting on the given Monday
+WeekSlot = tuple[Corridor, date]
+
+# Estimated in-memory size of a parsed cached week (entry dict + per-sailing (ts, teu, superseded) triple)
+_L1_ENTRY_BYTES = 300
+_L1_VOYAGE_BYTES = 176
+
+# Poll interval of the invalidation subscriber; below the Redis socket timeout
+_SUBSCRIBER_POLL_SECONDS = 0.5
+
+# How long a change notification keeps loads that started before it from caching their result
+_CHANGE_GUARD_SECONDS = 300.0
+
+# Keys per UNLINK (and per SCAN page when purging)
+_UNLINK_BATCH = 1000
 
 
 class CapacityService:
@@ -23,105 +77,755 @@ class CapacityService:
 
     This service layer isolates caching, validation, and repository interactions
     to maintain clean separation between API handlers and data-access logic.
+
+    Cache misses are protected against stampedes: identical concurrent loads in a
+    worker share one in-flight query, and (optionally) a Redis lock lets a single
+    worker of the deployment recompute a missing key.
+
+    Cached weeks record when and how fast they were computed. Stale weeks (within
+    the policy's grace window) and weeks picked for probabilistic early expiry are
+    served immediately and recomputed by a background task on its own pooled
+    connection, so readers rarely wait for the database.
+
+    Parsed weeks are also kept in a byte-bounded in-process L1 cache in front of
+    Redis. Every write to Redis is announced on a pub/sub channel so other workers
+    drop their L1 copies.
+
+    Committed writes to the database are announced by Postgres (LISTEN/NOTIFY) with
+    the corridor and week range they touched: only the overlapping weeks are evicted,
+    and the hot ones recomputed, so entries can live long without going stale.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        redis: Optional[aioredis.Redis] = None,
+        repo: Optional[CapacityRepository] = None,
+        lock_config: Optional[CacheLockConfig] = None,
+        db_pool: Optional[Union[asyncpg.Pool, ReadPool]] = None,
+        local_config: Optional[LocalCacheConfig] = None,
+        codec_config: Optional[CacheCodecConfig] = None,
+        change_config: Optional[ChangeListenerConfig] = None,
+    ):
         # Repository layer handles direct DB queries
-        self.repo = CapacityRepository()
-        # Initialize Redis connection (used for caching responses)
-        self.redis = self._init_redis()
+        self.repo = repo or CapacityRepository()
+        # Shared, pooled Redis client (owned by the app lifespan); None disables caching
+        self.redis = redis
+        # Versioned binary encoding of cached weeks
+        self.codec = EntryCodec(codec_config)
+        # In-process coalescing of identical loads
+        self.flights = SingleFlight()
+        # Optional cross-worker recomputation lock
+        self.lock_config = lock_config or CacheLockConfig()
+        self.lock = RedisLock(redis, self.lock_config.lock_ttl) if redis and self.lock_config.enabled else None
+        # Pool used by background refreshes (request connections are gone by then), possibly
+        # routed to read replicas; None disables them
+        self.db_pool = db_pool
+        self._refreshes: dict[tuple[WeekSlot, ...], asyncio.Task] = {}
+        # In-process L1 tier, only meaningful (and kept coherent) together with Redis
+        self.local_config = local_config or LocalCacheConfig()
+        self.local = (
+            LocalCache(self.local_config.max_bytes, self.local_config.ttl)
+            if redis and self.local_config.enabled
+            else None
+        )
+        # Identifies this worker's own invalidation messages
+        self.instance_id = uuid.uuid4().hex
+        self._subscriber: Optional[asyncio.Task] = None
+        # Database change notifications: when slots last changed (oldest first) or all of them did
+        self.change_config = change_config or ChangeListenerConfig()
+        self.change_listener: Optional[asyncio.Task] = None
+        self._changed_at: dict[WeekSlot, float] = {}
+        self._purged_at = float("-inf")
 
     # ------------------------------------------------------------
-    # Redis Initialization
+    # Helper Methods
     # ------------------------------------------------------------
-    def _init_redis(self) -> aioredis.Redis:
-        """Create a Redis client instance from environment configuration."""
-        redis_host = os.getenv("REDIS_HOST", "localhost")
-        redis_port = os.getenv("REDIS_PORT", "6379")
-        redis_db = int(os.getenv("REDIS_DB", "0"))
-        redis_password = os.getenv("REDIS_PASSWORD", None)
+    def _make_week_cache_key(self, corridor: Corridor, week: date) -> str:
+        """Generate a deterministic Redis cache key for the voyages of one corridor and week."""
+        return f"capacity:voyages:{corridor.origin}:{corridor.destination}:{week.isoformat()}"
+
+    def _make_response_cache_key(self, corridor: Corridor, start: date, end: date) -> str:
+        """Generate the L1 key of a pre-serialized `GET /capacity` response body."""
+        return f"capacity:response:{corridor.origin}:{corridor.destination}:{start.isoformat()}:{end.isoformat()}"
+
+    def _make_lock_key(self, slots: list[WeekSlot], purpose: str = "load") -> str:
+        """Generate the Redis lock key guarding the recomputation of a set of slots."""
+        digest = hashlib.sha1("|".join(self._make_week_cache_key(c, w) for c, w in slots).encode()).hexdigest()
+        return f"capacity:lock:{purpose}:{digest}"
+
+    def _make_entry(self, voyages: list[Voyage], computed_at: float, duration: float) -> dict:
+        """Build a cached week: its voyages plus when (`t`) and how fast (`d`) it was computed."""
+        return {"t": round(computed_at, 3), "d": round(duration, 4), "v": voyages}
+
+    def _serialize_week(self, entry: dict) -> bytes:
+        """Encode a cached week with the configured codec for Redis storage."""
+        return self.codec.encode(entry)
+
+    def _deserialize_week(self, value: bytes) -> Optional[dict]:
+        """Decode a cached week; entries in an unknown format are ignored (treated as misses)."""
+        return self.codec.decode(value)
+
+    async def _read_weeks(
+        self, slots: list[WeekSlot], policy: CachePolicy
+    ) -> Optional[dict[WeekSlot, list[Voyage]]]:
+        """Fetch cached (corridor, week) slots with a single MGET.
+
+        Returns the slots that may be served under `policy` (stale ones included), or
+        None if Redis is unavailable. Stale and early-expiring slots are handed to a
+        background refresh.
+        """
+        if not self.redis:
+            return None
+        keys = {slot: self._make_week_cache_key(*slot) for slot in slots}
+
+        # L1 first; only the remaining slots cost a Redis round-trip
+        entries: dict[WeekSlot, dict] = {}
+        if self.local is not None:
+            for slot in slots:
+                entry = self.local.get(keys[slot])
+                if entry is not None:
+                    entries[slot] = entry
+        remote = [slot for slot in slots if slot not in entries]
+
+        if remote:
+            read_at = time.monotonic()
+            with tracing.span("cache.read", {"cache.keys": len(remote)}) as span:
+                try:
+                    values = await self.redis.mget([keys[slot] for slot in remote])
+                except Exception as e:
+                    # Avoid interrupting business flow due to cache errors
+                    logger.warning(f"Redis unavailable, skipping cache: {e}")
+                    return None
+                for slot, value in zip(remote, values):
+                    entry = self._deserialize_week(value) if value is not None else None
+                    if entry is not None:
+                        entries[slot] = entry
+                        if not self._changed_since(slot, read_at):
+                            self._store_local(keys[slot], entry)
+                span.set_attribute("cache.hits", len(entries))
+
+        now = time.time()
+        cached: dict[WeekSlot, list[Voyage]] = {}
+        revalidate: dict[Freshness, list[WeekSlot]] = {Freshness.STALE: [], Freshness.EARLY: []}
+        for slot, entry in entries.items():
+            freshness = policy.freshness(entry["t"], entry["d"], now)
+            if freshness is Freshness.EXPIRED:
+                continue
+            cached[slot] = entry["v"]
+            if freshness in revalidate:
+                revalidate[freshness].append(slot)
+
+        stale = len(revalidate[Freshness.STALE])
+        CACHE_HITS_COUNT.inc(len(cached) - stale)
+        CACHE_STALE_HITS_COUNT.inc(stale)
+        CACHE_MISSES_COUNT.inc(len(slots) - len(cached))
+        logger.debug(
+            "Weekly cache lookup",
+            extra={
+                "policy": policy.name,
+                "corridors": len({c for c, _ in slots}),
+                "weeks": len(slots),
+                "cached_weeks": len(cached),
+                "stale_weeks": stale,
+                "l1_weeks": len(slots) - len(remote),
+            },
+        )
+
+        for freshness, refresh_slots in revalidate.items():
+            if refresh_slots:
+                self._schedule_refresh(refresh_slots, policy, freshness.value)
+        return cached
+
+    async def _fetch_weeks(
+        self, conn: asyncpg.Connection, slots: list[WeekSlot]
+    ) -> dict[WeekSlot, list[Voyage]]:
+        """Load the voyages of the given (corridor, week) slots in one query, grouped by slot."""
+        fetched: dict[WeekSlot, list[Voyage]] = {slot: [] for slot in slots}
+        for r in await self.repo.fetch_weekly_voyages(conn, slots):
+            slot = (Corridor(r["origin"], r["destination"]), r["week_start_date"])
+            superseded = r["superseded_at"]
+            fetched[slot].append((
+                to_epoch_us(r["origin_at_utc"]),
+                r["offered_capacity_teu"],
+                NOT_SUPERSEDED if superseded is None else to_epoch_us(superseded),
+            ))
+        return fetched
+
+    async def _write_weeks(
+        self, weeks: dict[WeekSlot, list[Voyage]], policy: CachePolicy, duration: float, loaded_at: float
+    ) -> None:
+        """Persist freshly loaded slots (empty ones included) in one pipelined round-trip.
+
+        Slots that changed since the load started (`loaded_at`, monotonic) are skipped:
+        the load may predate the change, and the eviction it triggered must stand.
+        """
+        weeks = {slot: voyages for slot, voyages in weeks.items() if not self._changed_since(slot, loaded_at)}
+        if not weeks:
+            return
+        computed_at = time.time()
+        keys = []
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for (corridor, week), voyages in weeks.items():
+                    key = self._make_week_cache_key(corridor, week)
+                    entry = self._make_entry(voyages, computed_at, duration)
+                    pipe.setex(key, policy.hard_ttl, self._serialize_week(entry))
+                    self._store_local(key, entry)
+                    keys.append(key)
+                # Other workers drop their now outdated L1 copies
+                pipe.publish(self.local_config.channel, self._make_invalidation(keys))
+                await pipe.execute()
+            logger.debug(f"Cached {len(weeks)} week(s) (policy={policy.name}, TTL={policy.hard_ttl}s)")
+        except Exception as e:
+            logger.warning(f"Failed to write weeks to Redis cache: {e}")
+
+    def _store_local(self, key: str, entry: dict) -> None:
+        """Keep a parsed week in the L1 cache (no-op when L1 is disabled)."""
+        if self.local is not None:
+            self.local.set(key, entry, _L1_ENTRY_BYTES + _L1_VOYAGE_BYTES * len(entry["v"]))
+
+    def _make_invalidation(self, keys: Optional[list[str]] = None) -> str:
+        """Encode an invalidation message for the given cache keys (all keys if None)."""
+        return json.dumps({"src": self.instance_id, "keys": keys})
+
+    async def _listen_invalidations(self) -> None:
+        """Drop L1 entries announced on the invalidation channel, resubscribing after errors."""
+        backoff = 1.0
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.local_config.channel)
+                # Messages may have been missed while (re)connecting
+                self.local.clear()
+                backoff = 1.0
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=_SUBSCRIBER_POLL_SECONDS
+                    )
+                    if message is not None:
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation subscriber failed, retrying in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                await pubsub.aclose()
+
+    def _apply_invalidation(self, data: bytes) -> None:
+        """Apply one invalidation message to the L1 cache (own messages are ignored)."""
+        try:
+            message = json.loads(data)
+        except ValueError:
+            logger.warning("Ignoring malformed cache invalidation message")
+            return
+        if message.get("src") == self.instance_id:
+            return
+        keys = message.get("keys")
+        if keys is None:
+            self.local.clear()
+        else:
+            self.local.invalidate(keys)
 
-        # Support both password-protected and open Redis instances
-        redis_url = f"redis://{':' + redis_password + '@' if redis_password else ''}{redis_host}:{redis_port}/{redis_db}"
+    def _changed_since(self, slot: WeekSlot, since: float) -> bool:
+        """Whether a change notification covered the slot at or after `since` (monotonic)."""
+        changed_at = self._changed_at.get(slot)
+        return since <= self._purged_at or (changed_at is not None and changed_at >= since)
 
+    def _record_changes(self, slots: Iterable[WeekSlot]) -> None:
+        """Remember when slots changed, forgetting changes older than `_CHANGE_GUARD_SECONDS`."""
+        now = time.monotonic()
+        changed = self._changed_at
+        for slot in slots:
+            changed.pop(slot, None)
+            changed[slot] = now
+        while changed:
+            oldest = next(iter(changed))
+            if changed[oldest] > now - _CHANGE_GUARD_SECONDS:
+                break
+            del changed[oldest]
+
+    def _schedule_refresh(self, slots: list[WeekSlot], policy: CachePolicy, trigger: str) -> None:
+        """Recompute slots in the background, at most once at a time per slot set in this worker."""
+        key = tuple(slots)
+        if self.db_pool is None or key in self._refreshes:
+            return
+        task = asyncio.create_task(self._refresh(slots, policy, trigger))
+        self._refreshes[key] = task
+        task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+
+    async def _refresh(self, slots: list[WeekSlot], policy: CachePolicy, trigger: str) -> None:
+        """Reload slots on a connection of their own and rewrite them in the cache."""
+        # With the cross-worker lock, only the worker claiming the refresh recomputes; the
+        # claim is not released and simply expires once the keys are fresh again
+        if self.lock and await self.lock.acquire(self._make_lock_key(slots, "refresh")) is None:
+            return
+        CACHE_REFRESH_COUNT.labels(trigger=trigger).inc(len(slots))
         try:
-            client = aioredis.from_url(
-                redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-            )
-            logger.info(f"Connected to Redis at {redis_host}:{redis_port}, DB={redis_db}")
-            return client
+            async with self.db_pool.acquire() as conn:
+                # Shares the flight of concurrent misses on the same slots
+                await self.flights.do(
+                    ("weeks", tuple(slots)), lambda: self._load_weeks(conn, slots, policy, write_back=True)
+                )
         except Exception as e:
-            # Graceful degradation: continue without Redis
-            logger.warning(f"Failed to initialize Redis: {e}")
+            logger.warning(f"Background cache refresh failed: {e}")
+
+    async def _fetch_range(
+        self, conn: asyncpg.Connection, start: date, end: date, corridor: Corridor, columnar: bool = False
+    ) -> Union[list[dict], dict[str, Sequence]]:
+        """Aggregate a whole range in the database (used when Redis is unavailable)."""
+        fetch = self.repo.fetch_capacity_columns if columnar else self.repo.fetch_capacity
+        try:
+            with tracing.span("db.fetch", {"capacity.corridor": str(corridor)}):
+                return await fetch(conn, start, end, corridor)
+        except Exception as exc:
+            raise CapacityDatabaseException(f"Database operation failed: {exc}") from exc
+
+    async def _wait_for_weeks(
+        self, slots: list[WeekSlot], policy: CachePolicy
+    ) -> Optional[dict[WeekSlot, list[Voyage]]]:
+        """Poll the cache until another worker has stored every slot, or give up after `wait_timeout`."""
+        keys = [self._make_week_cache_key(c, w) for c, w in slots]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_config.wait_timeout
+        CACHE_COALESCED_WAITERS.inc()
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(self.lock_config.poll_interval)
+                try:
+                    values = await self.redis.mget(keys)
+                except Exception as e:
+                    logger.warning(f"Redis unavailable while waiting for cache: {e}")
+                    return None
+                entries = [self._deserialize_week(value) if value is not None else None for value in values]
+                # Only accept entries the lock holder has just written, not the stale ones being replaced
+                now = time.time()
+                if all(
+                    e and policy.freshness(e["t"], e["d"], now) in (Freshness.FRESH, Freshness.EARLY)
+                    for e in entries
+                ):
+                    CACHE_COALESCED_REQUESTS_COUNT.labels(scope="redis_lock").inc()
+                    return {slot: entry["v"] for slot, entry in zip(slots, entries)}
             return None
+        finally:
+            CACHE_COALESCED_WAITERS.dec()
 
-    # ------------------------------------------------------------
-    # Helper Methods
-    # ------------------------------------------------------------
-    def _make_cache_key(self, start: date, end: date) -> str:
-        """Generate a deterministic Redis cache key for the given date range."""
-        return f"capacity:{start.isoformat()}:{end.isoformat()}"
+    async def _load_weeks(
+        self, conn: asyncpg.Connection, slots: list[WeekSlot], policy: CachePolicy, write_back: bool
+    ) -> dict[WeekSlot, list[Voyage]]:
+        """Load slots from the database and cache them, behind the cross-worker lock if enabled."""
+        lock_key = token = None
+        if self.lock and write_back:
+            lock_key = self._make_lock_key(slots)
+            token = await self.lock.acquire(lock_key)
+            if token is None:
+                # Another worker is computing these slots: reuse its result when it lands
+                waited = await self._wait_for_weeks(slots, policy)
+                if waited is not None:
+                    return waited
+                logger.warning("Timed out waiting for cache lock holder, loading from database")
 
-    def _serialize_for_cache(self, data: list[dict]) -> str:
-        """Convert data into a JSON-safe string for Redis storage.
+        try:
+            # A replica may not have replayed the latest writes yet: its result must not be
+            # cached over weeks that changed within its staleness bound
+            loaded_at = time.monotonic() - max_staleness(conn)
+            started = time.perf_counter()
+            try:
+                with tracing.span("db.fetch", {"capacity.weeks": len(slots)}):
+                    fetched = await self._fetch_weeks(conn, slots)
+            except Exception as exc:
+                raise CapacityDatabaseException(f"Database operation failed: {exc}") from exc
 
-        Handles non-JSON types such as Decimal and datetime objects.
-        """
+            # Persist fresh weeks in cache for future (overlapping) requests
+            if write_back:
+                with tracing.span("cache.write", {"capacity.weeks": len(fetched)}):
+                    await self._write_weeks(fetched, policy, time.perf_counter() - started, loaded_at)
+            return fetched
+        finally:
+            if token is not None:
+                await self.lock.release(lock_key, token)
 
-        def converter(obj):
-            if isinstance(obj, (date, datetime)):
-                return obj.isoformat()
-            if isinstance(obj, decimal.Decimal):
-                return float(obj)
-            raise TypeError(f"Type {type(obj)} not serializable")
+    async def _complete_weeks(
+        self,
+        conn: asyncpg.Connection,
+        slots: list[WeekSlot],
+        cached: dict[WeekSlot, list[Voyage]],
+        policy: CachePolicy,
+        write_back: bool = True,
+    ) -> dict[WeekSlot, list[Voyage]]:
+        """Load the slots missing from `cached`, coalescing identical concurrent loads."""
+        missing = [slot for slot in slots if slot not in cached]
+        if not missing:
+            return cached
 
-        return json.dumps(data, default=converter)
+        fetched = await self.flights.do(
+            ("weeks", tuple(missing)), lambda: self._load_weeks(conn, missing, policy, write_back)
+        )
+        cached.update(fetched)
+        return cached
 
     # ------------------------------------------------------------
-    # Core Business Method
+    # Core Business Methods
     # ------------------------------------------------------------
     async def get_capacity_rolling_average(
-        self, conn: asyncpg.Connection, start: date, end: date
+        self,
+        conn: asyncpg.Connection,
+        start: date,
+        end: date,
+        corridor: Corridor = DEFAULT_CORRIDOR,
+        policy: CachePolicy = CAPACITY_CACHE_POLICY,
     ) -> list[dict]:
-        """Retrieve offered capacity between two dates, using cache when available.
+        """Retrieve offered capacity of a corridor between two dates, using cache when available.
 
-        The method enforces input validation, uses Redis as a performance layer,
-        and falls back to the database if the cache is unavailable or empty.
+        The method enforces input validation and uses Redis as a week-granular
+        performance layer: the range is composed from cached weeks and only the
+        missing weeks are loaded from the database. Without Redis, the whole
+        aggregation runs in the database.
+
+        Traced as a `capacity.rolling_average` span, with `cache.read`, `db.fetch` and
+        `cache.write` children for the steps that run.
         """
         # Validate input date range before proceeding
         if start > end:
             raise CapacityValidationException("date_from must be <= date_to")
+        return await self._compose(conn, start, end, corridor, policy)
 
-        key = self._make_cache_key(start, end)
+    async def get_capacity_columns(
+        self,
+        conn: asyncpg.Connection,
+        start: date,
+        end: date,
+        corridor: Corridor = DEFAULT_CORRIDOR,
+        policy: CachePolicy = CAPACITY_CACHE_POLICY,
+    ) -> dict[str, Sequence]:
+        """Like `get_capacity_rolling_average`, but as columns (one sequence per field).
 
-        # Attempt cache read if Redis is available
-        if self.redis:
-            try:
-                cached = await self.redis.get(key)
-                if cached:
-                    logger.info(f"Cache hit for {key}")
-                    CACHE_HITS_COUNT.inc()
-                    return json.loads(cached)
-                CACHE_MISSES_COUNT.inc()
-                logger.info(f"Cache miss for {key}")
-            except Exception as e:
-                # Avoid interrupting business flow due to cache errors
-                logger.warning(f"Redis unavailable, skipping cache: {e}")
+        Built from the cached weeks or, without Redis, straight from the query's records,
+        without a dict per row.
+        """
+        if start > end:
+            raise CapacityValidationException("date_from must be <= date_to")
+        return await self._compose(conn, start, end, corridor, policy, columnar=True)
+
+    async def _compose(
+        self,
+        conn: asyncpg.Connection,
+        start: date,
+        end: date,
+        corridor: Corridor,
+        policy: CachePolicy,
+        columnar: bool = False,
+    ) -> Union[list[dict], dict[str, Sequence]]:
+        """Compose a range from cached and freshly loaded weeks, as rows or columns."""
+        slots = [(corridor, week) for week in weeks_in_range(start, end)]
+        with tracing.span(
+            "capacity.rolling_average", {"capacity.corridor": str(corridor), "capacity.weeks": len(slots)}
+        ):
+            cached = await self._read_weeks(slots, policy)
+
+            if cached is None:
+                # Redis unavailable → let the database aggregate the whole range
+                return await self.flights.do(
+                    ("range", corridor, start, end, columnar),
+                    lambda: self._fetch_range(conn, start, end, corridor, columnar),
+                )
+
+            weeks = await self._complete_weeks(conn, slots, cached, policy)
+            compose = compose_weekly_columns if columnar else compose_weekly_capacity
+            return compose(chain.from_iterable(weeks[slot] for slot in slots), start, end)
 
-        # Cache miss or Redis unavailable → query the database
+    async def get_capacity_json(
+        self,
+        conn: asyncpg.Connection,
+        start: date,
+        end: date,
+        corridor: Corridor = DEFAULT_CORRIDOR,
+        policy: CachePolicy = CAPACITY_CACHE_POLICY,
+    ) -> bytes:
+        """Like `get_capacity_rolling_average`, but return the final JSON response body.
+
+        Bodies are serialized once with orjson and kept in the L1 cache, tagged with
+        the cached weeks they were composed from: replacing or invalidating any of
+        those weeks drops the body. A fresh hit is returned without composing or
+        serializing anything.
+        """
+        if start > end:
+            raise CapacityValidationException("date_from must be <= date_to")
+
+        key = self._make_response_cache_key(corridor, start, end)
+        body = self._get_local_body(key, policy)
+        if body is not None:
+            return body
+
+        rows = await self.get_capacity_rolling_average(conn, start, end, corridor, policy)
+        with tracing.span("capacity.serialize", {"capacity.rows": len(rows)}):
+            body = orjson.dumps(rows)
+
+        self._store_local_body(key, body, corridor, start, end, policy)
+        return body
+
+    async def get_capacity_export(
+        self,
+        conn: asyncpg.Connection,
+        start: date,
+        end: date,
+        export_format: ExportFormat,
+        corridor: Corridor = DEFAULT_CORRIDOR,
+        policy: CachePolicy = CAPACITY_CACHE_POLICY,
+    ) -> bytes:
+        """Like `get_capacity_json`, but encoded in a columnar export format (Arrow, Parquet, CSV).
+
+        Exports are built from `get_capacity_columns` and cached in L1 as binary blobs per
+        format, under the same conditions as JSON bodies, up to `EXPORT_CACHE_MAX_BYTES` each.
+        """
+        if start > end:
+            raise CapacityValidationException("date_from must be <= date_to")
+
+        key = f"{self._make_response_cache_key(corridor, start, end)}:{export_format.name}"
+        body = self._get_local_body(key, policy)
+        if body is not None:
+            return body
+
+        columns = await self._compose(conn, start, end, corridor, policy, columnar=True)
+        with tracing.span("capacity.serialize", {"capacity.format": export_format.name}):
+            body = export_format.encode(columns)
+
+        if len(body) <= EXPORT_CACHE_MAX_BYTES:
+            self._store_local_body(key, body, corridor, start, end, policy)
+        return body
+
+    def _get_local_body(self, key: str, policy: CachePolicy) -> Optional[bytes]:
+        """Return a response body cached in L1 if it is still fresh under `policy`."""
+        if self.local is None:
+            return None
+        cached = self.local.get(key)
+        if cached is not None:
+            body, computed_at, duration = cached
+            if policy.freshness(computed_at, duration, time.time()) is Freshness.FRESH:
+                return body
+        return None
+
+    def _store_local_body(
+        self, key: str, body: bytes, corridor: Corridor, start: date, end: date, policy: CachePolicy
+    ) -> None:
+        """Cache a response body in L1, tagged with the weeks it was composed from."""
+        if self.local is None:
+            return
+        # Cache the body only while every source week is held (and fresh) in L1
+        week_keys = [self._make_week_cache_key(corridor, week) for week in weeks_in_range(start, end)]
+        sources = [self.local.peek(week_key) for week_key in week_keys]
+        if all(source is not None for source in sources):
+            computed_at = min(source["t"] for source in sources)
+            duration = max(source["d"] for source in sources)
+            if policy.freshness(computed_at, duration, time.time()) is Freshness.FRESH:
+                self.local.set(key, (body, computed_at, duration), _L1_ENTRY_BYTES + len(body), tags=week_keys)
+
+    async def stream_capacity_ndjson(
+        self,
+        conn: asyncpg.Connection,
+        start: date,
+        end: date,
+        corridor: Corridor = DEFAULT_CORRIDOR,
+        batch_rows: int = STREAM_BATCH_ROWS,
+    ) -> AsyncIterator[bytes]:
+        """Yield the rows of `get_capacity_rolling_average` as NDJSON, one chunk per batch read.
+
+        Meant for ranges too long to hold in memory: rows come straight from a database
+        cursor (the caches are bypassed) and are encoded and handed on batch by batch.
+        """
+        if start > end:
+            raise CapacityValidationException("date_from must be <= date_to")
+
+        async for batch in self.repo.stream_capacity(conn, start, end, corridor, batch_rows):
+            yield b"".join([orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in batch])
+
+    async def get_capacity_batch(
+        self,
+        conn: asyncpg.Connection,
+        items: Sequence[tuple[Corridor, date, date]],
+        policy: CachePolicy = BATCH_CACHE_POLICY,
+    ) -> list[list[dict]]:
+        """Answer many (corridor, start, end) queries at once, in request order.
+
+        The (corridor, week) slots of all items are deduplicated and resolved with
+        one Redis MGET, then one set-based query for every slot still missing
+        (the whole set when Redis is unavailable). Each item is then composed from
+        its slots exactly like `get_capacity_rolling_average`.
+        """
+        for _, start, end in items:
+            if start > end:
+                raise CapacityValidationException("date_from must be <= date_to")
+
+        item_slots = [[(corridor, week) for week in weeks_in_range(start, end)] for corridor, start, end in items]
+        slots = list(dict.fromkeys(chain.from_iterable(item_slots)))
+
+        cached = await self._read_weeks(slots, policy)
+        weeks = await self._complete_weeks(conn, slots, cached or {}, policy, write_back=cached is not None)
+
+        return [
+            compose_weekly_capacity(chain.from_iterable(weeks[slot] for slot in own_slots), start, end)
+            for own_slots, (_, start, end) in zip(item_slots, items)
+        ]
+
+    async def invalidate(self, slots: Optional[Iterable[WeekSlot]] = None) -> None:
+        """Drop cached weeks after their data changed, in Redis and in every worker's L1.
+
+        With `slots=None` only the L1 caches are cleared (Redis entries are left to
+        their TTL).
+        """
+        if not self.redis:
+            return
+        keys = None if slots is None else [self._make_week_cache_key(c, w) for c, w in slots]
+        if self.local is not None:
+            self.local.clear() if keys is None else self.local.invalidate(keys)
         try:
-            data = await self.repo.fetch_capacity(conn, start, end)
-        except Exception as exc:
-            raise CapacityDatabaseException(f"Database operation failed: {exc}") from exc
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if keys:
+                    pipe.unlink(*keys)
+                pipe.publish(self.local_config.channel, self._make_invalidation(keys))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish cache invalidation: {e}")
+
+    async def apply_capacity_changes(self, payloads: list[str]) -> None:
+        """Evict the cached weeks touched by committed database writes (change notifications).
 
-        # Persist fresh data in cache for future requests
-        if self.redis:
+        Runs in every worker: each drops its L1 copies and unlinks the Redis keys, so a
+        worker that cached a week just before hearing of the change still removes it,
+        and loads that started before the change do not cache their result. Weeks this
+        worker held in L1 are recomputed in the background (up to `refresh_limit`).
+        """
+        if not self.redis:
+            return
+        slots: dict[WeekSlot, None] = {}
+        for payload in payloads:
             try:
-                await self.redis.setex(key, CACHE_TTL_SECONDS, self._serialize_for_cache(data))
-                logger.info(f"Cached result for {key} (TTL={CACHE_TTL_SECONDS}s)")
-            except Exception as e:
-                logger.warning(f"Failed to write to Redis cache for {key}: {e}")
+                change = parse_capacity_change(payload)
+            except ValueError as e:
+                logger.warning(f"Ignoring capacity change notification: {e}")
+                continue
+            if change is None:
+                await self.purge()
+                return
+            corridor, first, last = change
+            slots.update(dict.fromkeys((corridor, week) for week in weeks_in_range(first, last)))
+        if not slots:
+            return
 
-        return data
+        self._record_changes(slots)
+        keys = [self._make_week_cache_key(c, w) for c, w in slots]
+        hot: list[WeekSlot] = []
+        if self.local is not None:
+            hot = [slot for slot, key in zip(slots, keys) if self.local.peek(key) is not None]
+            self.local.invalidate(keys)
+        CACHE_CHANGE_EVICTIONS_COUNT.inc(len(keys))
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for i in range(0, len(keys), _UNLINK_BATCH):
+                    pipe.unlink(*keys[i:i + _UNLINK_BATCH])
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to evict changed weeks from Redis: {e}")
+        logger.debug("Evicted changed weeks", extra={"weeks": len(keys), "hot_weeks": len(hot)})
+
+        if hot and self.change_config.refresh_limit:
+            self._schedule_refresh(hot[:self.change_config.refresh_limit], CAPACITY_CACHE_POLICY, "changed")
+
+    async def purge(self) -> None:
+        """Drop every cached week, in Redis and in the L1 caches of all workers.
+
+        Used when everything changed (TRUNCATE) or change notifications may have been
+        missed (the listener reconnected).
+        """
+        self._purged_at = time.monotonic()
+        self._changed_at.clear()
+        if not self.redis:
+            return
+        await self.invalidate()
+        purged = 0
+        try:
+            batch = []
+            async for key in self.redis.scan_iter(match="capacity:voyages:*", count=_UNLINK_BATCH):
+                batch.append(key)
+                if len(batch) == _UNLINK_BATCH:
+                    purged += await self.redis.unlink(*batch)
+                    batch = []
+            if batch:
+                purged += await self.redis.unlink(*batch)
+        except Exception as e:
+            logger.warning(f"Failed to purge cached weeks from Redis: {e}")
+        CACHE_CHANGE_EVICTIONS_COUNT.inc(purged)
+        logger.warning("Purged all cached weeks", extra={"weeks": purged})
+
+    # ------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------
+    async def start(self) -> None:
+        """Start the L1 invalidation subscriber (no-op without L1)."""
+        if self.local is not None and self._subscriber is None:
+            self._subscriber = asyncio.create_task(self._listen_invalidations())
+
+    async def aclose(self) -> None:
+        """Cancel the change listener, the invalidation subscriber and in-flight refreshes (on shutdown)."""
+        tasks = list(self._refreshes.values())
+        for task in (self.change_listener, self._subscriber):
+            if task is not None:
+                tasks.append(task)
+        self.change_listener = self._subscriber = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ------------------------------------------------------------
+# FastAPI Lifecycle Helpers
+# ------------------------------------------------------------
+async def init_capacity_service(
+    app: FastAPI,
+    redis: Optional[aioredis.Redis] = None,
+    db_pool: Optional[Union[asyncpg.Pool, ReadPool]] = None,
+    listener: Optional[DatabasePool] = None,
+) -> None:
+    """Create and start the application-scoped CapacityService and attach it to app state.
+
+    With a `listener` (and Redis), cached weeks are evicted on database change notifications.
+    """
+    change_config = ChangeListenerConfig.from_env()
+    service = CapacityService(
+        redis=redis,
+        lock_config=CacheLockConfig.from_env(),
+        db_pool=db_pool,
+        local_config=LocalCacheConfig.from_env(),
+        codec_config=CacheCodecConfig.from_env(),
+        change_config=change_config,
+    )
+    await service.start()
+    if listener is not None and redis is not None and change_config.enabled:
+        service.change_listener = await listener.listen(
+            CAPACITY_CHANGES_CHANNEL, service.apply_capacity_changes, on_reconnect=service.purge
+        )
+    app.state.capacity_service = service
+
+
+async def close_capacity_service(app: FastAPI) -> None:
+    """Stop background tasks before the pools they use are closed."""
+    service = getattr(app.state, "capacity_service", None)
+    if service is not None:
+        await service.aclose()
+
+
+# ------------------------------------------------------------
+# Dependency for Route Handlers
+# ------------------------------------------------------------
+def get_capacity_service(request: Request) -> CapacityService:
+    """
+    Return the CapacityService created once during application startup.
+
+    Raises:
+        RuntimeError: If the service has not been initialized.
+    """
+    service = getattr(request.app.state, "capacity_service", None)
+    if service is None:
+        raise RuntimeError("Capacity service is not initialized")
+    return service
@@ -0,0 +1,197 @@
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+import redis.asyncio as aioredis
+from fastapi import FastAPI
+from pydantic import BaseModel, Field
+
+from app.core import logging
+from app.core.monitoring import (
+    DEPENDENCY_UP,
+    DEPENDENCY_CHECK_DURATION,
+    DEPENDENCY_LAST_CHECK,
+    SERVICE_READY,
+)
+from app.db.pool import DatabasePool
+
+logger = logging.get_logger(__name__)
+
+
+# ------------------------------------------------------------
+# Health Monitor Configuration
+# ------------------------------------------------------------
+class HealthMonitorConfig(BaseModel):
+    """
+    Configuration of the background dependency checks behind `/ready`.
+
+    Probes never touch Postgres or Redis: they read the result of the last check, taken every
+    `interval_seconds`. A result older than `max_age_seconds` (the monitor itself is stuck)
+    makes the service unready.
+    """
+    interval_seconds: float = Field(5.0, gt=0, description="Seconds between two dependency checks")
+    timeout_seconds: float = Field(2.0, gt=0, description="Max duration (seconds) of one dependency check")
+    max_age_seconds: float = Field(30.0, gt=0, description="Age (seconds) past which the last check is not trusted")
+    redis_required: bool = Field(False, description="Report unready while Redis is down (else serve uncached)")
+
+    @classmethod
+    def from_env(cls) -> "HealthMonitorConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            interval_seconds=float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "5")),
+            timeout_seconds=float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2")),
+            max_age_seconds=float(os.getenv("HEALTH_MAX_AGE_SECONDS", "30")),
+            redis_required=os.getenv("HEALTH_REDIS_REQUIRED", "false").lower() in ("1", "true", "yes"),
+        )
+
+
+class DependencyHealth(NamedTuple):
+    """Outcome of one dependency check."""
+    status: str  # "ok", "saturated" (Postgres reachable, no free connection), "down" or "disabled"
+    checked_at: float  # Unix time
+    duration_seconds: float
+    error: Optional[str] = None
+
+
+# ------------------------------------------------------------
+# Health Monitor
+# ------------------------------------------------------------
+class HealthMonitor:
+    """
+    Checks the service dependencies in the background and keeps the last results in memory.
+
+    Responsibilities:
+    - Check Postgres (`DatabasePool.health_snapshot`) and Redis (PING) concurrently, each bounded
+      by `timeout_seconds`, every `interval_seconds`.
+    - Decide readiness from the cached results: Postgres must answer; a saturated pool stays
+      ready (overload is shed per request with 503s). Redis is optional unless `redis_required`,
+      since capacity reads fall back to Postgres without it.
+    - Export dependency status, check duration and time through Prometheus.
+    - Log status changes only, not every failed check.
+    """
+
+    def __init__(
+            self,
+            database: DatabasePool,
+            redis: Optional[aioredis.Redis],
+            config: Optional[HealthMonitorConfig] = None,
+    ):
+        self.database = database
+        self.redis = redis
+        self.config = config or HealthMonitorConfig()
+        self.dependencies: dict[str, DependencyHealth] = {}
+        self._checked_at: Optional[float] = None  # monotonic time of the last completed check
+        self._task: Optional[asyncio.Task] = None
+        SERVICE_READY.set_function(lambda: 1 if self.ready else 0)
+
+    async def _check_postgres(self) -> str:
+        health = await self.database.health_snapshot()
+        if health.healthy:
+            return "ok"
+        return "saturated" if health.saturated else "down"
+
+    async def _check_redis(self) -> str:
+        if self.redis is None:
+            return "disabled"
+        await self.redis.ping()
+        return "ok"
+
+    async def _check(self, name: str, probe: Callable[[], Awaitable[str]]) -> DependencyHealth:
+        started = time.perf_counter()
+        try:
+            status, error = await asyncio.wait_for(probe(), self.config.timeout_seconds), None
+        except asyncio.TimeoutError:
+            status, error = "down", f"no answer within {self.config.timeout_seconds}s"
+        except Exception as e:
+            status, error = "down", str(e) or type(e).__name__
+        result = DependencyHealth(status, time.time(), time.perf_counter() - started, error)
+
+        previous = self.dependencies.get(name)
+        if previous is None or previous.status != status:
+            log = logger.info if status in ("ok", "disabled") else logger.warning
+            log("Dependency status changed", extra={"dependency": name, "status": status, "error_msg": error})
+        DEPENDENCY_UP.labels(dependency=name).set(1 if status == "ok" else 0)
+        DEPENDENCY_CHECK_DURATION.labels(dependency=name).set(result.duration_seconds)
+        DEPENDENCY_LAST_CHECK.labels(dependency=name).set(result.checked_at)
+        return result
+
+    async def check(self) -> dict[str, DependencyHealth]:
+        """Check every dependency now and cache the results."""
+        postgres, redis = await asyncio.gather(
+            self._check("postgres", self._check_postgres),
+            self._check("redis", self._check_redis),
+        )
+        self.dependencies = {"postgres": postgres, "redis": redis}
+        self._checked_at = time.monotonic()
+        return self.dependencies
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the last completed check (None before the first one)."""
+        return None if self._checked_at is None else time.monotonic() - self._checked_at
+
+    @property
+    def ready(self) -> bool:
+        """Whether the cached results (recent enough) allow serving traffic."""
+        age = self.age
+        if age is None or age > self.config.max_age_seconds:
+            return False
+        if self.dependencies["postgres"].status not in ("ok", "saturated"):
+            return False
+        return not self.config.redis_required or self.dependencies["redis"].status == "ok"
+
+    def report(self) -> dict:
+        """Readiness and per-dependency results as served by `/ready`."""
+        age = self.age
+        return {
+            "status": "ready" if self.ready else "unready",
+            "age_seconds": None if age is None else round(age, 3),
+            "dependencies": {
+                name: {
+                    "status": result.status,
+                    "checked_at": result.checked_at,
+                    "duration_seconds": round(result.duration_seconds, 4),
+                    **({"error": result.error} if result.error else {}),
+                }
+                for name, result in self.dependencies.items()
+            },
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.interval_seconds)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning("Health check failed", extra={"error_msg": str(e)})
+
+    def start(self) -> None:
+        """Start the periodic checks."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Cancel the checks (on shutdown)."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+# ------------------------------------------------------------
+# FastAPI Lifecycle Helpers
+# ------------------------------------------------------------
+async def init_health_monitor(app: FastAPI, database: DatabasePool, redis: Optional[aioredis.Redis]) -> None:
+    """Run a first check (so the first probe is answered), start the monitor and attach it to app state."""
+    monitor = HealthMonitor(database, redis, HealthMonitorConfig.from_env())
+    await monitor.check()
+    monitor.start()
+    app.state.health_monitor = monitor
+
+
+async def close_health_monitor(app: FastAPI) -> None:
+    """Stop the monitor before the pools it checks are closed."""
+    monitor = getattr(app.state, "health_monitor", None)
+    if monitor is not None:
+        await monitor.aclose()
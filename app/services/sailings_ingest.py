@@ -0,0 +1,288 @@
+import io
+import re
+import csv
+import zlib
+import time
+import codecs
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, AsyncIterable, AsyncIterator, List, Optional, Sequence, Tuple
+
+import asyncpg
+import orjson
+from pydantic import BaseModel
+
+from app.core import logging
+from app.core.monitoring import INGESTED_ROWS_COUNT
+from app.exceptions import CapacityValidationException
+from app.repositories.capacity_repository import REGION_PATTERN
+from app.repositories.sailings_repository import SAILING_COLUMNS, SailingsRepository
+
+logger = logging.get_logger(__name__)
+
+# Rejected rows listed in a report (the count covers all of them)
+MAX_REPORTED_ERRORS = 20
+
+# Upper bound of buffered text without a complete record (bounds memory on malformed input)
+MAX_RECORD_CHARS = 1024 * 1024
+
+# Decompressed bytes produced per step (bounds memory on highly compressible uploads)
+_GUNZIP_STEP = 1024 * 1024
+
+_REGION = re.compile(REGION_PATTERN)
+_TEXT_COLUMNS = SAILING_COLUMNS[:7]
+_MAX_TEU = 2**31 - 1  # INTEGER column
+
+
+class IngestFormat(str, Enum):
+    """Supported upload formats."""
+    CSV = "csv"        # header row with the sailing column names (any case), as in data/sailings_sample.csv
+    NDJSON = "ndjson"  # one JSON object per line, keyed by the sailing column names
+
+
+class ErrorPolicy(str, Enum):
+    """What to do with a row that fails validation."""
+    ABORT = "abort"  # reject the whole upload; nothing is written
+    SKIP = "skip"    # load the valid rows and report the rejected ones
+
+
+class IngestReport(BaseModel):
+    """Outcome of a bulk load."""
+    format: IngestFormat
+    received: int
+    rejected: int
+    inserted: int
+    updated: int
+    archived: int
+    unchanged: int
+    errors: List[str]
+    duration_seconds: float
+    rows_per_second: float
+
+
+class SailingRowError(ValueError):
+    """A row that cannot be loaded (reported with its row number)."""
+
+
+# ------------------------------------------------------------
+# Row Validation
+# ------------------------------------------------------------
+def parse_sailing(values: Sequence[Any]) -> Tuple:
+    """Validate the raw values of one sailing (in `SAILING_COLUMNS` order) and convert them for COPY."""
+    for column, value in zip(_TEXT_COLUMNS, values):
+        if not isinstance(value, str) or not value.strip():
+            raise SailingRowError(f"'{column}' must be a non-empty string")
+    origin, destination = values[0], values[1]
+    if not _REGION.match(origin) or not _REGION.match(destination):
+        raise SailingRowError("'origin' and 'destination' must be lowercase region identifiers")
+    return (*values[:7], _parse_timestamp(values[7]), _parse_teu(values[8]))
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    if not isinstance(value, str):
+        raise SailingRowError("'origin_at_utc' must be an ISO 8601 timestamp")
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise SailingRowError(f"'origin_at_utc' is not an ISO 8601 timestamp: {value!r}") from None
+    # Feeds carry UTC times, usually without an offset
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _parse_teu(value: Any) -> int:
+    if isinstance(value, str):
+        try:
+            value = int(value.strip())
+        except ValueError:
+            raise SailingRowError(f"'offered_capacity_teu' is not an integer: {value!r}") from None
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= _MAX_TEU:
+        raise SailingRowError("'offered_capacity_teu' must be an integer between 0 and 2147483647")
+    return value
+
+
+# ------------------------------------------------------------
+# Streaming Parsers
+# ------------------------------------------------------------
+async def gunzip(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Decompress a gzip stream chunk by chunk (at most `_GUNZIP_STEP` bytes at a time)."""
+    decompressor = zlib.decompressobj(wbits=31)
+    try:
+        async for chunk in chunks:
+            while chunk:
+                data = decompressor.decompress(chunk, _GUNZIP_STEP)
+                if data:
+                    yield data
+                chunk = decompressor.unconsumed_tail
+        tail = decompressor.flush()
+    except zlib.error as e:
+        raise CapacityValidationException(f"Upload is not valid gzip: {e}") from e
+    if not decompressor.eof:
+        raise CapacityValidationException("Upload is not valid gzip: truncated stream")
+    if tail:
+        yield tail
+
+
+async def _complete_text(chunks: AsyncIterable[bytes], split_at) -> AsyncIterator[str]:
+    """Decode UTF-8 chunks and yield text cut after the last complete record (per `split_at`)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        try:
+            pending += decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise CapacityValidationException(f"Upload is not valid UTF-8: {e}") from e
+        cut = split_at(pending)
+        if cut:
+            yield pending[:cut]
+            pending = pending[cut:]
+        elif len(pending) > MAX_RECORD_CHARS:
+            raise CapacityValidationException(f"Record longer than {MAX_RECORD_CHARS} characters")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _csv_split_at(text: str) -> int:
+    """Position after the last newline that is not inside a quoted field (0 if none)."""
+    cut = text.rfind("\n")
+    # An odd number of quotes before the newline means it belongs to a quoted field
+    while cut >= 0 and text.count('"', 0, cut) % 2:
+        cut = text.rfind("\n", 0, cut)
+    return cut + 1
+
+
+def _lines_split_at(text: str) -> int:
+    return text.rfind("\n") + 1
+
+
+async def iter_csv(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield `(row_no, values in SAILING_COLUMNS order)` per CSV record, or a `SailingRowError`."""
+    indices: Optional[List[int]] = None
+    row_no = 0
+    async for text in _complete_text(chunks, _csv_split_at):
+        for row in csv.reader(io.StringIO(text)):
+            if indices is None:
+                header = {name.strip().lower(): i for i, name in enumerate(row)}
+                missing = [c for c in SAILING_COLUMNS if c not in header]
+                if missing:
+                    raise CapacityValidationException(f"CSV header is missing columns: {', '.join(missing)}")
+                indices = [header[c] for c in SAILING_COLUMNS]
+                width = len(row)
+                continue
+            row_no += 1
+            if len(row) != width:
+                if not row:  # blank line
+                    row_no -= 1
+                    continue
+                yield row_no, SailingRowError(f"expected {width} fields, got {len(row)}")
+                continue
+            yield row_no, [row[i] for i in indices]
+    if indices is None:
+        raise CapacityValidationException("CSV upload has no header row")
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield `(line_no, values in SAILING_COLUMNS order)` per NDJSON line, or a `SailingRowError`."""
+    line_no = 0
+    async for text in _complete_text(chunks, _lines_split_at):
+        for line in text.splitlines():
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                obj = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                yield line_no, SailingRowError("not a valid JSON object")
+                continue
+            if not isinstance(obj, dict):
+                yield line_no, SailingRowError("not a valid JSON object")
+                continue
+            obj = {key.lower(): value for key, value in obj.items()}
+            yield line_no, [obj.get(c) for c in SAILING_COLUMNS]
+
+
+# ------------------------------------------------------------
+# Ingestion Service
+# ------------------------------------------------------------
+class SailingsIngestService:
+    """
+    Streams uploaded sailings into PostgreSQL.
+
+    Responsibilities:
+    - Parse CSV or NDJSON chunk by chunk and validate every row as it streams by.
+    - Feed valid rows straight into `COPY` (through the repository's staging table),
+      so memory stays bounded whatever the upload size.
+    - Apply the error policy: abort the whole load, or skip and report invalid rows.
+    - Report row counts and throughput (rows per second).
+    """
+
+    def __init__(self, repo: Optional[SailingsRepository] = None):
+        self.repo = repo or SailingsRepository()
+
+    async def ingest(
+        self,
+        conn: asyncpg.Connection,
+        chunks: AsyncIterable[bytes],
+        fmt: IngestFormat,
+        on_error: ErrorPolicy = ErrorPolicy.ABORT,
+    ) -> IngestReport:
+        """Load an upload into `sailings` (insert new rows, update changed capacities).
+
+        Raises:
+            CapacityValidationException: On a malformed upload, or an invalid row under `ErrorPolicy.ABORT`.
+            CapacityDatabaseException: For database errors.
+        """
+        rows = iter_csv(chunks) if fmt is IngestFormat.CSV else iter_ndjson(chunks)
+        received = rejected = 0
+        errors: List[str] = []
+        started = time.perf_counter()
+
+        async def records() -> AsyncIterator[Tuple]:
+            nonlocal received, rejected
+            async for row_no, values in rows:
+                received += 1
+                try:
+                    if isinstance(values, SailingRowError):
+                        raise values
+                    yield (row_no, *parse_sailing(values))
+                except SailingRowError as e:
+                    if on_error is ErrorPolicy.ABORT:
+                        raise CapacityValidationException(f"Row {row_no}: {e}") from e
+                    rejected += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append(f"Row {row_no}: {e}")
+
+        counts = await self.repo.bulk_upsert(conn, records())
+        duration = time.perf_counter() - started
+
+        unchanged = received - rejected - counts["archived"] - counts["inserted"] - counts["updated"]
+        INGESTED_ROWS_COUNT.labels(outcome="inserted").inc(counts["inserted"])
+        INGESTED_ROWS_COUNT.labels(outcome="updated").inc(counts["updated"])
+        INGESTED_ROWS_COUNT.labels(outcome="archived").inc(counts["archived"])
+        INGESTED_ROWS_COUNT.labels(outcome="unchanged").inc(unchanged)
+        INGESTED_ROWS_COUNT.labels(outcome="rejected").inc(rejected)
+        report = IngestReport(
+            format=fmt,
+            received=received,
+            rejected=rejected,
+            inserted=counts["inserted"],
+            updated=counts["updated"],
+            archived=counts["archived"],
+            unchanged=unchanged,
+            errors=errors,
+            duration_seconds=round(duration, 3),
+            rows_per_second=round(received / duration if duration else 0.0, 1),
+        )
+        logger.info("Sailings bulk load completed", extra=report.model_dump(exclude={"errors"}, mode="json"))
+        return report
+
+
+# ------------------------------------------------------------
+# Dependency for Route Handlers
+# ------------------------------------------------------------
+_ingest_service = SailingsIngestService()
+
+
+def get_sailings_ingest_service() -> SailingsIngestService:
+    """Return the (stateless) ingestion service shared by all requests."""
+    return _ingest_service
@@ -0,0 +1,110 @@
+import os
+import asyncio
+from typing import Optional
+
+import asyncpg
+from fastapi import FastAPI
+from pydantic import BaseModel, Field
+
+from app.core import logging
+from app.repositories.sailings_repository import SailingsRepository
+
+logger = logging.get_logger(__name__)
+
+
+# ------------------------------------------------------------
+# Partition Maintenance Configuration
+# ------------------------------------------------------------
+class PartitionMaintenanceConfig(BaseModel):
+    """
+    Configuration of the background creation of future `sailings` partitions.
+
+    Every `interval_seconds` the partitions from the current month to `months_ahead`
+    months later are created if missing (one check per month when they exist).
+    """
+    enabled: bool = Field(True, description="Create future sailings partitions in the background")
+    months_ahead: int = Field(3, ge=0, description="Months after the current one that must have a partition")
+    interval_seconds: float = Field(6 * 3600, gt=0, description="Seconds between two checks")
+
+    @classmethod
+    def from_env(cls) -> "PartitionMaintenanceConfig":
+        """Load configuration from environment variables (all optional)."""
+        return cls(
+            enabled=os.getenv("SAILINGS_PARTITIONS_MAINTAIN", "true").lower() in ("1", "true", "yes"),
+            months_ahead=int(os.getenv("SAILINGS_PARTITIONS_MONTHS_AHEAD", "3")),
+            interval_seconds=float(os.getenv("SAILINGS_PARTITIONS_INTERVAL_SECONDS", str(6 * 3600))),
+        )
+
+
+# ------------------------------------------------------------
+# Partition Maintainer
+# ------------------------------------------------------------
+class SailingsPartitionMaintainer:
+    """
+    Keeps monthly partitions of `sailings` ready before their sailings arrive.
+
+    Responsibilities:
+    - Create the partitions of the coming months on startup and periodically after.
+    - Log and retry on the next tick when the database is unavailable.
+
+    Every worker runs it; concurrent runs are serialized in the database.
+    """
+
+    def __init__(
+            self,
+            db_pool: asyncpg.Pool,
+            config: Optional[PartitionMaintenanceConfig] = None,
+            repository: Optional[SailingsRepository] = None,
+    ):
+        self.db_pool = db_pool
+        self.config = config or PartitionMaintenanceConfig()
+        self.repository = repository or SailingsRepository()
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """Create the missing partitions now and return how many were created."""
+        async with self.db_pool.acquire() as conn:
+            created = await self.repository.create_partitions(conn, self.config.months_ahead)
+        if created:
+            logger.info("Created sailings partitions", extra={"partitions": created})
+        return created
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning("Sailings partition maintenance failed", extra={"error_msg": str(e)})
+            await asyncio.sleep(self.config.interval_seconds)
+
+    def start(self) -> None:
+        """Start the periodic maintenance task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Cancel the maintenance task (on shutdown)."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+# ------------------------------------------------------------
+# FastAPI Lifecycle Helpers
+# ------------------------------------------------------------
+async def init_partition_maintenance(app: FastAPI, db_pool: Optional[asyncpg.Pool]) -> None:
+    """Start the partition maintainer (unless disabled) and attach it to app state."""
+    config = PartitionMaintenanceConfig.from_env()
+    if db_pool is None or not config.enabled:
+        return
+    maintainer = SailingsPartitionMaintainer(db_pool, config)
+    maintainer.start()
+    app.state.partition_maintainer = maintainer
+
+
+async def close_partition_maintenance(app: FastAPI) -> None:
+    """Stop the maintainer before the DB pool is closed."""
+    maintainer = getattr(app.state, "partition_maintainer", None)
+    if maintainer is not None:
+        await maintainer.aclose()
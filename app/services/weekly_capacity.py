@@ -0,0 +1,122 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# ------------------------------------------------------------
+# Week Helpers
+# ------------------------------------------------------------
+# Weeks follow PostgreSQL's date_trunc('week', ...) semantics (ISO weeks starting on
+# Monday, evaluated in UTC), so values computed here line up with the SQL output.
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_ORDINAL = _EPOCH.date().toordinal()
+_US_PER_DAY = 86_400_000_000
+
+# Number of weeks (current one included) averaged by the rolling window
+ROLLING_WINDOW_WEEKS = 4
+
+# `superseded_us` of the latest sailing of a voyage: no later sailing supersedes it
+NOT_SUPERSEDED = 2**63 - 1
+
+# A cached sailing: (origin_at_utc, offered_capacity_teu, superseded_us), times in epoch
+# microseconds; superseded_us is the departure of the voyage's next sailing
+Voyage = Tuple[int, int, int]
+
+
+def week_start(day: date) -> date:
+    """Return the Monday starting the ISO week that contains `day`."""
+    return day - timedelta(days=day.weekday())
+
+
+def weeks_in_range(start: date, end: date) -> List[date]:
+    """Return every week start touched by the inclusive date range [start, end]."""
+    first, last = week_start(start), week_start(end)
+    return [first + timedelta(weeks=i) for i in range((last - first).days // 7 + 1)]
+
+
+def to_epoch_us(value: datetime | date) -> int:
+    """Convert a timezone-aware datetime (or a date, read as UTC midnight) into epoch microseconds."""
+    if not isinstance(value, datetime):
+        return (value.toordinal() - _EPOCH_ORDINAL) * _US_PER_DAY
+    delta = value - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _week_of_epoch_us(ts: int) -> date:
+    """Return the UTC week start for an epoch-microsecond timestamp."""
+    return week_start(date.fromordinal(_EPOCH_ORDINAL + ts // _US_PER_DAY))
+
+
+# ------------------------------------------------------------
+# Weekly Aggregation
+# ------------------------------------------------------------
+def compose_weekly_capacity(voyages: Iterable[Voyage], start: date, end: date) -> List[Dict]:
+    """
+    Build the weekly capacity report for [start, end] from per-week cached voyages.
+
+    Mirrors `CapacityRepository.capacity_query`:
+    - Keeps sailings with `origin_at_utc BETWEEN start AND end` (dates read as UTC midnight)
+      whose voyage has no later sailing in that range (`superseded_us` past `end`).
+    - Sums TEU per week and appends the 4-week rolling average.
+    """
+    return rolling_average(_weekly_totals(voyages, start, end))
+
+
+def compose_weekly_columns(voyages: Iterable[Voyage], start: date, end: date) -> Dict[str, List]:
+    """
+    Like `compose_weekly_capacity`, but as columns: one list per field, in row order.
+
+    Feeds the columnar exports without building a dict per week.
+    """
+    weekly = _weekly_totals(voyages, start, end)
+    weeks = [week for week, _ in weekly]
+    teus = [teu for _, teu in weekly]
+    return {
+        "week_start_date": weeks,
+        "week_no": [week.isocalendar()[1] for week in weeks],
+        "offered_capacity_teu": teus,
+        "offered_capacity_teu_4w_rolling_avg": _rolling_averages(teus),
+    }
+
+
+def _weekly_totals(voyages: Iterable[Voyage], start: date, end: date) -> List[Tuple[date, int]]:
+    """Sum the TEU of each voyage's latest sailing within [start, end] per week, ordered by week."""
+    lo, hi = to_epoch_us(start), to_epoch_us(end)
+
+    weekly: Dict[date, int] = defaultdict(int)
+    for ts, teu, superseded in voyages:
+        if lo <= ts <= hi < superseded:
+            weekly[_week_of_epoch_us(ts)] += teu
+
+    return sorted(weekly.items())
+
+
+def rolling_average(weekly: Sequence[Tuple[date, int]]) -> List[Dict]:
+    """
+    Attach week numbers and the rolling average to ordered (week_start_date, teu) pairs.
+
+    The window spans result rows (not calendar weeks), like `ROWS BETWEEN 3 PRECEDING
+    AND CURRENT ROW`, and rounds half away from zero like PostgreSQL's `numeric::integer`.
+    """
+    return [
+        {
+            "week_start_date": week,
+            "week_no": week.isocalendar()[1],
+            "offered_capacity_teu": teu,
+            "offered_capacity_teu_4w_rolling_avg": average,
+        }
+        for (week, teu), average in zip(weekly, _rolling_averages([teu for _, teu in weekly]))
+    ]
+
+
+def _rolling_averages(teus: Sequence[int]) -> List[int]:
+    """Rolling average of each of `teus` over up to `ROLLING_WINDOW_WEEKS` values ending at it."""
+    averages = []
+    total = 0
+    for i, teu in enumerate(teus):
+        total += teu
+        if i >= ROLLING_WINDOW_WEEKS:
+            total -= teus[i - ROLLING_WINDOW_WEEKS]
+        count = min(i + 1, ROLLING_WINDOW_WEEKS)
+        averages.append((2 * total + count) // (2 * count))
+    return averages
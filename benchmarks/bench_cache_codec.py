@@ -0,0 +1,130 @@
+"""
+Size and CPU benchmark of the cached-week encodings.
+
+Encodes synthetic weeks (voyages spread over 7 days, realistic TEU values) with:
+- legacy:       unframed compact JSON, as stored before the codec existed.
+- json:         the same JSON behind a version byte.
+- msgpack:      columnar msgpack.
+- packed:       fixed-width columnar struct/array layout (the default).
+- packed+zstd:  packed, compressed with zstd.
+
+With `--redis-url`, the entries are also written to Redis and `MEMORY USAGE` is
+reported per key (the keys are deleted afterwards).
+
+Usage:
+    python -m benchmarks.bench_cache_codec [--voyages 14] [--entries 2000] [--redis-url redis://localhost:6379/15]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Callable, Optional
+
+import redis
+
+from app.cache.codec import CacheCodecConfig, EntryCodec
+from app.services.weekly_capacity import NOT_SUPERSEDED
+
+_WEEK_START_US = 1_704_067_200_000_000  # 2024-01-01T00:00:00Z
+_WEEK_US = 7 * 24 * 3600 * 1_000_000
+
+
+class LegacyJson:
+    """The pre-codec encoding (bare JSON, decoded by `json.loads`)."""
+
+    def encode(self, entry: dict) -> bytes:
+        return json.dumps(entry, separators=(",", ":")).encode()
+
+    def decode(self, value: bytes) -> dict:
+        return json.loads(value)
+
+
+def make_entries(count: int, voyages: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "t": round(time.time() - rng.uniform(0, 3600), 3),
+            "d": round(rng.uniform(0.005, 0.2), 4),
+            "v": sorted(
+                (
+                    _WEEK_START_US + rng.randrange(_WEEK_US // 60_000_000) * 60_000_000,
+                    rng.randrange(1_000, 24_000),
+                    # About one sailing in seven was since revised to a later departure
+                    _WEEK_START_US + 2 * _WEEK_US if rng.random() < 1 / 7 else NOT_SUPERSEDED,
+                )
+                for _ in range(voyages)
+            ),
+        }
+        for _ in range(count)
+    ]
+
+
+def per_entry_us(func: Callable, items: list, repeat: int) -> float:
+    """Best-of-`repeat` time (microseconds) of `func` per item."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for item in items:
+            func(item)
+        runs.append((time.perf_counter_ns() - started) / 1e3 / len(items))
+    return min(runs)
+
+
+def redis_memory(client: Optional[redis.Redis], name: str, values: list[bytes]) -> Optional[float]:
+    """Mean `MEMORY USAGE` (bytes) of the values stored as individual keys."""
+    if client is None:
+        return None
+    keys = [f"bench:codec:{name}:{i}" for i in range(len(values))]
+    with client.pipeline(transaction=False) as pipe:
+        for key, value in zip(keys, values):
+            pipe.set(key, value)
+        pipe.execute()
+    try:
+        with client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.memory_usage(key, samples=0)
+            return statistics.fmean(pipe.execute())
+    finally:
+        client.delete(*keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voyages", type=int, default=14, help="Voyages per cached week")
+    parser.add_argument("--entries", type=int, default=2000, help="Cached weeks per variant")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs (best is reported)")
+    parser.add_argument("--redis-url", default=None, help="Also measure Redis MEMORY USAGE (uses and cleans bench:* keys)")
+    args = parser.parse_args()
+
+    entries = make_entries(args.entries, args.voyages)
+    variants = {
+        "legacy": LegacyJson(),
+        "json": EntryCodec(CacheCodecConfig(codec="json", compress_threshold=0)),
+        "msgpack": EntryCodec(CacheCodecConfig(codec="msgpack", compress_threshold=0)),
+        "packed": EntryCodec(CacheCodecConfig(codec="packed", compress_threshold=0)),
+        "packed+zstd": EntryCodec(CacheCodecConfig(codec="packed", compress_threshold=1)),
+    }
+    client = redis.Redis.from_url(args.redis_url) if args.redis_url else None
+
+    print(f"{args.entries} weeks x {args.voyages} voyages")
+    print(f"{'variant':<12} {'bytes':>8} {'redis (B)':>10} {'encode (µs)':>12} {'decode (µs)':>12}")
+    for name, codec in variants.items():
+        values = [codec.encode(entry) for entry in entries]
+        assert all(
+            [tuple(v) for v in codec.decode(value)["v"]] == [tuple(v) for v in entry["v"]]
+            for value, entry in zip(values, entries)
+        ), f"{name} does not round-trip"
+        memory = redis_memory(client, name.replace("+", "_"), values)
+        print(
+            f"{name:<12} {statistics.fmean(map(len, values)):>8.1f} "
+            f"{'-' if memory is None else f'{memory:.1f}':>10} "
+            f"{per_entry_us(codec.encode, entries, args.repeat):>12.2f} "
+            f"{per_entry_us(codec.decode, values, args.repeat):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Latency benchmark of the `GET /capacity` response path (p50 / p99).
+
+Compares, in process and without DB/Redis (the service is stubbed with precomputed rows):
+- legacy:   rows rebuilt as `CapacityRow` objects, then validated and serialized by
+            FastAPI through `response_model` (the handler before the fast path).
+- orjson:   the fast path on a cache miss: rows serialized once with orjson.
+- cached:   the fast path on a hit: pre-serialized bytes returned as is.
+
+Usage:
+    python -m benchmarks.bench_capacity_response [--weeks 52] [--requests 5000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import Annotated, List
+
+import httpx
+import orjson
+from fastapi import APIRouter, Depends, FastAPI, Query
+
+from app.api.capacity import CapacityRow, router
+from app.db.pool import get_read_conn
+from app.services.capacity_service import get_capacity_service
+from app.services.weekly_capacity import rolling_average
+
+
+# ------------------------------------------------------------
+# Stubs
+# ------------------------------------------------------------
+class StubCapacityService:
+    """Serves the same precomputed rows; `cached=True` mimics an L1 hit of the response body."""
+
+    def __init__(self, rows: list[dict], cached: bool) -> None:
+        self.rows = rows
+        self.cached = cached
+        self.body = orjson.dumps(rows)
+
+    async def get_capacity_rolling_average(self, conn, start, end, corridor=None, policy=None) -> list[dict]:
+        return self.rows
+
+    async def get_capacity_json(self, conn, start, end, corridor=None, policy=None) -> bytes:
+        return self.body if self.cached else orjson.dumps(self.rows)
+
+
+async def _no_conn():
+    yield None
+
+
+# Handler as it was before the fast path (per-row CapacityRow + response_model validation)
+legacy_router = APIRouter()
+
+
+@legacy_router.get("/capacity", response_model=List[CapacityRow])
+async def legacy_get_capacity(
+    date_from: Annotated[str, Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$")],
+    date_to: Annotated[str, Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$")],
+    capacity_service: Annotated[StubCapacityService, Depends(get_capacity_service)],
+):
+    start = datetime.strptime(date_from, "%Y-%m-%d").date()
+    end = datetime.strptime(date_to, "%Y-%m-%d").date()
+    rows = await capacity_service.get_capacity_rolling_average(None, start, end)
+    return [
+        CapacityRow(
+            week_start_date=(
+                r["week_start_date"].isoformat()
+                if isinstance(r["week_start_date"], date)
+                else str(r["week_start_date"])
+            ),
+            week_no=int(r["week_no"]),
+            offered_capacity_teu=int(r["offered_capacity_teu"]),
+            offered_capacity_teu_4w_rolling_avg=int(r["offered_capacity_teu_4w_rolling_avg"]),
+        )
+        for r in rows
+    ]
+
+
+def build_app(handler: APIRouter, service: StubCapacityService) -> FastAPI:
+    app = FastAPI()
+    app.include_router(handler)
+    app.dependency_overrides[get_read_conn] = _no_conn
+    app.dependency_overrides[get_capacity_service] = lambda: service
+    return app
+
+
+# ------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def measure(app: FastAPI, url: str, requests: int, warmup: int) -> list[float]:
+    """Return per-request latencies (milliseconds) of sequential requests."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(warmup):
+            (await client.get(url)).raise_for_status()
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter_ns()
+            response = await client.get(url)
+            latencies.append((time.perf_counter_ns() - started) / 1e6)
+            response.raise_for_status()
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, default=52, help="Rows (weeks) per response")
+    parser.add_argument("--requests", type=int, default=5000, help="Measured requests per variant")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests per variant")
+    args = parser.parse_args()
+
+    first = date(2024, 1, 1)
+    rows = rolling_average([(first + timedelta(weeks=i), 100_000 + 37 * i) for i in range(args.weeks)])
+    url = f"/capacity?date_from={first}&date_to={first + timedelta(weeks=args.weeks) - timedelta(days=1)}"
+
+    variants = {
+        "legacy": build_app(legacy_router, StubCapacityService(rows, cached=False)),
+        "orjson": build_app(router, StubCapacityService(rows, cached=False)),
+        "cached": build_app(router, StubCapacityService(rows, cached=True)),
+    }
+    bodies = set()
+    print(f"{'variant':<8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'mean (ms)':>10}")
+    for name, app in variants.items():
+        latencies = await measure(app, url, args.requests, args.warmup)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            bodies.add(orjson.dumps((await client.get(url)).json()))
+        print(
+            f"{name:<8} {percentile(latencies, 50):>10.3f} {percentile(latencies, 99):>10.3f} "
+            f"{statistics.fmean(latencies):>10.3f}"
+        )
+    assert len(bodies) == 1, "variants returned different payloads"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
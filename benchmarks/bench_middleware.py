@@ -0,0 +1,131 @@
+"""
+Per-request overhead of the request instrumentation middleware (p50 / p99).
+
+Serves a trivial endpoint in process, through:
+- none:     no instrumentation (baseline).
+- legacy:   the former `RequestLoggingMiddleware` + `MetricsMiddleware` pair
+            (two `BaseHTTPMiddleware` layers, `time.time()`, raw-path labels).
+- asgi:     `InstrumentationMiddleware` (pure ASGI, one layer).
+
+Access logs are formatted as in production but written to /dev/null.
+
+Usage:
+    python -m benchmarks.bench_middleware [--requests 5000] [--sample-rate 1.0]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.logging import JsonFormatter
+from app.core.monitoring import REQUEST_COUNT, REQUEST_DURATION
+from app.middleware.instrumentation import InstrumentationConfig, InstrumentationMiddleware
+from benchmarks.bench_capacity_response import measure, percentile
+
+legacy_logger = logging.getLogger("benchmarks.legacy_middleware")
+
+
+# ------------------------------------------------------------
+# Middleware as it was before the pure ASGI layer
+# ------------------------------------------------------------
+class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        request_id = str(uuid.uuid4())
+        start_time = time.time()
+        request.state.request_id = request_id
+        try:
+            response = await call_next(request)
+        finally:
+            duration = round(time.time() - start_time, 4)
+            legacy_logger.info(
+                "Request processed",
+                extra={
+                    "request_id": request_id,
+                    "method": request.method,
+                    "path": request.url.path,
+                    "duration": duration,
+                    "status_code": getattr(response, "status_code", 500),
+                },
+            )
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
+class LegacyMetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        duration = time.time() - start_time
+        REQUEST_DURATION.labels(
+            method=request.method, path=request.url.path, status_code=response.status_code
+        ).observe(duration)
+        REQUEST_COUNT.labels(
+            method=request.method, path=request.url.path, status_code=response.status_code
+        ).inc()
+        legacy_logger.info(
+            "Request metrics collected",
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status_code": response.status_code,
+                "duration": round(duration, 4),
+            },
+        )
+        return response
+
+
+def build_app(variant: str, sample_rate: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    if variant == "legacy":
+        app.add_middleware(LegacyRequestLoggingMiddleware)
+        app.add_middleware(LegacyMetricsMiddleware)
+    elif variant == "asgi":
+        app.add_middleware(InstrumentationMiddleware, config=InstrumentationConfig(log_sample_rate=sample_rate))
+    return app
+
+
+def silence_access_logs() -> None:
+    """Keep JSON formatting cost in the measurement, but write to /dev/null."""
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(JsonFormatter())
+    for name in (legacy_logger.name, "app.middleware.instrumentation"):
+        log = logging.getLogger(name)
+        log.handlers = [handler]
+        log.setLevel(logging.INFO)
+        log.propagate = False
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Measured requests per variant")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests per variant")
+    parser.add_argument("--sample-rate", type=float, default=1.0, help="Access log sample rate of the asgi variant")
+    args = parser.parse_args()
+    silence_access_logs()
+
+    results = {}
+    print(f"{'variant':<8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'mean (ms)':>10} {'overhead (µs)':>14}")
+    for variant in ("none", "legacy", "asgi"):
+        latencies = await measure(build_app(variant, args.sample_rate), "/items/42", args.requests, args.warmup)
+        results[variant] = statistics.fmean(latencies)
+        print(
+            f"{variant:<8} {percentile(latencies, 50):>10.3f} {percentile(latencies, 99):>10.3f} "
+            f"{results[variant]:>10.3f} {(results[variant] - results['none']) * 1000:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,320 @@
+"""
+Benchmark of the hashed natural keys (migrations/005_add_natural_keys) on a large table.
+
+Loads `--rows` synthetic sailings (three revisions per voyage, long identifier texts like
+the production feed) with migrations 001-004, measures, applies 005 and measures again:
+- sizes:    `sailings`, the voyage index used by the winner election and `sailing_voyages`.
+- upsert:   a bulk load revising `--revise-pct` of the sailings and adding as many new ones
+            (text keys: UPDATE join + NOT EXISTS under an advisory lock; hashed keys:
+            `SailingsRepository.bulk_upsert`, ON CONFLICT on the unique natural key).
+- insert:   one sailing inserted and rolled back (p50 / p99), i.e. the summary triggers.
+- read:     `CapacityRepository.fetch_capacity` over `--weeks` weeks, next to the original
+            ROW_NUMBER() query over `sailings` that the summary tables replaced (p50 / p99).
+
+DESTRUCTIVE: every migration is rolled back and reapplied on the target database.
+
+Usage:
+    python -m benchmarks.bench_natural_key --database-url postgresql://... [--rows 10000000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import os
+import time
+from datetime import date, timedelta
+
+import asyncpg
+
+from app.repositories.capacity_repository import CapacityRepository, Corridor
+from app.repositories.sailings_repository import SAILING_COLUMNS, STAGING_COLUMNS, SailingsRepository
+from benchmarks.bench_capacity_response import percentile
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "migrations")
+CORRIDORS = [
+    ("china_main", "north_europe_main"),
+    ("china_main", "mediterranean_main"),
+    ("north_europe_main", "china_main"),
+    ("mediterranean_main", "china_main"),
+]
+FIRST_DAY = date(2023, 1, 2)
+DAYS = 728
+REVISIONS = 3
+
+
+# ------------------------------------------------------------
+# Schema and Data
+# ------------------------------------------------------------
+def migration_files(direction: str, last: int) -> list[str]:
+    files = sorted(glob.glob(os.path.join(MIGRATIONS_DIR, f"*.{direction}.sql")))
+    return [f for f in files if int(os.path.basename(f).split("_")[0]) <= last]
+
+
+async def apply(conn: asyncpg.Connection, path: str) -> None:
+    with open(path) as f:
+        await conn.execute(f.read())
+
+
+# Voyage v departs once a day over two years; its revisions move the departure by hours
+GENERATE_QUERY = f"""
+INSERT INTO sailings ({", ".join(SAILING_COLUMNS)})
+SELECT
+    (ARRAY{[o for o, _ in CORRIDORS]})[v % {len(CORRIDORS)} + 1],
+    (ARRAY{[d for _, d in CORRIDORS]})[v % {len(CORRIDORS)} + 1],
+    'CN' || chr(65 + (v % 26)::int) || 'SH',
+    'NL' || chr(65 + (v % 23)::int) || 'TM',
+    'VESSEL ' || v || ' | 21052.000000000 | v' || v % 30 || '-s' || v % 17 || ' | 2 - 2',
+    'OCEAN - NEU' || v % 9 || ' || CMA - FAL1 | COSCO - AEU2 | EMC - FAL1 | OOCL - LL4 / '
+        || 'OCEAN - NEU4 || CMA - FAL1 | COSCO - AEU2 | EMC - FAL1 | OOCL - LL' || v % 7,
+    'THEA - FE' || v % 11 || ' || HL - FE3 | HMM - FE3 | ONE - FE3 | YML - FE3 / '
+        || 'THEA - FE3 || HL - FE3 | HMM - FE3 | ONE - FE3 | YML - FE' || v % 5,
+    TIMESTAMPTZ '{FIRST_DAY}' + (v % {DAYS}) * INTERVAL '1 day' + (v % 997) * INTERVAL '1 minute'
+        + r * INTERVAL '6 hours',
+    5000 + (v * 7919 + r * 104729) % 20000
+FROM generate_series($1::bigint, $2::bigint - 1) AS v, generate_series(0, {REVISIONS - 1}) AS r
+"""
+
+# Summary rebuild of migration 002 (the triggers are off during the load), a range of ids at a time:
+# an array of every voyage key would exceed the 1 GB limit of a value
+REBUILD_QUERY = """
+SELECT refresh_sailing_voyages(ARRAY(
+    SELECT DISTINCT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                        origin_service_version_and_master, destination_service_version_and_master
+           )::sailing_voyage_key
+    FROM sailings
+    WHERE id >= $1 AND id < $2
+));
+"""
+
+
+async def vacuum(conn: asyncpg.Connection, *tables: str) -> None:
+    for table in tables:
+        await conn.execute(f"VACUUM ANALYZE {table};")
+
+
+async def load(conn: asyncpg.Connection, rows: int, chunk: int = 250_000) -> float:
+    """Generates the sailings server side with the summary triggers off, then builds the summary."""
+    voyages = rows // REVISIONS
+    started = time.perf_counter()
+    await conn.execute("ALTER TABLE sailings DISABLE TRIGGER USER;")
+    for lo in range(0, voyages, chunk):
+        await conn.execute(GENERATE_QUERY, lo, min(lo + chunk, voyages))
+    await conn.execute("ALTER TABLE sailings ENABLE TRIGGER USER;")
+    last_id = await conn.fetchval("SELECT max(id) FROM sailings;")
+    for lo in range(1, last_id + 1, chunk * REVISIONS):
+        await conn.execute(REBUILD_QUERY, lo, lo + chunk * REVISIONS)
+    await vacuum(conn, "sailings", "sailing_voyages", "weekly_capacity")
+    return time.perf_counter() - started
+
+
+# ------------------------------------------------------------
+# Bulk Upsert
+# ------------------------------------------------------------
+# The statements `SailingsRepository` ran before migration 005 (no unique key to arbitrate)
+LEGACY_KEY_COLUMNS = tuple(c for c in SAILING_COLUMNS if c != "offered_capacity_teu")
+LEGACY_STAGING_QUERY = """
+CREATE TEMP TABLE sailings_staging (
+    row_no BIGINT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    origin_port_code TEXT NOT NULL,
+    destination_port_code TEXT NOT NULL,
+    service_version_and_roundtrip_identfiers TEXT NOT NULL,
+    origin_service_version_and_master TEXT NOT NULL,
+    destination_service_version_and_master TEXT NOT NULL,
+    origin_at_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+    offered_capacity_teu INTEGER NOT NULL
+) ON COMMIT DROP;
+"""
+LEGACY_UPSERT_QUERY = f"""
+WITH incoming AS (
+    SELECT DISTINCT ON ({", ".join(LEGACY_KEY_COLUMNS)}) {", ".join(SAILING_COLUMNS)}
+    FROM sailings_staging
+    ORDER BY {", ".join(LEGACY_KEY_COLUMNS)}, row_no DESC
+),
+updated AS (
+    UPDATE sailings s
+    SET offered_capacity_teu = i.offered_capacity_teu
+    FROM incoming i
+    WHERE {" AND ".join(f"s.{c} = i.{c}" for c in LEGACY_KEY_COLUMNS)}
+      AND s.offered_capacity_teu <> i.offered_capacity_teu
+    RETURNING s.id
+),
+inserted AS (
+    INSERT INTO sailings ({", ".join(SAILING_COLUMNS)})
+    SELECT {", ".join(SAILING_COLUMNS)}
+    FROM incoming i
+    WHERE NOT EXISTS (SELECT 1 FROM sailings s WHERE {" AND ".join(f"s.{c} = i.{c}" for c in LEGACY_KEY_COLUMNS)})
+    RETURNING id
+)
+SELECT (SELECT count(*) FROM updated) AS updated, (SELECT count(*) FROM inserted) AS inserted;
+"""
+
+
+async def upload(conn: asyncpg.Connection, rows: int, pct: float, salt: int) -> list[tuple]:
+    """Every n-th sailing with a new capacity, followed by as many sailings a week later."""
+    step = max(1, round(100 / pct))
+    sampled = await conn.fetch(
+        f"SELECT {', '.join(SAILING_COLUMNS)} FROM sailings WHERE id % $1 = 0 LIMIT $2",
+        step, max(1, int(rows * pct / 100)),
+    )
+    revised = [tuple(r.values())[:-1] + (r["offered_capacity_teu"] + salt,) for r in sampled]
+    added = [r[:7] + (r[7] + timedelta(days=7, minutes=salt),) + r[8:] for r in revised]
+    return [(i,) + r for i, r in enumerate(revised + added, start=1)]
+
+
+async def upsert(conn: asyncpg.Connection, variant: str, records: list[tuple]) -> tuple[float, int, int]:
+    started = time.perf_counter()
+    if variant == "hashed-key":
+        counts = await SailingsRepository().bulk_upsert(conn, records)
+    else:
+        async with conn.transaction():
+            await conn.execute(LEGACY_STAGING_QUERY)
+            await conn.copy_records_to_table("sailings_staging", records=records, columns=STAGING_COLUMNS)
+            await conn.execute("ANALYZE sailings_staging;")
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('sailings_bulk_upsert'));")
+            counts = await conn.fetchrow(LEGACY_UPSERT_QUERY)
+    return time.perf_counter() - started, counts["updated"], counts["inserted"]
+
+
+# ------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------
+SIZES_QUERY = """
+SELECT
+    pg_total_relation_size('sailings') AS sailings,
+    COALESCE(pg_relation_size(to_regclass('idx_sailings_voyage')),
+             pg_relation_size(to_regclass('uq_sailings_natural_key'))) AS voyage_index,
+    pg_total_relation_size('sailing_voyages') AS sailing_voyages
+"""
+
+# The original read: latest revision per voyage elected by a window over the raw sailings
+ROW_NUMBER_QUERY = """
+WITH base AS (
+    SELECT
+        date_trunc('week', origin_at_utc) AS week_start_date,
+        offered_capacity_teu,
+        ROW_NUMBER() OVER (
+            PARTITION BY
+                service_version_and_roundtrip_identfiers,
+                origin_service_version_and_master,
+                destination_service_version_and_master
+            ORDER BY origin_at_utc DESC
+        ) AS rn
+    FROM sailings
+    WHERE origin = $3 AND destination = $4 AND origin_at_utc BETWEEN $1 AND $2
+),
+weekly_capacity AS (
+    SELECT week_start_date, SUM(offered_capacity_teu) AS offered_capacity_teu
+    FROM base
+    WHERE rn = 1
+    GROUP BY week_start_date
+)
+SELECT
+    week_start_date::date AS week_start_date,
+    EXTRACT(WEEK FROM week_start_date)::int AS week_no,
+    offered_capacity_teu,
+    AVG(offered_capacity_teu) OVER (
+        ORDER BY week_start_date ROWS BETWEEN 3 PRECEDING AND CURRENT ROW
+    )::integer AS offered_capacity_teu_4w_rolling_avg
+FROM weekly_capacity
+ORDER BY week_start_date;
+"""
+
+INSERT_QUERY = f"""
+INSERT INTO sailings ({", ".join(SAILING_COLUMNS)})
+SELECT {", ".join(SAILING_COLUMNS[:7])}, origin_at_utc + INTERVAL '1 second', offered_capacity_teu
+FROM sailings WHERE id = $1
+"""
+
+
+async def timed(call, repeat: int) -> list[float]:
+    """Return per-call latencies (milliseconds)."""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        await call()
+        latencies.append((time.perf_counter_ns() - started) / 1e6)
+    return latencies
+
+
+async def single_inserts(conn: asyncpg.Connection, repeat: int) -> list[float]:
+    """Latency of inserting one revision (triggers included), rolled back each time."""
+    ids = [r["id"] for r in await conn.fetch("SELECT id FROM sailings TABLESAMPLE SYSTEM (1) LIMIT $1", repeat)]
+    latencies = []
+    for sailing_id in ids:
+        transaction = conn.transaction()
+        await transaction.start()
+        started = time.perf_counter_ns()
+        await conn.execute(INSERT_QUERY, sailing_id)
+        latencies.append((time.perf_counter_ns() - started) / 1e6)
+        await transaction.rollback()
+    return latencies
+
+
+def mb(size: int) -> str:
+    return f"{size / 2**20:.0f} MB"
+
+
+def ms(latencies: list[float]) -> str:
+    return f"p50 {percentile(latencies, 50):.2f} ms, p99 {percentile(latencies, 99):.2f} ms"
+
+
+async def measure(conn: asyncpg.Connection, variant: str, args: argparse.Namespace) -> None:
+    sizes = await conn.fetchrow(SIZES_QUERY)
+    print(f"[{variant}] sailings {mb(sizes['sailings'])}, voyage index {mb(sizes['voyage_index'])}, "
+          f"sailing_voyages {mb(sizes['sailing_voyages'])}")
+
+    records = await upload(conn, args.rows, args.revise_pct, salt=1 if variant == "text-key" else 2)
+    elapsed, updated, inserted = await upsert(conn, variant, records)
+    print(f"[{variant}] bulk upsert of {len(records)} rows: {elapsed:.2f} s "
+          f"({updated} updated, {inserted} inserted)")
+    await vacuum(conn, "sailings", "sailing_voyages", "weekly_capacity")
+
+    print(f"[{variant}] single insert: {ms(await single_inserts(conn, args.inserts))}")
+
+    start = FIRST_DAY + timedelta(weeks=26)
+    end = start + timedelta(weeks=args.weeks) - timedelta(days=1)
+    corridor = Corridor(*CORRIDORS[0])
+    repository = CapacityRepository()
+    summary = await timed(lambda: repository.fetch_capacity(conn, start, end, corridor), args.reads)
+    window = await timed(lambda: conn.fetch(ROW_NUMBER_QUERY, start, end, *CORRIDORS[0]), args.window_reads)
+    print(f"[{variant}] read {args.weeks} weeks: fetch_capacity {ms(summary)}; ROW_NUMBER() {ms(window)}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"), help="Scratch database")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Sailings generated")
+    parser.add_argument("--revise-pct", type=float, default=1.0, help="Sailings revised by the bulk upsert")
+    parser.add_argument("--weeks", type=int, default=52, help="Weeks per read")
+    parser.add_argument("--reads", type=int, default=200, help="Measured fetch_capacity calls")
+    parser.add_argument("--window-reads", type=int, default=5, help="Measured ROW_NUMBER() queries")
+    parser.add_argument("--inserts", type=int, default=200, help="Measured single inserts")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url (or BENCH_DATABASE_URL) is required")
+
+    conn = await asyncpg.connect(args.database_url, server_settings={"timezone": "UTC"})
+    try:
+        for path in reversed(migration_files("down", 99)):
+            await apply(conn, path)
+        for path in migration_files("up", 4):
+            await apply(conn, path)
+
+        print(f"load {args.rows} sailings: {await load(conn, args.rows):.1f} s")
+        await measure(conn, "text-key", args)
+
+        started = time.perf_counter()
+        for path in migration_files("up", 5)[4:]:
+            await apply(conn, path)
+        await vacuum(conn, "sailings", "sailing_voyages", "weekly_capacity")
+        print(f"migration 005: {time.perf_counter() - started:.1f} s")
+        await measure(conn, "hashed-key", args)
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
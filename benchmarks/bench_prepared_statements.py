@@ -0,0 +1,69 @@
+"""
+Latency benchmark of `CapacityRepository.fetch_capacity` under the statement caching modes of `DBConfig`.
+
+Runs the capacity read through a one-connection `DatabasePool` (p50 / p99):
+- unnamed:   `pgbouncer=True, prepared_statements=False`: every call parses and plans the query.
+- implicit:  asyncpg's statement cache only (`prepared_statements=False`).
+- prepared:  the default: hot queries prepared once per connection (`fetch_prepared`), with the
+             implicit cache off as behind pgbouncer.
+
+Read-only: point it at a database holding sailings (e.g. the one loaded by scripts/load_sample_data.sh).
+
+Usage:
+    python -m benchmarks.bench_prepared_statements --database-url postgresql://... [--reads 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import date, timedelta
+
+from app.db.pool import DatabasePool, DBConfig
+from app.repositories.capacity_repository import CapacityRepository
+from benchmarks.bench_capacity_response import percentile
+
+MODES = {
+    "unnamed": dict(pgbouncer=True, prepared_statements=False),
+    "implicit": dict(prepared_statements=False),
+    "prepared": dict(pgbouncer=True),
+}
+
+
+async def measure(dsn: str, mode: str, start: date, end: date, reads: int) -> list[float]:
+    """Return per-call latencies (milliseconds), after a warm-up beyond the custom-plan executions."""
+    repository = CapacityRepository()
+    database = DatabasePool()
+    await database.initialize(DBConfig(dsn=dsn, min_size=1, max_size=1, **MODES[mode]))
+    latencies = []
+    try:
+        for i in range(reads + 10):
+            async with database.pool.acquire() as conn:
+                began = time.perf_counter()
+                await repository.fetch_capacity(conn, start, end)
+                if i >= 10:
+                    latencies.append((time.perf_counter() - began) * 1000)
+    finally:
+        await database.close()
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"), help="Database with sailings")
+    parser.add_argument("--date-from", type=date.fromisoformat, default=date(2024, 1, 3), help="YYYY-MM-DD")
+    parser.add_argument("--weeks", type=int, default=12, help="Weeks per read")
+    parser.add_argument("--reads", type=int, default=2000, help="Measured reads per mode")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url (or BENCH_DATABASE_URL) is required")
+
+    end = args.date_from + timedelta(weeks=args.weeks) - timedelta(days=1)
+    for mode in MODES:
+        latencies = await measure(args.database_url, mode, args.date_from, end, args.reads)
+        print(f"{mode:<9} p50 {percentile(latencies, 50):.3f} ms, p99 {percentile(latencies, 99):.3f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
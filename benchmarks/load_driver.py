@@ -0,0 +1,224 @@
+"""
+Async HTTP load driver for `GET /capacity` against a running service.
+
+Workloads (each `--requests` requests from `--concurrency` concurrent clients):
+- cold:   every request reads a (lane, window) no request of the run has read before:
+          windows of `--window-weeks` weeks that do not overlap, over the lanes and weeks of
+          the generated data, in a seeded random order. Stops early when they run out.
+- warm:   `--hot-keys` (lane, window) pairs, read once before measuring, then at random.
+- mixed:  `--hot-ratio` of the requests from the warm set, the others cold.
+
+Per workload it reports latency percentiles (p50 / p95 / p99 / max, milliseconds), throughput
+and response statuses, and writes them as JSON (`--output`, default stdout) together with the
+run parameters, so that results of different commits can be compared (`--baseline`).
+
+Between runs the cache keeps what the last one read: restart the service (L1) and flush Redis,
+or pick another `--seed`, to measure a cold path again.
+
+Pair it with the data of `benchmarks.synthetic_sailings` (same `--lanes`, `--weeks`, `--start`).
+
+Usage:
+    python -m benchmarks.load_driver --base-url http://localhost:8000 --lanes 20 \\
+        [--workload cold --workload warm --workload mixed] [--requests 2000] [--concurrency 32] \\
+        [--output results.json] [--baseline previous.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+import httpx
+
+from benchmarks.bench_capacity_response import percentile
+from benchmarks.synthetic_sailings import lanes
+
+WORKLOADS = ("cold", "warm", "mixed")
+
+
+# ------------------------------------------------------------
+# Request Mix
+# ------------------------------------------------------------
+class RequestMix:
+    """Seeded sequences of `/capacity` URLs: cold ones never repeat within a run, warm ones do."""
+
+    def __init__(
+            self,
+            lane_count: int,
+            weeks: int,
+            start: date,
+            window_weeks: int,
+            hot_keys: int,
+            mixed_cold_keys: int,
+            seed: int,
+    ):
+        monday = start - timedelta(days=start.weekday())
+        keys = [
+            (lane, monday + timedelta(weeks=week))
+            for lane in lanes(lane_count)
+            for week in range(0, weeks - window_weeks + 1, window_weeks)
+        ]
+        rng = random.Random(seed)
+        rng.shuffle(keys)
+        self.window = timedelta(weeks=window_weeks) - timedelta(days=1)
+        # Disjoint key sets: cold reads never hit the hot set, nor the cold reads of another workload
+        self.hot = [self.url(key) for key in keys[:hot_keys]]
+        mixed_end = hot_keys + mixed_cold_keys
+        self._cold = {
+            "mixed": (self.url(key) for key in keys[hot_keys:mixed_end]),
+            "cold": (self.url(key) for key in keys[mixed_end:]),
+        }
+        self._rng = rng
+
+    def url(self, key: tuple[tuple[str, str], date]) -> str:
+        (origin, destination), first = key
+        return (
+            f"/capacity?date_from={first}&date_to={first + self.window}"
+            f"&origin={origin}&destination={destination}"
+        )
+
+    def urls(self, workload: str, hot_ratio: float) -> Iterator[str]:
+        """Endless URLs of a workload (until the cold ones run out, except for `warm`)."""
+        while True:
+            if workload == "warm" or (workload == "mixed" and self._rng.random() < hot_ratio):
+                yield self._rng.choice(self.hot)
+                continue
+            url = next(self._cold[workload], None)
+            if url is None:
+                return
+            yield url
+
+
+# ------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------
+async def run_workload(client: httpx.AsyncClient, urls: Iterator[str], requests: int, concurrency: int) -> dict:
+    """Send up to `requests` requests from `concurrency` workers; return the workload summary."""
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    pending = itertools.islice(urls, requests)
+
+    async def worker() -> None:
+        for url in pending:
+            started = time.perf_counter_ns()
+            try:
+                response = await client.get(url)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append((time.perf_counter_ns() - started) / 1e6)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sent = sum(statuses.values())
+    return {
+        "requests": sent,
+        "errors": sent - statuses.get("200", 0),
+        "statuses": dict(statuses),
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(sent / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3),
+            "mean": round(statistics.fmean(latencies), 3),
+        } if latencies else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print the change of each workload's percentiles and throughput against a previous run."""
+    print(f"{'workload':<8} {'metric':<14} {'baseline':>10} {'current':>10} {'change':>8}", file=sys.stderr)
+    for name, current in results["workloads"].items():
+        previous = baseline.get("workloads", {}).get(name)
+        if not previous or not previous["latency_ms"] or not current["latency_ms"]:
+            continue
+        pairs = [(f"{p} (ms)", previous["latency_ms"][p], current["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+        pairs.append(("throughput/s", previous["throughput_rps"], current["throughput_rps"]))
+        for metric, before, after in pairs:
+            change = f"{(after - before) / before:+.1%}" if before else "n/a"
+            print(f"{name:<8} {metric:<14} {before:>10} {after:>10} {change:>8}", file=sys.stderr)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--workload", action="append", choices=WORKLOADS, help="Repeatable (default: all, in order)")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per workload")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--lanes", type=int, default=20, help="Lanes of the generated data")
+    parser.add_argument("--weeks", type=int, default=104, help="Weeks of the generated data")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2023, 1, 2), help="First week of the data")
+    parser.add_argument("--window-weeks", type=int, default=12, help="Weeks per request")
+    parser.add_argument("--hot-keys", type=int, default=20, help="Distinct requests of the warm set")
+    parser.add_argument("--hot-ratio", type=float, default=0.9, help="Share of warm requests in `mixed`")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--output", help="Write the JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    args = parser.parse_args()
+
+    workloads = args.workload or list(WORKLOADS)
+    mixed_cold_keys = math.ceil(args.requests * (1 - args.hot_ratio) * 1.2) if "mixed" in workloads else 0
+    mix = RequestMix(
+        args.lanes, args.weeks, args.start, args.window_weeks, args.hot_keys, mixed_cold_keys, args.seed
+    )
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "parameters": {k: str(v) if isinstance(v, date) else v for k, v in vars(args).items()
+                       if k not in ("output", "baseline")},
+        "workloads": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        for workload in workloads:
+            if workload in ("warm", "mixed"):
+                await run_workload(client, iter(mix.hot), len(mix.hot), args.concurrency)
+            summary = await run_workload(
+                client, mix.urls(workload, args.hot_ratio), args.requests, args.concurrency
+            )
+            results["workloads"][workload] = summary
+            if summary["requests"] < args.requests:
+                print(
+                    f"{workload}: ran out of unread windows after {summary['requests']} requests "
+                    "(more --lanes or --weeks, or a shorter --window-weeks)",
+                    file=sys.stderr,
+                )
+            print(f"{workload}: {json.dumps(summary)}", file=sys.stderr)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
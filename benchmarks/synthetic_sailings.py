@@ -0,0 +1,293 @@
+"""
+Deterministic generator of production-scale sailings shaped like `data/sailings_sample.csv`.
+
+The sample (one corridor, ~470 voyages of 20 services, each voyage listed once per port pair)
+is profiled first: per service, its voyages' legs (port pairs and departure offsets), vessel
+names and capacities, and the weekday and time its voyages leave. Then `--rows` sailings are
+spread over `--lanes` corridors:
+- lanes:     the sample corridor first, then the other ordered pairs of REGIONS. Their shares
+             of the rows follow a Zipf law (`--lane-skew`, 0 = all lanes alike).
+- services:  every lane runs enough weekly services to hold its share within `--weeks` weeks
+             from `--start`. Synthetic service i replays sample service i % 20.
+- voyages:   each copies a voyage of its sample service (legs, vessel, TEU), leaves in its
+             week at the service's weekday and time (plus up to a day of jitter), and gets
+             unique identifiers. Ports are mapped to the lane's regions.
+
+The same arguments (and `--seed`) always produce the same rows in the same order, whatever the
+output. Rows are streamed, so memory does not grow with `--rows`.
+
+Usage:
+    python -m benchmarks.synthetic_sailings --rows 1000000 --output /tmp/sailings_1m.csv.gz
+    python -m benchmarks.synthetic_sailings --rows 10000000 --lanes 40 --database-url postgresql://...
+
+A CSV is loaded like the sample (`\\copy sailings(...) FROM STDIN CSV HEADER`). `--database-url`
+loads through `SailingsRepository.bulk_upsert` (the `/sailings/bulk` path, which also creates the
+partitions) in batches of `--batch-rows`.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import gzip
+import itertools
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, NamedTuple, Optional, TextIO
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "sailings_sample.csv")
+
+CSV_HEADER = (
+    "ORIGIN", "DESTINATION", "ORIGIN_PORT_CODE", "DESTINATION_PORT_CODE",
+    "SERVICE_VERSION_AND_ROUNDTRIP_IDENTFIERS", "ORIGIN_SERVICE_VERSION_AND_MASTER",
+    "DESTINATION_SERVICE_VERSION_AND_MASTER", "ORIGIN_AT_UTC", "OFFERED_CAPACITY_TEU",
+)
+
+# Regions and the UN/LOCODE country of their ports; the first two are the sample's corridor
+REGIONS = {
+    "china_main": "CN",
+    "north_europe_main": "NL",
+    "mediterranean_main": "IT",
+    "us_west_coast": "US",
+    "us_east_coast": "US",
+    "middle_east": "AE",
+    "india_main": "IN",
+    "south_east_asia": "SG",
+    "japan_korea": "KR",
+    "south_america_east": "BR",
+    "south_america_west": "CL",
+    "west_africa": "NG",
+    "oceania": "AU",
+    "central_america": "PA",
+}
+
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S.000"
+_WEEK = timedelta(weeks=1)
+
+
+# ------------------------------------------------------------
+# Sample Profile
+# ------------------------------------------------------------
+class VoyageTemplate(NamedTuple):
+    """One sample voyage: its legs relative to its first departure, vessel and capacity."""
+    legs: tuple[tuple[str, str, timedelta], ...]  # (origin port, destination port, offset)
+    vessel: str
+    teu: int
+
+
+class ServiceProfile(NamedTuple):
+    """One sample service (ORIGIN_SERVICE_VERSION_AND_MASTER) and its voyages."""
+    origin_master: str
+    destination_master: str
+    departure: timedelta  # weekday and time of its first departures, from Monday 00:00
+    voyages: tuple[VoyageTemplate, ...]
+
+
+class SampleProfile(NamedTuple):
+    services: tuple[ServiceProfile, ...]
+    origin_ports: tuple[str, ...]
+    destination_ports: tuple[str, ...]
+
+    @property
+    def mean_legs(self) -> float:
+        voyages = [voyage for service in self.services for voyage in service.voyages]
+        return sum(len(voyage.legs) for voyage in voyages) / len(voyages)
+
+
+def load_profile(path: str = SAMPLE_PATH) -> SampleProfile:
+    """Profile the sample CSV (voyages grouped by their identifiers, in file order)."""
+    voyages: dict[tuple, list[dict]] = defaultdict(list)
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            key = (
+                row["SERVICE_VERSION_AND_ROUNDTRIP_IDENTFIERS"],
+                row["ORIGIN_SERVICE_VERSION_AND_MASTER"],
+                row["DESTINATION_SERVICE_VERSION_AND_MASTER"],
+            )
+            voyages[key].append(row)
+
+    services: dict[tuple[str, str], list[tuple[datetime, VoyageTemplate]]] = defaultdict(list)
+    for (identifiers, origin_master, destination_master), rows in voyages.items():
+        departures = [datetime.fromisoformat(r["ORIGIN_AT_UTC"]) for r in rows]
+        first = min(departures)
+        legs = tuple(
+            (r["ORIGIN_PORT_CODE"], r["DESTINATION_PORT_CODE"], departure - first)
+            for r, departure in zip(rows, departures)
+        )
+        template = VoyageTemplate(legs, identifiers.split(" | ")[0], int(rows[0]["OFFERED_CAPACITY_TEU"]))
+        services[(origin_master, destination_master)].append((first, template))
+
+    profiles = []
+    for (origin_master, destination_master), dated in services.items():
+        first = min(departure for departure, _ in dated)
+        departure = timedelta(days=first.weekday(), hours=first.hour, minutes=first.minute)
+        profiles.append(ServiceProfile(
+            origin_master, destination_master, departure, tuple(template for _, template in dated)
+        ))
+    legs = [leg for service in profiles for voyage in service.voyages for leg in voyage.legs]
+    return SampleProfile(
+        tuple(profiles),
+        tuple(sorted({origin for origin, _, _ in legs})),
+        tuple(sorted({destination for _, destination, _ in legs})),
+    )
+
+
+# ------------------------------------------------------------
+# Lanes
+# ------------------------------------------------------------
+def lanes(count: int) -> list[tuple[str, str]]:
+    """The first `count` corridors: the sample's, then the other ordered pairs of REGIONS."""
+    pairs = [(o, d) for o, d in itertools.permutations(REGIONS, 2)]
+    pairs.remove(("china_main", "north_europe_main"))
+    pairs.insert(0, ("china_main", "north_europe_main"))
+    if not 1 <= count <= len(pairs):
+        raise ValueError(f"lanes must be between 1 and {len(pairs)}")
+    return pairs[:count]
+
+
+def lane_shares(total: int, count: int, skew: float) -> list[int]:
+    """Split `total` rows over `count` lanes by a Zipf law of exponent `skew` (largest remainders)."""
+    weights = [1 / (rank + 1) ** skew for rank in range(count)]
+    exact = [total * w / sum(weights) for w in weights]
+    shares = [int(x) for x in exact]
+    by_remainder = sorted(range(count), key=lambda i: shares[i] - exact[i])
+    for i in by_remainder[: total - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+
+def region_ports(region: str, count: int, profile: SampleProfile) -> list[str]:
+    """
+    The first `count` ports of `region`: the sample's own for its corridor's regions,
+    then codes drawn per region (the same whichever side of a lane the region is on).
+    """
+    ports = list({
+        "china_main": profile.origin_ports,
+        "north_europe_main": profile.destination_ports,
+    }.get(region, ()))[:count]
+    rng = random.Random(f"ports:{region}")
+    while len(ports) < count:
+        code = REGIONS[region] + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+        if code not in ports:
+            ports.append(code)
+    return ports
+
+
+# ------------------------------------------------------------
+# Generation
+# ------------------------------------------------------------
+def generate(
+        rows: int,
+        lane_count: int = 20,
+        weeks: int = 104,
+        start: date = date(2023, 1, 2),
+        skew: float = 1.0,
+        seed: int = 42,
+        profile: Optional[SampleProfile] = None,
+) -> Iterator[tuple]:
+    """
+    Yield `rows` sailings as tuples in `SAILING_COLUMNS` order (timezone-aware departures).
+
+    Lanes are generated one after the other, each from its own seeded random stream.
+    """
+    profile = profile or load_profile()
+    monday = datetime.combine(start - timedelta(days=start.weekday()), datetime.min.time(), timezone.utc)
+    for lane_no, ((origin, destination), budget) in enumerate(
+            zip(lanes(lane_count), lane_shares(rows, lane_count, skew))
+    ):
+        if budget == 0:
+            continue
+        rng = random.Random(f"{seed}:{lane_no}")
+        origin_ports = dict(zip(profile.origin_ports, region_ports(origin, len(profile.origin_ports), profile)))
+        destination_ports = dict(zip(
+            profile.destination_ports, region_ports(destination, len(profile.destination_ports), profile)
+        ))
+        voyages = budget / profile.mean_legs
+        service_count = max(1, -(-int(voyages) // weeks))
+        for voyage_no in itertools.count():
+            service_no, week = voyage_no % service_count, voyage_no // service_count
+            service = profile.services[service_no % len(profile.services)]
+            voyage = rng.choice(service.voyages)
+            departs = monday + (week % weeks) * _WEEK + service.departure + timedelta(
+                minutes=rng.randrange(24 * 60)
+            )
+            suffix = f" #{lane_no}.{service_no}" if lane_no or service_no >= len(profile.services) else ""
+            identifiers = f"{voyage.vessel} | {voyage.teu}.000000000 | v{lane_no}.{service_no}-w{week} | 2 - 2"
+            for origin_port, destination_port, offset in voyage.legs[:budget]:
+                yield (
+                    origin, destination, origin_ports[origin_port], destination_ports[destination_port],
+                    identifiers, service.origin_master + suffix, service.destination_master + suffix,
+                    departs + offset, voyage.teu,
+                )
+            budget -= len(voyage.legs)
+            if budget <= 0:
+                break
+
+
+def write_csv(records: Iterator[tuple], out: TextIO) -> int:
+    """Write records as a CSV in the sample's format; return the number of rows."""
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for record in records:
+        writer.writerow(record[:7] + (record[7].strftime(_DATE_FORMAT), record[8]))
+        count += 1
+    return count
+
+
+async def load(records: Iterator[tuple], dsn: str, batch_rows: int) -> int:
+    """Upsert records through `SailingsRepository.bulk_upsert`, one transaction per batch."""
+    import asyncpg
+    from app.repositories.sailings_repository import SailingsRepository
+
+    repository = SailingsRepository()
+    conn = await asyncpg.connect(dsn)
+    total = 0
+    try:
+        numbered = enumerate(records, start=1)
+        while batch := list(itertools.islice(numbered, batch_rows)):
+            started = time.perf_counter()
+            counts = await repository.bulk_upsert(conn, ((row_no, *record) for row_no, record in batch))
+            total += counts["staged"]
+            print(
+                f"loaded {total:>12,} rows ({counts['inserted']:,} inserted, {counts['updated']:,} updated) "
+                f"in {time.perf_counter() - started:.1f}s",
+                file=sys.stderr,
+            )
+    finally:
+        await conn.close()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Sailings to generate")
+    parser.add_argument("--lanes", type=int, default=20, help=f"Corridors (at most {len(REGIONS) * (len(REGIONS) - 1)})")
+    parser.add_argument("--lane-skew", type=float, default=1.0, help="Zipf exponent of the lane shares")
+    parser.add_argument("--weeks", type=int, default=104, help="Weeks covered by the sailings")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2023, 1, 2), help="First week (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="-", help="CSV path (.gz compresses) or - for stdout")
+    parser.add_argument("--database-url", help="Load into this database instead of writing a CSV")
+    parser.add_argument("--batch-rows", type=int, default=500_000, help="Rows per bulk_upsert transaction")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    records = generate(args.rows, args.lanes, args.weeks, args.start, args.lane_skew, args.seed)
+    if args.database_url:
+        count = asyncio.run(load(records, args.database_url, args.batch_rows))
+    elif args.output == "-":
+        count = write_csv(records, sys.stdout)
+    else:
+        opener = gzip.open if args.output.endswith(".gz") else open
+        with opener(args.output, "wt", newline="") as out:
+            count = write_csv(records, out)
+    print(f"{count:,} sailings in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
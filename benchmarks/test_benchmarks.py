@@ -0,0 +1,164 @@
+"""
+pytest-benchmark micro-suite of the capacity read path.
+
+In process, no database or Redis needed:
+- cache serialization: encode / decode of a cached week with each codec.
+- response: `GET /capacity` through the ASGI app with a stubbed service, on an L1 miss
+  (rows serialized) and hit (cached body).
+
+With BENCH_DATABASE_URL (a database holding sailings, e.g. loaded by `benchmarks.synthetic_sailings`):
+- `CapacityRepository.fetch_capacity` over 12 weeks.
+- with BENCH_REDIS_URL too: `CapacityService.get_capacity_json` (Redis and L1 caches) for cold,
+  warm and mixed (90% warm) reads of 12-week windows spread over the corridors of the database.
+  That Redis database is FLUSHED before each workload.
+
+Not part of the test suite (`testpaths = tests`). Run and keep the results as JSON:
+    python -m pytest benchmarks/test_benchmarks.py --benchmark-json=micro.json
+    python -m pytest benchmarks/test_benchmarks.py --benchmark-compare=micro.json  # after --benchmark-autosave
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+from datetime import date, timedelta
+
+import httpx
+import pytest
+import redis.asyncio as aioredis
+
+from app.api.capacity import router
+from app.cache.codec import CacheCodecConfig, EntryCodec
+from app.db.pool import DatabasePool, DBConfig
+from app.repositories.capacity_repository import CapacityRepository, Corridor
+from app.services.capacity_service import CapacityService
+from app.services.weekly_capacity import rolling_average
+from benchmarks.bench_cache_codec import make_entries
+from benchmarks.bench_capacity_response import StubCapacityService, build_app
+
+DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+REDIS_URL = os.getenv("BENCH_REDIS_URL")
+WINDOW = timedelta(weeks=12) - timedelta(days=1)
+
+needs_database = pytest.mark.skipif(not DATABASE_URL, reason="BENCH_DATABASE_URL is not set")
+needs_redis = pytest.mark.skipif(not REDIS_URL, reason="BENCH_REDIS_URL is not set")
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+# ------------------------------------------------------------
+# Cache Serialization
+# ------------------------------------------------------------
+@pytest.mark.parametrize("codec", ["json", "msgpack", "packed"])
+def test_cache_encode(benchmark, codec):
+    entry = make_entries(1, voyages=14)[0]
+    encoder = EntryCodec(CacheCodecConfig(codec=codec))
+
+    benchmark(encoder.encode, entry)
+
+
+@pytest.mark.parametrize("codec", ["json", "msgpack", "packed"])
+def test_cache_decode(benchmark, codec):
+    entry = make_entries(1, voyages=14)[0]
+    payload = EntryCodec(CacheCodecConfig(codec=codec)).encode(entry)
+    decoder = EntryCodec()
+
+    assert benchmark(decoder.decode, payload)["t"] == entry["t"]
+
+
+# ------------------------------------------------------------
+# Response Path
+# ------------------------------------------------------------
+@pytest.mark.parametrize("cached", [False, True], ids=["miss", "hit"])
+def test_capacity_response(benchmark, loop, cached):
+    first = date(2024, 1, 1)
+    rows = rolling_average([(first + timedelta(weeks=i), 100_000 + 37 * i) for i in range(12)])
+    app = build_app(router, StubCapacityService(rows, cached=cached))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    url = f"/capacity?date_from={first}&date_to={first + WINDOW}"
+
+    try:
+        response = benchmark(lambda: loop.run_until_complete(client.get(url)))
+    finally:
+        loop.run_until_complete(client.aclose())
+    assert response.status_code == 200
+
+
+# ------------------------------------------------------------
+# Database Reads
+# ------------------------------------------------------------
+@pytest.fixture(scope="module")
+def database(loop):
+    database = DatabasePool()
+    loop.run_until_complete(database.initialize(DBConfig(dsn=DATABASE_URL, min_size=1, max_size=4)))
+    yield database
+    loop.run_until_complete(database.close())
+
+
+@pytest.fixture(scope="module")
+def windows(loop, database) -> list[tuple[Corridor, date, date]]:
+    """Non-overlapping 12-week windows of every corridor holding data, in a seeded random order."""
+    async def bounds():
+        async with database.acquire() as conn:
+            return await conn.fetch(
+                "SELECT origin, destination, min(week_start_date) AS first, max(week_start_date) AS last "
+                "FROM weekly_capacity GROUP BY 1, 2 ORDER BY 1, 2"
+            )
+
+    keys = [
+        (Corridor(r["origin"], r["destination"]), start, start + WINDOW)
+        for r in loop.run_until_complete(bounds())
+        for start in (r["first"] + timedelta(weeks=12 * i) for i in range((r["last"] - r["first"]).days // 84))
+    ]
+    random.Random(42).shuffle(keys)
+    return keys
+
+
+@needs_database
+def test_fetch_capacity(benchmark, loop, database, windows):
+    repository = CapacityRepository()
+    corridor, start, end = windows[0]
+
+    async def fetch():
+        async with database.acquire(read_only=True) as conn:
+            return await repository.fetch_capacity(conn, start, end, corridor)
+
+    assert benchmark(lambda: loop.run_until_complete(fetch()))
+
+
+@needs_database
+@needs_redis
+@pytest.mark.parametrize("workload", ["cold", "warm", "mixed"])
+def test_capacity_service(benchmark, loop, database, windows, workload):
+    if len(windows) < 10 + 50:
+        pytest.skip("fewer than 60 windows of 12 weeks in the database")
+    redis = aioredis.Redis.from_url(REDIS_URL)
+    loop.run_until_complete(redis.flushdb())
+    service = CapacityService(redis=redis, db_pool=database.reader)
+    hot, cold = windows[:10], iter(windows[10:])
+    rng = random.Random(7)
+
+    def next_window():
+        if workload == "warm" or (workload == "mixed" and rng.random() < 0.9):
+            return rng.choice(hot)
+        return next(cold)
+
+    async def read(corridor, start, end):
+        async with database.acquire(read_only=True) as conn:
+            return await service.get_capacity_json(conn, start, end, corridor)
+
+    for window in hot:
+        loop.run_until_complete(read(*window))
+    rounds = min(200, len(windows) - len(hot)) if workload == "cold" else 200
+    benchmark.pedantic(
+        lambda corridor, start, end: loop.run_until_complete(read(corridor, start, end)),
+        setup=lambda: (next_window(), {}),
+        rounds=rounds,
+    )
+    loop.run_until_complete(service.aclose())
+    loop.run_until_complete(redis.aclose())
@@ -0,0 +1,8 @@
+-- Dropping the trigger functions also drops the triggers on sailings
+DROP FUNCTION IF EXISTS sailings_refresh_summary() CASCADE;
+DROP FUNCTION IF EXISTS sailings_truncate_summary() CASCADE;
+DROP FUNCTION IF EXISTS refresh_sailing_voyages(sailing_voyage_key[]);
+DROP TYPE IF EXISTS sailing_voyage_key;
+DROP INDEX IF EXISTS idx_sailings_voyage;
+DROP TABLE IF EXISTS weekly_capacity;
+DROP TABLE IF EXISTS sailing_voyages;
@@ -0,0 +1,213 @@
+-- ------------------------------------------------------------
+-- Weekly capacity summary, maintained incrementally on write
+-- ------------------------------------------------------------
+-- sailing_voyages keeps the winning (latest) sailing of every voyage per corridor,
+-- weekly_capacity aggregates those winners per corridor and week. Both are kept in
+-- sync by statement-level triggers on sailings, so reads no longer scan sailings.
+
+CREATE TABLE sailing_voyages (
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    service_version_and_roundtrip_identfiers TEXT NOT NULL,
+    origin_service_version_and_master TEXT NOT NULL,
+    destination_service_version_and_master TEXT NOT NULL,
+    sailing_id INTEGER NOT NULL,
+    origin_at_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+    offered_capacity_teu INTEGER NOT NULL,
+    PRIMARY KEY (
+        origin,
+        destination,
+        service_version_and_roundtrip_identfiers,
+        origin_service_version_and_master,
+        destination_service_version_and_master
+    )
+);
+
+CREATE INDEX idx_sailing_voyages_corridor_date
+    ON sailing_voyages (origin, destination, origin_at_utc) INCLUDE (offered_capacity_teu);
+
+CREATE TABLE weekly_capacity (
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    week_start_date DATE NOT NULL,
+    offered_capacity_teu BIGINT NOT NULL DEFAULT 0,
+    voyage_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (origin, destination, week_start_date)
+);
+
+-- Winner election per voyage (latest sailing first)
+CREATE INDEX idx_sailings_voyage
+    ON sailings (
+        origin,
+        destination,
+        service_version_and_roundtrip_identfiers,
+        origin_service_version_and_master,
+        destination_service_version_and_master,
+        origin_at_utc DESC,
+        id DESC
+    );
+
+CREATE TYPE sailing_voyage_key AS (
+    origin TEXT,
+    destination TEXT,
+    service_version_and_roundtrip_identfiers TEXT,
+    origin_service_version_and_master TEXT,
+    destination_service_version_and_master TEXT
+);
+
+-- ------------------------------------------------------------
+-- Refresh of the touched voyages (set-based)
+-- ------------------------------------------------------------
+-- Retracts the previous winners of the given voyages from weekly_capacity, elects the
+-- current winners from sailings and adds them back. Weeks are UTC ISO weeks.
+CREATE FUNCTION refresh_sailing_voyages(voyage_keys sailing_voyage_key[]) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH touched AS (
+        SELECT DISTINCT * FROM unnest(voyage_keys)
+    ),
+    retracted AS (
+        DELETE FROM sailing_voyages v
+        USING touched t
+        WHERE v.origin = t.origin
+          AND v.destination = t.destination
+          AND v.service_version_and_roundtrip_identfiers = t.service_version_and_roundtrip_identfiers
+          AND v.origin_service_version_and_master = t.origin_service_version_and_master
+          AND v.destination_service_version_and_master = t.destination_service_version_and_master
+        RETURNING v.origin, v.destination, v.origin_at_utc, v.offered_capacity_teu
+    )
+    INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+    SELECT
+        origin,
+        destination,
+        date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+        -SUM(offered_capacity_teu),
+        -COUNT(*)
+    FROM retracted
+    GROUP BY 1, 2, 3
+    ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+    SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+        voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+
+    WITH touched AS (
+        SELECT DISTINCT * FROM unnest(voyage_keys)
+    ),
+    elected AS (
+        INSERT INTO sailing_voyages
+        SELECT DISTINCT ON (
+            s.origin,
+            s.destination,
+            s.service_version_and_roundtrip_identfiers,
+            s.origin_service_version_and_master,
+            s.destination_service_version_and_master
+        )
+            s.origin,
+            s.destination,
+            s.service_version_and_roundtrip_identfiers,
+            s.origin_service_version_and_master,
+            s.destination_service_version_and_master,
+            s.id,
+            s.origin_at_utc,
+            s.offered_capacity_teu
+        FROM sailings s
+        JOIN touched t USING (
+            origin,
+            destination,
+            service_version_and_roundtrip_identfiers,
+            origin_service_version_and_master,
+            destination_service_version_and_master
+        )
+        ORDER BY
+            s.origin,
+            s.destination,
+            s.service_version_and_roundtrip_identfiers,
+            s.origin_service_version_and_master,
+            s.destination_service_version_and_master,
+            s.origin_at_utc DESC,
+            s.id DESC
+        RETURNING origin, destination, origin_at_utc, offered_capacity_teu
+    )
+    INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+    SELECT
+        origin,
+        destination,
+        date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+        SUM(offered_capacity_teu),
+        COUNT(*)
+    FROM elected
+    GROUP BY 1, 2, 3
+    ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+    SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+        voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+END;
+$$;
+
+-- ------------------------------------------------------------
+-- Triggers on sailings
+-- ------------------------------------------------------------
+-- Statement-level with transition tables: a bulk load refreshes each voyage once.
+CREATE FUNCTION sailings_refresh_summary() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_sailing_voyages(ARRAY(
+            SELECT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                       origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+            FROM new_rows
+        ));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_sailing_voyages(ARRAY(
+            SELECT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                       origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+            FROM new_rows
+            UNION
+            SELECT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                       origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+            FROM old_rows
+        ));
+    ELSE
+        PERFORM refresh_sailing_voyages(ARRAY(
+            SELECT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                       origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+            FROM old_rows
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE FUNCTION sailings_truncate_summary() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE sailing_voyages, weekly_capacity;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER sailings_summary_insert
+    AFTER INSERT ON sailings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+CREATE TRIGGER sailings_summary_update
+    AFTER UPDATE ON sailings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+CREATE TRIGGER sailings_summary_delete
+    AFTER DELETE ON sailings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+CREATE TRIGGER sailings_summary_truncate
+    AFTER TRUNCATE ON sailings
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_truncate_summary();
+
+-- ------------------------------------------------------------
+-- Backfill from existing sailings
+-- ------------------------------------------------------------
+SELECT refresh_sailing_voyages(ARRAY(
+    SELECT DISTINCT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                        origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+    FROM sailings
+));
@@ -0,0 +1,10 @@
+DROP INDEX IF EXISTS idx_sailings_corridor_date;
+
+-- Restore the original index only while the sailings table still exists
+DO $$
+BEGIN
+    IF to_regclass('sailings') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_sailings_origin_destination ON sailings (origin, destination);
+    END IF;
+END
+$$;
@@ -0,0 +1,10 @@
+-- ------------------------------------------------------------
+-- Corridor-aware range index
+-- ------------------------------------------------------------
+-- One composite B-tree serves every corridor's date-range scan; INCLUDE makes
+-- TEU aggregates over a corridor and date range index-only. It supersedes the
+-- (origin, destination) index, which is a strict prefix of it.
+CREATE INDEX idx_sailings_corridor_date
+    ON sailings (origin, destination, origin_at_utc) INCLUDE (offered_capacity_teu);
+
+DROP INDEX IF EXISTS idx_sailings_origin_destination;
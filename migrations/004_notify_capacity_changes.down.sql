@@ -0,0 +1,2 @@
+-- Dropping the trigger function also drops the triggers on weekly_capacity
+DROP FUNCTION IF EXISTS weekly_capacity_notify() CASCADE;
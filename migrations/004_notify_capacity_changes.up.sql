@@ -0,0 +1,53 @@
+-- ------------------------------------------------------------
+-- Change notifications for targeted cache invalidation
+-- ------------------------------------------------------------
+-- Every write to sailings reaches weekly_capacity through the summary triggers, for
+-- exactly the (corridor, week) slots whose voyages changed: the weeks of the retracted
+-- and of the newly elected winners. A statement-level trigger announces them on the
+-- capacity_changes channel, one notification per corridor carrying the range of
+-- touched weeks:
+--
+--   {"origin": "...", "destination": "...", "from": "2024-01-01", "to": "2024-03-25"}
+--
+-- TRUNCATE announces {"all": true}. NOTIFY is delivered on commit (and dropped on
+-- rollback), so listeners never evict ahead of the data they would reload; identical
+-- payloads within a transaction are delivered once.
+
+CREATE FUNCTION weekly_capacity_notify() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('capacity_changes', '{"all": true}');
+    ELSE
+        PERFORM pg_notify('capacity_changes', json_build_object(
+            'origin', origin,
+            'destination', destination,
+            'from', min(week_start_date),
+            'to', max(week_start_date)
+        )::text)
+        FROM changed_rows
+        GROUP BY origin, destination;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- INSERT ... ON CONFLICT DO UPDATE fires both the insert and the update trigger
+CREATE TRIGGER weekly_capacity_notify_insert
+    AFTER INSERT ON weekly_capacity
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION weekly_capacity_notify();
+
+CREATE TRIGGER weekly_capacity_notify_update
+    AFTER UPDATE ON weekly_capacity
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION weekly_capacity_notify();
+
+CREATE TRIGGER weekly_capacity_notify_delete
+    AFTER DELETE ON weekly_capacity
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION weekly_capacity_notify();
+
+CREATE TRIGGER weekly_capacity_notify_truncate
+    AFTER TRUNCATE ON weekly_capacity
+    FOR EACH STATEMENT EXECUTE FUNCTION weekly_capacity_notify();
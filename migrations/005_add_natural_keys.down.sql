@@ -0,0 +1,196 @@
+-- Restore the text-keyed summary of migration 002, only where this migration was applied
+-- (the trigger function names are shared with 002)
+DO $down$
+DECLARE
+    first_id BIGINT;
+BEGIN
+    IF to_regprocedure('sailing_voyage_digest(text, text, text, text, text)') IS NULL THEN
+        RETURN;
+    END IF;
+
+    DROP FUNCTION sailings_refresh_summary() CASCADE;
+    DROP FUNCTION refresh_sailing_voyages(BYTEA[]);
+    -- Also drops uq_sailings_natural_key
+    ALTER TABLE sailings DROP COLUMN voyage_key;
+    DROP FUNCTION sailing_voyage_digest(TEXT, TEXT, TEXT, TEXT, TEXT);
+
+    DROP TABLE sailing_voyages;
+    CREATE TABLE sailing_voyages (
+        origin TEXT NOT NULL,
+        destination TEXT NOT NULL,
+        service_version_and_roundtrip_identfiers TEXT NOT NULL,
+        origin_service_version_and_master TEXT NOT NULL,
+        destination_service_version_and_master TEXT NOT NULL,
+        sailing_id INTEGER NOT NULL,
+        origin_at_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+        offered_capacity_teu INTEGER NOT NULL,
+        PRIMARY KEY (
+            origin,
+            destination,
+            service_version_and_roundtrip_identfiers,
+            origin_service_version_and_master,
+            destination_service_version_and_master
+        )
+    );
+    CREATE INDEX idx_sailing_voyages_corridor_date
+        ON sailing_voyages (origin, destination, origin_at_utc) INCLUDE (offered_capacity_teu);
+
+    CREATE INDEX idx_sailings_voyage
+        ON sailings (
+            origin,
+            destination,
+            service_version_and_roundtrip_identfiers,
+            origin_service_version_and_master,
+            destination_service_version_and_master,
+            origin_at_utc DESC,
+            id DESC
+        );
+
+    CREATE TYPE sailing_voyage_key AS (
+        origin TEXT,
+        destination TEXT,
+        service_version_and_roundtrip_identfiers TEXT,
+        origin_service_version_and_master TEXT,
+        destination_service_version_and_master TEXT
+    );
+
+    CREATE FUNCTION refresh_sailing_voyages(voyage_keys sailing_voyage_key[]) RETURNS void
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        WITH touched AS (
+            SELECT DISTINCT * FROM unnest(voyage_keys)
+        ),
+        retracted AS (
+            DELETE FROM sailing_voyages v
+            USING touched t
+            WHERE v.origin = t.origin
+              AND v.destination = t.destination
+              AND v.service_version_and_roundtrip_identfiers = t.service_version_and_roundtrip_identfiers
+              AND v.origin_service_version_and_master = t.origin_service_version_and_master
+              AND v.destination_service_version_and_master = t.destination_service_version_and_master
+            RETURNING v.origin, v.destination, v.origin_at_utc, v.offered_capacity_teu
+        )
+        INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+        SELECT
+            origin,
+            destination,
+            date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+            -SUM(offered_capacity_teu),
+            -COUNT(*)
+        FROM retracted
+        GROUP BY 1, 2, 3
+        ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+        SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+            voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+
+        WITH touched AS (
+            SELECT DISTINCT * FROM unnest(voyage_keys)
+        ),
+        elected AS (
+            INSERT INTO sailing_voyages
+            SELECT DISTINCT ON (
+                s.origin,
+                s.destination,
+                s.service_version_and_roundtrip_identfiers,
+                s.origin_service_version_and_master,
+                s.destination_service_version_and_master
+            )
+                s.origin,
+                s.destination,
+                s.service_version_and_roundtrip_identfiers,
+                s.origin_service_version_and_master,
+                s.destination_service_version_and_master,
+                s.id,
+                s.origin_at_utc,
+                s.offered_capacity_teu
+            FROM sailings s
+            JOIN touched t USING (
+                origin,
+                destination,
+                service_version_and_roundtrip_identfiers,
+                origin_service_version_and_master,
+                destination_service_version_and_master
+            )
+            ORDER BY
+                s.origin,
+                s.destination,
+                s.service_version_and_roundtrip_identfiers,
+                s.origin_service_version_and_master,
+                s.destination_service_version_and_master,
+                s.origin_at_utc DESC,
+                s.id DESC
+            RETURNING origin, destination, origin_at_utc, offered_capacity_teu
+        )
+        INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+        SELECT
+            origin,
+            destination,
+            date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+            SUM(offered_capacity_teu),
+            COUNT(*)
+        FROM elected
+        GROUP BY 1, 2, 3
+        ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+        SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+            voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+    END;
+    $fn$;
+
+    CREATE FUNCTION sailings_refresh_summary() RETURNS trigger
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM refresh_sailing_voyages(ARRAY(
+                SELECT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                           origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+                FROM new_rows
+            ));
+        ELSIF TG_OP = 'UPDATE' THEN
+            PERFORM refresh_sailing_voyages(ARRAY(
+                SELECT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                           origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+                FROM new_rows
+                UNION
+                SELECT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                           origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+                FROM old_rows
+            ));
+        ELSE
+            PERFORM refresh_sailing_voyages(ARRAY(
+                SELECT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                           origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+                FROM old_rows
+            ));
+        END IF;
+        RETURN NULL;
+    END;
+    $fn$;
+
+    CREATE TRIGGER sailings_summary_insert
+        AFTER INSERT ON sailings
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+    CREATE TRIGGER sailings_summary_update
+        AFTER UPDATE ON sailings
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+    CREATE TRIGGER sailings_summary_delete
+        AFTER DELETE ON sailings
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+    -- Rebuilt a range of ids at a time: an array of every (text) voyage key may exceed
+    -- the 1 GB limit of a value. A voyage seen in several ranges is simply re-elected.
+    TRUNCATE weekly_capacity;
+    FOR first_id IN SELECT generate_series(0, (SELECT max(id) FROM sailings), 100000) LOOP
+        PERFORM refresh_sailing_voyages(ARRAY(
+            SELECT DISTINCT ROW(origin, destination, service_version_and_roundtrip_identfiers,
+                                origin_service_version_and_master, destination_service_version_and_master)::sailing_voyage_key
+            FROM sailings
+            WHERE id >= first_id AND id < first_id + 100000
+        ));
+    END LOOP;
+END
+$down$;
@@ -0,0 +1,180 @@
+-- ------------------------------------------------------------
+-- Hashed natural keys
+-- ------------------------------------------------------------
+-- A voyage (corridor plus the three service identifiers) was identified by five long
+-- text columns: compared in every summary refresh, sorted by every winner election and
+-- indexed twice (idx_sailings_voyage, the sailing_voyages primary key). It is now a
+-- 16-byte digest computed once on write, as a generated column.
+--
+-- A sailing is identified by its voyage, departure time and ports. A unique index
+-- enforces that natural key, so bulk loads upsert with ON CONFLICT instead of matching
+-- eight text columns under an advisory lock; it also serves the winner election
+-- (latest departure of a voyage first), replacing idx_sailings_voyage.
+--
+-- The digest is the MD5 of the identifiers joined by a unit separator (0x1F): 128 bits
+-- keep accidental collisions out of reach. It is an identifier, not a security boundary.
+
+-- The summary triggers and functions are rebuilt on the new key
+DROP FUNCTION IF EXISTS sailings_refresh_summary() CASCADE;
+DROP FUNCTION IF EXISTS refresh_sailing_voyages(sailing_voyage_key[]);
+DROP TYPE IF EXISTS sailing_voyage_key;
+
+CREATE FUNCTION sailing_voyage_digest(
+    origin TEXT,
+    destination TEXT,
+    service_version_and_roundtrip_identfiers TEXT,
+    origin_service_version_and_master TEXT,
+    destination_service_version_and_master TEXT
+) RETURNS BYTEA
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT decode(md5(
+        origin || E'\x1f' || destination || E'\x1f' || service_version_and_roundtrip_identfiers || E'\x1f'
+        || origin_service_version_and_master || E'\x1f' || destination_service_version_and_master
+    ), 'hex')
+$$;
+
+-- Rewrites the table once
+ALTER TABLE sailings
+    ADD COLUMN voyage_key BYTEA NOT NULL GENERATED ALWAYS AS (sailing_voyage_digest(
+        origin,
+        destination,
+        service_version_and_roundtrip_identfiers,
+        origin_service_version_and_master,
+        destination_service_version_and_master
+    )) STORED;
+
+-- Exact repeats of a sailing keep their latest row, which is also the one the
+-- election picked, so capacities are unchanged
+DELETE FROM sailings s
+USING sailings later
+WHERE later.voyage_key = s.voyage_key
+  AND later.origin_at_utc = s.origin_at_utc
+  AND later.origin_port_code = s.origin_port_code
+  AND later.destination_port_code = s.destination_port_code
+  AND later.id > s.id;
+
+CREATE UNIQUE INDEX uq_sailings_natural_key
+    ON sailings (voyage_key, origin_at_utc, origin_port_code, destination_port_code);
+
+DROP INDEX IF EXISTS idx_sailings_voyage;
+
+-- ------------------------------------------------------------
+-- Winning sailings keyed by digest
+-- ------------------------------------------------------------
+DROP TABLE sailing_voyages;
+
+CREATE TABLE sailing_voyages (
+    voyage_key BYTEA PRIMARY KEY,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    sailing_id INTEGER NOT NULL,
+    origin_at_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+    offered_capacity_teu INTEGER NOT NULL
+);
+
+CREATE INDEX idx_sailing_voyages_corridor_date
+    ON sailing_voyages (origin, destination, origin_at_utc) INCLUDE (offered_capacity_teu);
+
+-- ------------------------------------------------------------
+-- Refresh of the touched voyages (set-based)
+-- ------------------------------------------------------------
+-- Same contract as before: retract the previous winners of the given voyages from
+-- weekly_capacity, elect the current winners from sailings and add them back.
+CREATE FUNCTION refresh_sailing_voyages(voyage_keys BYTEA[]) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH touched AS (
+        SELECT DISTINCT voyage_key FROM unnest(voyage_keys) AS t(voyage_key)
+    ),
+    retracted AS (
+        DELETE FROM sailing_voyages v
+        USING touched t
+        WHERE v.voyage_key = t.voyage_key
+        RETURNING v.origin, v.destination, v.origin_at_utc, v.offered_capacity_teu
+    )
+    INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+    SELECT
+        origin,
+        destination,
+        date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+        -SUM(offered_capacity_teu),
+        -COUNT(*)
+    FROM retracted
+    GROUP BY 1, 2, 3
+    ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+    SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+        voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+
+    WITH touched AS (
+        SELECT DISTINCT voyage_key FROM unnest(voyage_keys) AS t(voyage_key)
+    ),
+    elected AS (
+        INSERT INTO sailing_voyages (voyage_key, origin, destination, sailing_id, origin_at_utc, offered_capacity_teu)
+        SELECT DISTINCT ON (s.voyage_key)
+            s.voyage_key,
+            s.origin,
+            s.destination,
+            s.id,
+            s.origin_at_utc,
+            s.offered_capacity_teu
+        FROM sailings s
+        JOIN touched t USING (voyage_key)
+        ORDER BY s.voyage_key, s.origin_at_utc DESC, s.id DESC
+        RETURNING origin, destination, origin_at_utc, offered_capacity_teu
+    )
+    INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+    SELECT
+        origin,
+        destination,
+        date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+        SUM(offered_capacity_teu),
+        COUNT(*)
+    FROM elected
+    GROUP BY 1, 2, 3
+    ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+    SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+        voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+END;
+$$;
+
+-- ------------------------------------------------------------
+-- Triggers on sailings
+-- ------------------------------------------------------------
+CREATE FUNCTION sailings_refresh_summary() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_sailing_voyages(ARRAY(SELECT voyage_key FROM new_rows));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_sailing_voyages(ARRAY(
+            SELECT voyage_key FROM new_rows
+            UNION
+            SELECT voyage_key FROM old_rows
+        ));
+    ELSE
+        PERFORM refresh_sailing_voyages(ARRAY(SELECT voyage_key FROM old_rows));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER sailings_summary_insert
+    AFTER INSERT ON sailings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+CREATE TRIGGER sailings_summary_update
+    AFTER UPDATE ON sailings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+CREATE TRIGGER sailings_summary_delete
+    AFTER DELETE ON sailings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+-- ------------------------------------------------------------
+-- Rebuild the summary on the new key
+-- ------------------------------------------------------------
+TRUNCATE weekly_capacity;
+SELECT refresh_sailing_voyages(ARRAY(SELECT DISTINCT voyage_key FROM sailings));
@@ -0,0 +1,87 @@
+-- Merge the attached partitions back into one table with the indexes of migrations 001-005,
+-- only where sailings is partitioned. Detached (archived) partitions are left as they are.
+DO $down$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('sailings')) IS DISTINCT FROM 'p' THEN
+        RETURN;
+    END IF;
+
+    CREATE TABLE sailings_unpartitioned (
+        id INTEGER NOT NULL DEFAULT nextval('sailings_id_seq'),
+        origin TEXT NOT NULL,
+        destination TEXT NOT NULL,
+        origin_port_code TEXT NOT NULL,
+        destination_port_code TEXT NOT NULL,
+        service_version_and_roundtrip_identfiers TEXT NOT NULL,
+        origin_service_version_and_master TEXT NOT NULL,
+        destination_service_version_and_master TEXT NOT NULL,
+        origin_at_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+        offered_capacity_teu INTEGER NOT NULL
+            CONSTRAINT sailings_offered_capacity_teu_check CHECK (offered_capacity_teu >= 0),
+        voyage_key BYTEA NOT NULL GENERATED ALWAYS AS (sailing_voyage_digest(
+            origin,
+            destination,
+            service_version_and_roundtrip_identfiers,
+            origin_service_version_and_master,
+            destination_service_version_and_master
+        )) STORED
+    );
+
+    INSERT INTO sailings_unpartitioned (
+        id,
+        origin,
+        destination,
+        origin_port_code,
+        destination_port_code,
+        service_version_and_roundtrip_identfiers,
+        origin_service_version_and_master,
+        destination_service_version_and_master,
+        origin_at_utc,
+        offered_capacity_teu
+    )
+    SELECT
+        id,
+        origin,
+        destination,
+        origin_port_code,
+        destination_port_code,
+        service_version_and_roundtrip_identfiers,
+        origin_service_version_and_master,
+        destination_service_version_and_master,
+        origin_at_utc,
+        offered_capacity_teu
+    FROM sailings;
+
+    ALTER SEQUENCE sailings_id_seq OWNED BY sailings_unpartitioned.id;
+    -- Also drops the triggers and every attached partition
+    DROP TABLE sailings;
+    DROP FUNCTION create_sailings_partitions(TIMESTAMP WITH TIME ZONE, TIMESTAMP WITH TIME ZONE);
+
+    ALTER TABLE sailings_unpartitioned RENAME TO sailings;
+    ALTER TABLE sailings ADD PRIMARY KEY (id);
+    CREATE INDEX idx_sailings_origin_date ON sailings (origin_at_utc);
+    CREATE INDEX idx_sailings_corridor_date
+        ON sailings (origin, destination, origin_at_utc) INCLUDE (offered_capacity_teu);
+    CREATE UNIQUE INDEX uq_sailings_natural_key
+        ON sailings (voyage_key, origin_at_utc, origin_port_code, destination_port_code);
+
+    CREATE TRIGGER sailings_summary_insert
+        AFTER INSERT ON sailings
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+    CREATE TRIGGER sailings_summary_update
+        AFTER UPDATE ON sailings
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+    CREATE TRIGGER sailings_summary_delete
+        AFTER DELETE ON sailings
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+    CREATE TRIGGER sailings_summary_truncate
+        AFTER TRUNCATE ON sailings
+        FOR EACH STATEMENT EXECUTE FUNCTION sailings_truncate_summary();
+END
+$down$;
@@ -0,0 +1,178 @@
+-- ------------------------------------------------------------
+-- Monthly range partitions of sailings
+-- ------------------------------------------------------------
+-- sailings is partitioned by month of origin_at_utc (UTC): scans of a date range only
+-- visit the months it overlaps, vacuum works one month at a time, and old months are
+-- archived by detaching their partition (a catalog change, no row is rewritten).
+--
+-- Partitions are named sailings_pYYYY_MM and created by create_sailings_partitions(),
+-- which the service calls ahead of time and every bulk load calls for the months it
+-- writes. Rows of a month without a partition land in sailings_default; creating the
+-- partition moves them out of it.
+--
+-- Each partition carries a BRIN index on origin_at_utc (sailings arrive roughly in
+-- schedule order, so block ranges stay narrow). It replaces the B-tree on origin_at_utc
+-- and the corridor B-tree of migration 003: reads go through the summary tables, and
+-- with capacity no longer indexed, capacity revisions are HOT updates.
+--
+-- The primary key and the natural key include origin_at_utc, as unique indexes of a
+-- partitioned table must contain the partition key. The summary triggers are defined on
+-- the partitioned table: writes addressed to a partition directly bypass them.
+
+-- ------------------------------------------------------------
+-- Partitioned table
+-- ------------------------------------------------------------
+DROP TRIGGER sailings_summary_insert ON sailings;
+DROP TRIGGER sailings_summary_update ON sailings;
+DROP TRIGGER sailings_summary_delete ON sailings;
+DROP TRIGGER sailings_summary_truncate ON sailings;
+
+ALTER TABLE sailings RENAME TO sailings_unpartitioned;
+ALTER INDEX sailings_pkey RENAME TO sailings_unpartitioned_pkey;
+DROP INDEX uq_sailings_natural_key;
+DROP INDEX IF EXISTS idx_sailings_corridor_date;
+DROP INDEX IF EXISTS idx_sailings_origin_date;
+
+CREATE TABLE sailings (
+    id INTEGER NOT NULL DEFAULT nextval('sailings_id_seq'),
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    origin_port_code TEXT NOT NULL,
+    destination_port_code TEXT NOT NULL,
+    service_version_and_roundtrip_identfiers TEXT NOT NULL,
+    origin_service_version_and_master TEXT NOT NULL,
+    destination_service_version_and_master TEXT NOT NULL,
+    origin_at_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+    offered_capacity_teu INTEGER NOT NULL
+        CONSTRAINT sailings_offered_capacity_teu_check CHECK (offered_capacity_teu >= 0),
+    voyage_key BYTEA NOT NULL GENERATED ALWAYS AS (sailing_voyage_digest(
+        origin,
+        destination,
+        service_version_and_roundtrip_identfiers,
+        origin_service_version_and_master,
+        destination_service_version_and_master
+    )) STORED,
+    PRIMARY KEY (id, origin_at_utc)
+) PARTITION BY RANGE (origin_at_utc);
+
+ALTER SEQUENCE sailings_id_seq OWNED BY sailings.id;
+
+CREATE UNIQUE INDEX uq_sailings_natural_key
+    ON sailings (voyage_key, origin_at_utc, origin_port_code, destination_port_code);
+
+CREATE INDEX brin_sailings_origin_date
+    ON sailings USING brin (origin_at_utc);
+
+CREATE TABLE sailings_default PARTITION OF sailings DEFAULT;
+
+-- ------------------------------------------------------------
+-- Partition maintenance
+-- ------------------------------------------------------------
+-- Creates the missing monthly partitions from the month of from_at to the month of to_at
+-- and returns how many it created. Rows of those months are moved out of
+-- sailings_default (directly, so the summary triggers do not see them move). A month
+-- whose partition was detached still has a table of that name and is left alone.
+CREATE FUNCTION create_sailings_partitions(from_at TIMESTAMP WITH TIME ZONE, to_at TIMESTAMP WITH TIME ZONE)
+RETURNS INTEGER
+LANGUAGE plpgsql STRICT AS $$
+DECLARE
+    columns CONSTANT TEXT := 'id, origin, destination, origin_port_code, destination_port_code, '
+        'service_version_and_roundtrip_identfiers, origin_service_version_and_master, '
+        'destination_service_version_and_master, origin_at_utc, offered_capacity_teu';
+    month_start TIMESTAMP := date_trunc('month', from_at AT TIME ZONE 'UTC');
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start <= to_at AT TIME ZONE 'UTC' LOOP
+        partition_name := 'sailings_p' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            -- Concurrent loads of the same month: the second one finds the partition
+            PERFORM pg_advisory_xact_lock(hashtext('create_sailings_partitions'));
+        END IF;
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE sailings INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)',
+                partition_name
+            );
+            EXECUTE format(
+                'WITH moved AS ('
+                '    DELETE FROM sailings_default WHERE origin_at_utc >= $1 AND origin_at_utc < $2 RETURNING %s'
+                ') INSERT INTO %I (%s) SELECT * FROM moved',
+                columns, partition_name, columns
+            ) USING month_start AT TIME ZONE 'UTC', (month_start + INTERVAL '1 month') AT TIME ZONE 'UTC';
+            EXECUTE format(
+                'ALTER TABLE sailings ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name,
+                month_start AT TIME ZONE 'UTC',
+                (month_start + INTERVAL '1 month') AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- ------------------------------------------------------------
+-- Move the rows
+-- ------------------------------------------------------------
+-- Partitions for every month holding sailings and for the next three months
+SELECT create_sailings_partitions(month_start, month_start)
+FROM (
+    SELECT DISTINCT date_trunc('month', origin_at_utc AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS month_start
+    FROM sailings_unpartitioned
+) AS months;
+SELECT create_sailings_partitions(now(), now() + INTERVAL '3 months');
+
+-- Ids are kept: sailing_voyages still points at the same sailings
+INSERT INTO sailings (
+    id,
+    origin,
+    destination,
+    origin_port_code,
+    destination_port_code,
+    service_version_and_roundtrip_identfiers,
+    origin_service_version_and_master,
+    destination_service_version_and_master,
+    origin_at_utc,
+    offered_capacity_teu
+)
+SELECT
+    id,
+    origin,
+    destination,
+    origin_port_code,
+    destination_port_code,
+    service_version_and_roundtrip_identfiers,
+    origin_service_version_and_master,
+    destination_service_version_and_master,
+    origin_at_utc,
+    offered_capacity_teu
+FROM sailings_unpartitioned;
+
+DROP TABLE sailings_unpartitioned;
+
+ANALYZE sailings;
+
+-- ------------------------------------------------------------
+-- Summary triggers (same functions, on the partitioned table)
+-- ------------------------------------------------------------
+CREATE TRIGGER sailings_summary_insert
+    AFTER INSERT ON sailings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+CREATE TRIGGER sailings_summary_update
+    AFTER UPDATE ON sailings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+CREATE TRIGGER sailings_summary_delete
+    AFTER DELETE ON sailings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_refresh_summary();
+
+CREATE TRIGGER sailings_summary_truncate
+    AFTER TRUNCATE ON sailings
+    FOR EACH STATEMENT EXECUTE FUNCTION sailings_truncate_summary();
@@ -0,0 +1,76 @@
+-- Restore the summary refresh of migration 005, only where this migration was applied
+DO $down$
+BEGIN
+    IF to_regclass('superseded_sailings') IS NULL THEN
+        RETURN;
+    END IF;
+
+    CREATE OR REPLACE FUNCTION refresh_sailing_voyages(voyage_keys BYTEA[]) RETURNS void
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        WITH touched AS (
+            SELECT DISTINCT voyage_key FROM unnest(voyage_keys) AS t(voyage_key)
+        ),
+        retracted AS (
+            DELETE FROM sailing_voyages v
+            USING touched t
+            WHERE v.voyage_key = t.voyage_key
+            RETURNING v.origin, v.destination, v.origin_at_utc, v.offered_capacity_teu
+        )
+        INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+        SELECT
+            origin,
+            destination,
+            date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+            -SUM(offered_capacity_teu),
+            -COUNT(*)
+        FROM retracted
+        GROUP BY 1, 2, 3
+        ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+        SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+            voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+
+        WITH touched AS (
+            SELECT DISTINCT voyage_key FROM unnest(voyage_keys) AS t(voyage_key)
+        ),
+        elected AS (
+            INSERT INTO sailing_voyages (voyage_key, origin, destination, sailing_id, origin_at_utc, offered_capacity_teu)
+            SELECT DISTINCT ON (s.voyage_key)
+                s.voyage_key,
+                s.origin,
+                s.destination,
+                s.id,
+                s.origin_at_utc,
+                s.offered_capacity_teu
+            FROM sailings s
+            JOIN touched t USING (voyage_key)
+            ORDER BY s.voyage_key, s.origin_at_utc DESC, s.id DESC
+            RETURNING origin, destination, origin_at_utc, offered_capacity_teu
+        )
+        INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+        SELECT
+            origin,
+            destination,
+            date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+            SUM(offered_capacity_teu),
+            COUNT(*)
+        FROM elected
+        GROUP BY 1, 2, 3
+        ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+        SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+            voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+    END;
+    $fn$;
+
+    CREATE OR REPLACE FUNCTION sailings_truncate_summary() RETURNS trigger
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        TRUNCATE sailing_voyages, weekly_capacity;
+        RETURN NULL;
+    END;
+    $fn$;
+
+    DROP FUNCTION superseded_sailings_of(BYTEA[]);
+    DROP TABLE superseded_sailings;
+END;
+$down$;
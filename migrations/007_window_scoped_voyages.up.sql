@@ -0,0 +1,156 @@
+-- ------------------------------------------------------------
+-- Superseded sailings (range-scoped voyage deduplication)
+-- ------------------------------------------------------------
+-- A capacity range [start, end] counts each voyage once, at its latest sailing *within
+-- the range*: a later revision outside the range must not hide the voyage from it.
+-- sailing_voyages only holds the latest sailing of each voyage overall, which is what
+-- a range counts unless the voyage has a later sailing past its end.
+--
+-- superseded_sailings holds every other sailing with superseded_at, the departure of the
+-- next sailing of its voyage (ordered like the election: departure, then id). A sailing
+-- is the latest of its voyage within [start, end] exactly when
+--
+--   start <= origin_at_utc <= end < superseded_at   (superseded_at NULL for winners)
+--
+-- so a range adds to the summary the superseded sailings it contains whose successor
+-- departs after its end. Rows carry their week so the change notifications of
+-- migration 004 cover them too: a new successor changes the answer of earlier ranges.
+
+CREATE TABLE superseded_sailings (
+    voyage_key BYTEA NOT NULL,
+    sailing_id INTEGER NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    week_start_date DATE NOT NULL,
+    origin_at_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+    superseded_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    offered_capacity_teu INTEGER NOT NULL,
+    PRIMARY KEY (voyage_key, sailing_id)
+);
+
+CREATE INDEX idx_superseded_sailings_corridor_date
+    ON superseded_sailings (origin, destination, origin_at_utc) INCLUDE (superseded_at, offered_capacity_teu);
+
+-- The superseded sailings of the given voyages, as currently found in sailings
+CREATE FUNCTION superseded_sailings_of(voyage_keys BYTEA[]) RETURNS SETOF superseded_sailings
+LANGUAGE sql STABLE AS $$
+    SELECT
+        voyage_key,
+        id,
+        origin,
+        destination,
+        date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+        origin_at_utc,
+        superseded_at,
+        offered_capacity_teu
+    FROM (
+        SELECT
+            s.*,
+            lead(s.origin_at_utc) OVER (PARTITION BY s.voyage_key ORDER BY s.origin_at_utc, s.id) AS superseded_at
+        FROM sailings s
+        WHERE s.voyage_key = ANY (voyage_keys)
+    ) AS ranked
+    WHERE superseded_at IS NOT NULL
+$$;
+
+-- ------------------------------------------------------------
+-- Refresh of the touched voyages (set-based)
+-- ------------------------------------------------------------
+-- Same contract as migration 005 for the winners; the superseded sailings of the touched
+-- voyages are then brought in line with sailings, writing only the rows that changed
+-- (so unchanged weeks are not announced).
+CREATE OR REPLACE FUNCTION refresh_sailing_voyages(voyage_keys BYTEA[]) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH touched AS (
+        SELECT DISTINCT voyage_key FROM unnest(voyage_keys) AS t(voyage_key)
+    ),
+    retracted AS (
+        DELETE FROM sailing_voyages v
+        USING touched t
+        WHERE v.voyage_key = t.voyage_key
+        RETURNING v.origin, v.destination, v.origin_at_utc, v.offered_capacity_teu
+    )
+    INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+    SELECT
+        origin,
+        destination,
+        date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+        -SUM(offered_capacity_teu),
+        -COUNT(*)
+    FROM retracted
+    GROUP BY 1, 2, 3
+    ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+    SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+        voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+
+    WITH touched AS (
+        SELECT DISTINCT voyage_key FROM unnest(voyage_keys) AS t(voyage_key)
+    ),
+    elected AS (
+        INSERT INTO sailing_voyages (voyage_key, origin, destination, sailing_id, origin_at_utc, offered_capacity_teu)
+        SELECT DISTINCT ON (s.voyage_key)
+            s.voyage_key,
+            s.origin,
+            s.destination,
+            s.id,
+            s.origin_at_utc,
+            s.offered_capacity_teu
+        FROM sailings s
+        JOIN touched t USING (voyage_key)
+        ORDER BY s.voyage_key, s.origin_at_utc DESC, s.id DESC
+        RETURNING origin, destination, origin_at_utc, offered_capacity_teu
+    )
+    INSERT INTO weekly_capacity AS w (origin, destination, week_start_date, offered_capacity_teu, voyage_count)
+    SELECT
+        origin,
+        destination,
+        date_trunc('week', origin_at_utc AT TIME ZONE 'UTC')::date,
+        SUM(offered_capacity_teu),
+        COUNT(*)
+    FROM elected
+    GROUP BY 1, 2, 3
+    ON CONFLICT (origin, destination, week_start_date) DO UPDATE
+    SET offered_capacity_teu = w.offered_capacity_teu + EXCLUDED.offered_capacity_teu,
+        voyage_count = w.voyage_count + EXCLUDED.voyage_count;
+
+    DELETE FROM superseded_sailings x
+    WHERE x.voyage_key = ANY (voyage_keys)
+      AND NOT EXISTS (
+          SELECT 1 FROM superseded_sailings_of(voyage_keys) c
+          WHERE c.voyage_key = x.voyage_key
+            AND c.sailing_id = x.sailing_id
+            AND c.origin_at_utc = x.origin_at_utc
+            AND c.superseded_at = x.superseded_at
+            AND c.offered_capacity_teu = x.offered_capacity_teu
+      );
+
+    INSERT INTO superseded_sailings
+    SELECT * FROM superseded_sailings_of(voyage_keys)
+    ON CONFLICT (voyage_key, sailing_id) DO NOTHING;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION sailings_truncate_summary() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE sailing_voyages, weekly_capacity, superseded_sailings;
+    RETURN NULL;
+END;
+$$;
+
+-- Same announcements as weekly_capacity (TRUNCATE is announced by weekly_capacity)
+CREATE TRIGGER superseded_sailings_notify_insert
+    AFTER INSERT ON superseded_sailings
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION weekly_capacity_notify();
+
+CREATE TRIGGER superseded_sailings_notify_delete
+    AFTER DELETE ON superseded_sailings
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION weekly_capacity_notify();
+
+-- ------------------------------------------------------------
+-- Backfill from existing sailings
+-- ------------------------------------------------------------
+SELECT refresh_sailing_voyages(ARRAY(SELECT DISTINCT voyage_key FROM sailings));
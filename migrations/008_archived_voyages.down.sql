@@ -0,0 +1,36 @@
+-- Restore the summary triggers of migrations 005 and 007, only where this migration was applied
+DO $down$
+BEGIN
+    IF to_regclass('archived_voyages') IS NULL THEN
+        RETURN;
+    END IF;
+
+    CREATE OR REPLACE FUNCTION sailings_refresh_summary() RETURNS trigger
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM refresh_sailing_voyages(ARRAY(SELECT voyage_key FROM new_rows));
+        ELSIF TG_OP = 'UPDATE' THEN
+            PERFORM refresh_sailing_voyages(ARRAY(
+                SELECT voyage_key FROM new_rows
+                UNION
+                SELECT voyage_key FROM old_rows
+            ));
+        ELSE
+            PERFORM refresh_sailing_voyages(ARRAY(SELECT voyage_key FROM old_rows));
+        END IF;
+        RETURN NULL;
+    END;
+    $fn$;
+
+    CREATE OR REPLACE FUNCTION sailings_truncate_summary() RETURNS trigger
+    LANGUAGE plpgsql AS $fn$
+    BEGIN
+        TRUNCATE sailing_voyages, weekly_capacity, superseded_sailings;
+        RETURN NULL;
+    END;
+    $fn$;
+
+    DROP TABLE archived_voyages;
+END;
+$down$;
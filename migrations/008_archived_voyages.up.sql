@@ -0,0 +1,52 @@
+-- ------------------------------------------------------------
+-- Archived voyages (summary frozen on detach)
+-- ------------------------------------------------------------
+-- Detaching a month (migration 006) takes its sailings out of sailings, while the
+-- summary tables keep what they elected from them. Re-running the election of such a
+-- voyage would only see its remaining sailings and retract the archived ones, so the
+-- capacity of archived weeks would drift with every late or revised sailing.
+--
+-- archived_voyages lists the voyages that had a sailing in a detached month (filled by
+-- the detach, in its transaction). Their summary rows are final: the summary triggers
+-- leave them alone, and bulk loads skip (and report) their sailings.
+
+CREATE TABLE archived_voyages (
+    voyage_key BYTEA PRIMARY KEY
+);
+
+CREATE OR REPLACE FUNCTION sailings_refresh_summary() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_sailing_voyages(ARRAY(
+            SELECT voyage_key FROM new_rows
+            EXCEPT
+            SELECT voyage_key FROM archived_voyages
+        ));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_sailing_voyages(ARRAY(
+            SELECT voyage_key FROM new_rows
+            UNION
+            SELECT voyage_key FROM old_rows
+            EXCEPT
+            SELECT voyage_key FROM archived_voyages
+        ));
+    ELSE
+        PERFORM refresh_sailing_voyages(ARRAY(
+            SELECT voyage_key FROM old_rows
+            EXCEPT
+            SELECT voyage_key FROM archived_voyages
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Truncating sailings drops the archived summary too: nothing is left to freeze
+CREATE OR REPLACE FUNCTION sailings_truncate_summary() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE sailing_voyages, weekly_capacity, superseded_sailings, archived_voyages;
+    RETURN NULL;
+END;
+$$;
@@ -67,16 +67,26 @@ END
 "
 
 # ------------------------------------------------------------
-# 7. Apply schema if missing
+# 7. Apply pending migrations (tracked in schema_migrations)
 # ------------------------------------------------------------
-echo "🚀 Applying schema..."
+echo "🚀 Applying migrations..."
 TABLE_EXISTS=$(run_psql "$DB_NAME" -t -A -c "SELECT 1 FROM information_schema.tables WHERE table_name='sailings';" || echo 0)
-if [[ -z "$TABLE_EXISTS" ]]; then
-    cat migrations/001_create_sailings_table.up.sql | run_psql "$DB_NAME"
-    echo "✅ Schema applied."
-else
-    echo "✅ Schema already exists, skipping."
+run_psql "$DB_NAME" -q -v ON_ERROR_STOP=1 -c "CREATE TABLE IF NOT EXISTS schema_migrations (version TEXT PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT now());"
+if [[ -n "$TABLE_EXISTS" ]]; then
+    # Databases created before migration tracking already contain the initial schema
+    run_psql "$DB_NAME" -q -c "INSERT INTO schema_migrations (version) VALUES ('001_create_sailings_table') ON CONFLICT DO NOTHING;"
 fi
+for migration in migrations/*.up.sql; do
+    version=$(basename "$migration" .up.sql)
+    APPLIED=$(run_psql "$DB_NAME" -t -A -c "SELECT 1 FROM schema_migrations WHERE version='$version';")
+    if [[ -z "$APPLIED" ]]; then
+        run_psql "$DB_NAME" -q -v ON_ERROR_STOP=1 -1 -f "$migration"
+        run_psql "$DB_NAME" -q -c "INSERT INTO schema_migrations (version) VALUES ('$version');"
+        echo "✅ Applied $version."
+    else
+        echo "✅ $version already applied, skipping."
+    fi
+done
 
 # ------------------------------------------------------------
 # 8. Load sample data if table empty
@@ -85,6 +95,8 @@ ROWS_COUNT=$(run_psql "$DB_NAME" -t -A -c "SELECT COUNT(*) FROM sailings;" || ec
 if [[ "$ROWS_COUNT" -eq 0 ]]; then
     echo "📦 Loading sample data..."
     cat data/sailings_sample.csv | run_psql "$DB_NAME" -c "\copy sailings(origin, destination, origin_port_code, destination_port_code, service_version_and_roundtrip_identfiers, origin_service_version_and_master, destination_service_version_and_master, origin_at_utc, offered_capacity_teu) FROM STDIN CSV HEADER"
+    # Rows of months without a partition went to the default one; give them their own
+    run_psql "$DB_NAME" -q -c "SELECT create_sailings_partitions(min(origin_at_utc), max(origin_at_utc)) FROM sailings;"
     echo "✅ Sample data loaded."
 else
     echo "✅ Sample data already exists, skipping."
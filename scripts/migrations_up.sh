@@ -6,6 +6,9 @@ until nc -z db 5432; do sleep 1; done
 echo "✅ DB ready!"
 
 echo "🚀 Running migrations..."
-psql "$DATABASE_URL" -f migrations/001_create_sailings_table.up.sql
+for migration in migrations/*.up.sql; do
+    echo "  ↳ $migration"
+    psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f "$migration"
+done
 
 echo "🎉 Migration complete!"
@@ -1,5 +1,6 @@
 import os
 import sys
+import glob
 import asyncio
 import asyncpg
 import pytest
@@ -19,18 +20,24 @@ def database_url():
 # --------------------------
 # Async DB setup coroutine
 # --------------------------
+def migration_files(direction: str) -> list[str]:
+    """Return migration scripts in apply order ("up") or rollback order ("down")."""
+    files = sorted(glob.glob(f"migrations/*.{direction}.sql"))
+    return files if direction == "up" else files[::-1]
+
+
 async def setup_db(database_url: str):
     conn = await asyncpg.connect(database_url)
     try:
         # Drop schema first
-        with open("migrations/001_create_sailings_table.down.sql", "r") as f:
-            down_sql = f.read()
-        await conn.execute(down_sql)
+        for path in migration_files("down"):
+            with open(path, "r") as f:
+                await conn.execute(f.read())
 
         # Then create schema
-        with open("migrations/001_create_sailings_table.up.sql", "r") as f:
-            schema_sql = f.read()
-        await conn.execute(schema_sql)
+        for path in migration_files("up"):
+            with open(path, "r") as f:
+                await conn.execute(f.read())
 
         # Insert test data
         insert_sql = """
@@ -1,4 +1,7 @@
+import json
 import pytest
+import pyarrow as pa
+import pyarrow.ipc
 from datetime import date, timedelta
 from fastapi import FastAPI
 
@@ -47,8 +50,132 @@ class TestCapacityAPI:
         data = response.json()
         assert len(data) == 0
 
+    def test_capacity_endpoint_corridor_params(self, app_client):
+        response = app_client.get(
+            "/capacity?date_from=2024-01-01&date_to=2024-03-31&origin=china_main&destination=med_main"
+        )
+        assert response.status_code == 200
+        assert response.json() == []
+
+        response = app_client.get("/capacity?date_from=2024-01-01&date_to=2024-03-31&origin=CN;DROP")
+        assert response.status_code == 422
+
+    def test_capacity_endpoint_streams_ndjson(self, app_client):
+        url = "/capacity?date_from=2024-01-01&date_to=2024-03-31"
+        rows = app_client.get(url).json()
+
+        streamed = app_client.get(f"{url}&stream=true")
+        negotiated = app_client.get(url, headers={"Accept": "application/x-ndjson"})
+
+        for response in (streamed, negotiated):
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/x-ndjson"
+            assert [json.loads(line) for line in response.text.splitlines()] == rows
+
+        assert app_client.get(f"{url}&stream=true&origin=china_main&destination=med_main").text == ""
+        assert app_client.get("/capacity?date_from=2024-03-31&date_to=2024-01-01&stream=true").status_code == 400
+
+    @pytest.mark.parametrize("accept, streamed", [
+        ("application/x-ndjson;q=0", False),
+        ("application/x-ndjson;q=0, application/json", False),
+        ("application/json, application/x-ndjson;q=0.5", False),
+        ("application/x-ndjson;q=0.8, application/json;q=0.9", False),
+        ("application/json, application/x-ndjson", False),
+        ("text/html, application/x-ndjson;q=0.9, */*;q=0.1", True),
+        ("application/json;q=0.5, Application/X-NDJSON", True),
+        ("application/x-ndjson, application/json", True),
+    ])
+    def test_capacity_endpoint_negotiates_ndjson_by_quality(self, app_client, accept, streamed):
+        response = app_client.get("/capacity?date_from=2024-01-01&date_to=2024-03-31", headers={"Accept": accept})
+
+        assert response.status_code == 200
+        expected = "application/x-ndjson" if streamed else "application/json"
+        assert response.headers["content-type"] == expected
+
+    def test_capacity_endpoint_streams_a_range_within_one_week(self, app_client):
+        # The week of 2024-01-01 has one sailing, on Wednesday 2024-01-03
+        inside = app_client.get("/capacity?date_from=2024-01-02&date_to=2024-01-04&stream=true")
+        outside = app_client.get("/capacity?date_from=2024-01-04&date_to=2024-01-05&stream=true")
+
+        assert [json.loads(line)["offered_capacity_teu"] for line in inside.text.splitlines()] == [20000]
+        assert outside.status_code == 200
+        assert outside.text == ""
+
+    def test_capacity_export_negotiates_columnar_formats(self, app_client):
+        url = "/capacity/export?date_from=2024-01-01&date_to=2024-03-31"
+        rows = app_client.get(url.replace("/export", "")).json()
+
+        arrow = app_client.get(url, headers={"Accept": "application/vnd.apache.arrow.stream"})
+        csv = app_client.get(f"{url}&format=csv", headers={"Accept": "application/vnd.apache.arrow.stream"})
+
+        assert arrow.status_code == 200
+        assert arrow.headers["content-type"] == "application/vnd.apache.arrow.stream"
+        table = pa.ipc.open_stream(arrow.content).read_all()
+        assert [str(d) for d in table.column("week_start_date").to_pylist()] == [r["week_start_date"] for r in rows]
+        assert table.column("offered_capacity_teu_4w_rolling_avg").to_pylist() == [
+            r["offered_capacity_teu_4w_rolling_avg"] for r in rows
+        ]
+        assert csv.headers["content-type"].startswith("text/csv")
+        assert 'filename="capacity_china_main_north_europe_main_2024-01-01_2024-03-31.csv"' in (
+            csv.headers["content-disposition"]
+        )
+        assert len(csv.text.splitlines()) == len(rows) + 1
+
+        assert app_client.get(url, headers={"Accept": "application/json"}).status_code == 406
+        assert app_client.get(f"{url}&format=xlsx").status_code == 422
+        assert app_client.get("/capacity/export?date_from=2024-03-31&date_to=2024-01-01").status_code == 400
+
+    def test_capacity_batch_endpoint(self, app_client):
+        single = app_client.get("/capacity?date_from=2024-01-01&date_to=2024-03-31").json()
+
+        response = app_client.post("/capacity/batch", json={"items": [
+            {"date_from": "2024-01-01", "date_to": "2024-03-31"},
+            {"origin": "china_main", "destination": "med_main",
+             "date_from": "2024-01-01", "date_to": "2024-03-31"},
+        ]})
+        assert response.status_code == 200
+        data = response.json()
+        assert [(r["origin"], r["destination"]) for r in data] == [
+            ("china_main", "north_europe_main"),
+            ("china_main", "med_main"),
+        ]
+        assert data[0]["rows"] == single
+        assert data[1]["rows"] == []
+
+    def test_capacity_batch_endpoint_validation(self, app_client):
+        response = app_client.post("/capacity/batch", json={"items": [
+            {"date_from": "2024-03-31", "date_to": "2024-01-01"},
+        ]})
+        assert response.status_code == 400
+
+        response = app_client.post("/capacity/batch", json={"items": []})
+        assert response.status_code == 422
+
+        response = app_client.post("/capacity/batch", json={"items": [
+            {"origin": "CN;DROP", "date_from": "2024-01-01", "date_to": "2024-03-31"},
+        ]})
+        assert response.status_code == 422
+
+    def test_capacity_openapi_schema_documents_capacity_rows(self, app_client):
+        schema = app_client.get("/openapi.json").json()
+        response = schema["paths"]["/capacity"]["get"]["responses"]["200"]["content"]["application/json"]
+        assert response["schema"]["items"]["$ref"] == "#/components/schemas/CapacityRow"
+        assert list(schema["components"]["schemas"]["CapacityRow"]["properties"]) == [
+            "week_start_date",
+            "week_no",
+            "offered_capacity_teu",
+            "offered_capacity_teu_4w_rolling_avg",
+        ]
+
     def test_metrics_endpoint_exposes_data(self, app_client):
         """Ensure /metrics returns Prometheus metrics output."""
         response = app_client.get("/metrics")
         assert response.status_code == 200
         assert "capacity_request_total" in response.text
+
+    def test_capacity_service_is_application_scoped(self, app_client):
+        """The service (and its Redis pool) is created once at startup, not per request."""
+        service = app_client.app.state.capacity_service
+        app_client.get("/capacity?date_from=2024-01-01&date_to=2024-03-31")
+        app_client.get("/capacity?date_from=2024-01-01&date_to=2024-03-31")
+        assert app_client.app.state.capacity_service is service
@@ -0,0 +1,73 @@
+import json
+import struct
+
+import pytest
+
+from app.cache.codec import CacheCodecConfig, EntryCodec
+from app.services.weekly_capacity import NOT_SUPERSEDED
+
+ENTRY = {
+    "t": 1_700_000_000.123,
+    "d": 0.0421,
+    "v": [(1_704_067_200_000_000, 4_500, 1_704_153_600_500_000), (1_704_153_600_500_000, 12_000, NOT_SUPERSEDED)],
+}
+
+
+class TestEntryCodec:
+
+    @pytest.mark.parametrize("name", ["packed", "msgpack", "json"])
+    def test_round_trip(self, name):
+        codec = EntryCodec(CacheCodecConfig(codec=name, compress_threshold=0))
+
+        value = codec.encode(ENTRY)
+
+        assert value[0] == codec.codec.version
+        entry = codec.decode(value)
+        assert (entry["t"], entry["d"]) == (ENTRY["t"], ENTRY["d"])
+        assert [tuple(v) for v in entry["v"]] == ENTRY["v"]
+
+    def test_packed_is_smaller_than_json(self):
+        entry = {**ENTRY, "v": [(1_704_067_200_000_000 + i * 3_600_000_000, 8_000 + i, NOT_SUPERSEDED) for i in range(20)]}
+        packed = EntryCodec(CacheCodecConfig(codec="packed", compress_threshold=0)).encode(entry)
+        legacy = json.dumps(entry, separators=(",", ":")).encode()
+
+        assert len(packed) < len(legacy) * 0.6
+
+    def test_compresses_large_entries_only(self):
+        codec = EntryCodec(CacheCodecConfig(codec="packed", compress_threshold=200))
+        large = {**ENTRY, "v": [(1_704_067_200_000_000 + i, 8_000, NOT_SUPERSEDED) for i in range(100)]}
+
+        small_value, large_value = codec.encode(ENTRY), codec.encode(large)
+
+        assert small_value[0] & 0x80 == 0
+        assert large_value[0] & 0x80
+        assert len(large_value) < 20 * 100
+        assert codec.decode(large_value)["v"] == large["v"]
+
+    def test_reads_every_format_whatever_the_writer(self):
+        reader = EntryCodec(CacheCodecConfig(codec="packed"))
+
+        for name in ("json", "msgpack"):
+            value = EntryCodec(CacheCodecConfig(codec=name)).encode(ENTRY)
+            assert [tuple(v) for v in reader.decode(value)["v"]] == ENTRY["v"]
+
+    def test_entries_without_superseded_sailings_are_misses(self):
+        legacy = json.dumps({"t": 1.0, "d": 0.5, "v": [[10, 20]]})
+        packed_v3 = b"\x03" + struct.pack("<ddI1q1i", 1.0, 0.5, 1, 10, 20)
+
+        assert EntryCodec().decode(legacy) is None
+        assert EntryCodec().decode(b"\x01" + legacy.encode()) is None
+        assert EntryCodec().decode(packed_v3) is None
+
+    def test_falls_back_to_json_outside_int32(self):
+        codec = EntryCodec(CacheCodecConfig(codec="packed"))
+        entry = {**ENTRY, "v": [(1_704_067_200_000_000, 2**31, NOT_SUPERSEDED)]}
+
+        value = codec.encode(entry)
+
+        assert value[0] == 4
+        assert codec.decode(value)["v"] == [[1_704_067_200_000_000, 2**31, NOT_SUPERSEDED]]
+
+    @pytest.mark.parametrize("value", [b"\x7f\x00", b"\x03\x00\x01", b"[1, 2]", b""])
+    def test_unreadable_values_are_misses(self, value):
+        assert EntryCodec().decode(value) is None
@@ -0,0 +1,28 @@
+from app.cache.policy import CachePolicy, Freshness
+
+
+class TestCachePolicy:
+
+    def test_freshness_windows(self):
+        policy = CachePolicy(ttl=100, grace=50, beta=0)
+        assert policy.freshness(computed_at=0, duration=1, now=99) is Freshness.FRESH
+        assert policy.freshness(computed_at=0, duration=1, now=100) is Freshness.STALE
+        assert policy.freshness(computed_at=0, duration=1, now=149) is Freshness.STALE
+        assert policy.freshness(computed_at=0, duration=1, now=150) is Freshness.EXPIRED
+        assert policy.hard_ttl == 150
+
+    def test_xfetch_recomputes_early_near_expiry_for_slow_entries(self):
+        policy = CachePolicy(ttl=100, grace=50, beta=1)
+        # -ln(1 - 0.9) ~= 2.3: a 5s computation is refreshed up to ~11.5s before expiry
+        assert policy.freshness(computed_at=0, duration=5, now=90, rand=lambda: 0.9) is Freshness.EARLY
+        assert policy.freshness(computed_at=0, duration=5, now=80, rand=lambda: 0.9) is Freshness.FRESH
+        # Cheap entries are practically never recomputed early
+        assert policy.freshness(computed_at=0, duration=0.001, now=99, rand=lambda: 0.9) is Freshness.FRESH
+
+    def test_from_env_falls_back_to_default_policy(self, monkeypatch):
+        monkeypatch.setenv("CAPACITY_BATCH_CACHE_GRACE", "30")
+        base = CachePolicy(ttl=600, grace=120, beta=2)
+
+        policy = CachePolicy.from_env("capacity_batch", "CAPACITY_BATCH_CACHE", default=base)
+
+        assert (policy.name, policy.ttl, policy.grace, policy.beta) == ("capacity_batch", 600, 30, 2)
@@ -0,0 +1,63 @@
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pytest
+
+from app.exceptions import CapacityNotAcceptableException
+from app.services import capacity_export
+from app.services.capacity_export import EXPORT_FORMATS, negotiate_export_format
+
+COLUMNS = {
+    "week_start_date": [date(2024, 1, 1), date(2024, 1, 8)],
+    "week_no": [1, 2],
+    "offered_capacity_teu": [20000, 18000],
+    "offered_capacity_teu_4w_rolling_avg": [20000, 19000],
+}
+
+
+class TestEncoders:
+
+    def test_arrow_and_parquet_round_trip_with_typed_columns(self):
+        arrow = pa.ipc.open_stream(EXPORT_FORMATS["arrow"].encode(COLUMNS)).read_all()
+        parquet = pq.read_table(pa.BufferReader(EXPORT_FORMATS["parquet"].encode(COLUMNS)))
+
+        for table in (arrow, parquet):
+            assert table.to_pydict() == COLUMNS
+            assert table.schema.field("week_start_date").type == pa.date32()
+            assert table.schema.field("offered_capacity_teu").type == pa.int64()
+
+    def test_csv_has_a_header_and_one_line_per_week(self):
+        assert EXPORT_FORMATS["csv"].encode(COLUMNS).decode().splitlines() == [
+            "week_start_date,week_no,offered_capacity_teu,offered_capacity_teu_4w_rolling_avg",
+            "2024-01-01,1,20000,20000",
+            "2024-01-08,2,18000,19000",
+        ]
+
+
+class TestNegotiation:
+
+    @pytest.mark.parametrize("accept, expected", [
+        (None, "csv"),
+        ("*/*", "csv"),
+        ("application/vnd.apache.arrow.stream", "arrow"),
+        ("application/x-parquet", "parquet"),
+        ("text/csv;q=0.5, application/vnd.apache.parquet", "parquet"),
+        ("application/json, application/vnd.apache.arrow.stream;q=0.1", "arrow"),
+        ("application/json, */*;q=0.1", "csv"),
+    ])
+    def test_picks_the_preferred_available_format(self, accept, expected):
+        assert negotiate_export_format(accept).name == expected
+
+    def test_format_parameter_overrides_accept(self):
+        assert negotiate_export_format("text/csv", "parquet").name == "parquet"
+
+    def test_unavailable_formats_are_not_acceptable(self, monkeypatch):
+        with pytest.raises(CapacityNotAcceptableException):
+            negotiate_export_format("application/json, text/csv;q=0")
+
+        monkeypatch.setattr(capacity_export, "pa", None)
+        with pytest.raises(CapacityNotAcceptableException, match="available: text/csv"):
+            negotiate_export_format(None, "arrow")
+        assert negotiate_export_format("application/vnd.apache.arrow.stream, text/csv;q=0.5").name == "csv"
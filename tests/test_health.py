@@ -0,0 +1,100 @@
+import pytest
+import redis.asyncio as aioredis
+from prometheus_client import REGISTRY
+
+from app.db.pool import DatabasePool, DBConfig
+from app.main import app
+from app.services.health_monitor import HealthMonitor, HealthMonitorConfig
+
+# Nothing listens there: Redis checks fail fast
+UNREACHABLE_REDIS = "redis://localhost:1/0"
+
+
+def _up(dependency: str) -> float:
+    return REGISTRY.get_sample_value("capacity_dependency_up", {"dependency": dependency})
+
+
+@pytest.mark.asyncio
+class TestHealthMonitor:
+
+    async def test_ready_without_redis_unless_required(self, database_url):
+        database = DatabasePool()
+        await database.initialize(DBConfig(dsn=database_url, min_size=1, max_size=1))
+        redis = aioredis.Redis.from_url(UNREACHABLE_REDIS, socket_connect_timeout=0.1)
+        try:
+            monitor = HealthMonitor(database, redis)
+            assert not monitor.ready
+
+            results = await monitor.check()
+
+            assert (results["postgres"].status, results["redis"].status) == ("ok", "down")
+            assert results["redis"].error
+            assert monitor.ready
+            assert (_up("postgres"), _up("redis")) == (1, 0)
+            assert REGISTRY.get_sample_value("capacity_ready") == 1
+
+            monitor.config = HealthMonitorConfig(redis_required=True)
+            assert not monitor.ready
+        finally:
+            await redis.aclose()
+            await database.close()
+
+    async def test_saturated_pool_stays_ready(self, database_url):
+        database = DatabasePool()
+        await database.initialize(DBConfig(dsn=database_url, min_size=1, max_size=1, acquire_timeout=0.1))
+        try:
+            monitor = HealthMonitor(database, redis=None)
+            async with database.acquire():
+                results = await monitor.check()
+
+            assert (results["postgres"].status, results["redis"].status) == ("saturated", "disabled")
+            assert monitor.ready
+        finally:
+            await database.close()
+
+    async def test_unreachable_database_or_stale_results_are_unready(self, database_url):
+        monitor = HealthMonitor(DatabasePool(), redis=None, config=HealthMonitorConfig(max_age_seconds=1))
+
+        await monitor.check()
+        assert monitor.dependencies["postgres"].status == "down"
+        assert not monitor.ready
+
+        monitor.database = DatabasePool()
+        await monitor.database.initialize(DBConfig(dsn=database_url, min_size=1, max_size=1))
+        try:
+            await monitor.check()
+            assert monitor.ready
+
+            monitor._checked_at -= 2
+            assert not monitor.ready
+            assert monitor.report()["status"] == "unready"
+        finally:
+            await monitor.database.close()
+
+
+class TestHealthEndpoints:
+
+    def test_probes_are_served_from_the_last_check(self, app_client):
+        monitor = app.state.health_monitor
+        checked_at = monitor.dependencies["postgres"].checked_at
+
+        live = app_client.get("/live")
+        ready = app_client.get("/ready")
+
+        assert live.status_code == 200
+        assert ready.status_code == 200
+        body = ready.json()
+        assert body["status"] == "ready"
+        assert body["dependencies"]["postgres"]["status"] == "ok"
+        assert body["dependencies"]["postgres"]["checked_at"] == checked_at
+        assert monitor.dependencies["postgres"].checked_at == checked_at
+
+    def test_unready_answers_503(self, app_client):
+        monitor = app.state.health_monitor
+        monitor._checked_at = None
+
+        response = app_client.get("/ready")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "unready"
+        assert app_client.get("/health").json() == {"status": "ok"}
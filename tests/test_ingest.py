@@ -0,0 +1,153 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.exceptions import CapacityValidationException
+from app.services.sailings_ingest import SailingRowError, gunzip, iter_csv, iter_ndjson, parse_sailing
+
+HEADER = (
+    "ORIGIN,DESTINATION,ORIGIN_PORT_CODE,DESTINATION_PORT_CODE,SERVICE_VERSION_AND_ROUNDTRIP_IDENTFIERS,"
+    "ORIGIN_SERVICE_VERSION_AND_MASTER,DESTINATION_SERVICE_VERSION_AND_MASTER,ORIGIN_AT_UTC,OFFERED_CAPACITY_TEU\n"
+)
+ROW = 'china_main,north_europe_main,CNSHA,NLRTM,"SRV100, v1",china_main,north_europe_main,2024-01-10 08:00:00,{teu}\n'
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def _collect(rows):
+    return [item async for item in rows]
+
+
+@pytest.mark.asyncio
+class TestIngestParsers:
+
+    async def test_csv_records_split_across_chunks(self):
+        data = (HEADER + ROW.format(teu=100) + "\n" + ROW.format(teu=200)).encode()
+
+        rows = await _collect(iter_csv(_chunks(data, 7)))
+
+        assert [row_no for row_no, _ in rows] == [1, 2]
+        assert rows[0][1][4] == "SRV100, v1"
+        assert rows[1][1][8] == "200"
+
+    async def test_csv_quoted_newline_stays_in_one_record(self):
+        data = (HEADER + ROW.format(teu=1).replace('"SRV100, v1"', '"SRV\n100"')).encode()
+
+        rows = await _collect(iter_csv(_chunks(data, 5)))
+
+        assert len(rows) == 1
+        assert rows[0][1][4] == "SRV\n100"
+
+    async def test_csv_missing_columns_and_short_rows(self):
+        with pytest.raises(CapacityValidationException, match="offered_capacity_teu"):
+            await _collect(iter_csv(_chunks(b"origin,destination\nx,y\n", 64)))
+
+        rows = await _collect(iter_csv(_chunks((HEADER + "a,b\n").encode(), 64)))
+        assert isinstance(rows[0][1], SailingRowError)
+
+    async def test_ndjson_lines_and_invalid_lines(self):
+        record = {"ORIGIN": "china_main", "offered_capacity_teu": 5}
+        data = (json.dumps(record) + "\n\n[1]\n{oops\n").encode()
+
+        rows = await _collect(iter_ndjson(_chunks(data, 3)))
+
+        assert rows[0] == (1, ["china_main"] + [None] * 7 + [5])
+        assert [row_no for row_no, _ in rows[1:]] == [3, 4]
+        assert all(isinstance(values, SailingRowError) for _, values in rows[1:])
+
+    async def test_gunzip_round_trip_and_truncation(self):
+        payload = b"x" * 100_000
+        compressed = gzip.compress(payload)
+
+        assert b"".join(await _collect(gunzip(_chunks(compressed, 1000)))) == payload
+        with pytest.raises(CapacityValidationException, match="truncated"):
+            await _collect(gunzip(_chunks(compressed[:-10], 1000)))
+
+
+class TestParseSailing:
+    VALUES = ["china_main", "north_europe_main", "CNSHA", "NLRTM", "SRV1", "m1", "m2", "2024-01-10T08:00:00", "10"]
+
+    def test_converts_timestamp_and_teu(self):
+        parsed = parse_sailing(self.VALUES)
+
+        assert parsed[7] == datetime(2024, 1, 10, 8, tzinfo=timezone.utc)
+        assert parsed[8] == 10
+
+    @pytest.mark.parametrize("index, value", [
+        (0, "China Main"),
+        (2, ""),
+        (7, "yesterday"),
+        (8, "-1"),
+        (8, "12.5"),
+        (8, True),
+    ])
+    def test_rejects_invalid_values(self, index, value):
+        values = list(self.VALUES)
+        values[index] = value
+
+        with pytest.raises(SailingRowError):
+            parse_sailing(values)
+
+
+class TestBulkIngestAPI:
+
+    def test_csv_upload_is_idempotent(self, app_client):
+        body = HEADER + ROW.format(teu=100) + ROW.format(teu=150)
+
+        first = app_client.post("/sailings/bulk", content=body, headers={"Content-Type": "text/csv"})
+        assert first.status_code == 200
+        assert first.json()["received"] == 2
+        assert (first.json()["inserted"], first.json()["updated"]) == (1, 0)
+
+        second = app_client.post("/sailings/bulk", content=body, headers={"Content-Type": "text/csv"})
+        assert (second.json()["inserted"], second.json()["unchanged"]) == (0, 2)
+
+        capacity = app_client.get("/capacity?date_from=2024-01-08&date_to=2024-01-14").json()
+        assert capacity[0]["offered_capacity_teu"] == 150
+
+    def test_gzip_ndjson_upload_updates_capacity(self, app_client):
+        record = dict(zip(
+            ["origin", "destination", "origin_port_code", "destination_port_code",
+             "service_version_and_roundtrip_identfiers", "origin_service_version_and_master",
+             "destination_service_version_and_master", "origin_at_utc", "offered_capacity_teu"],
+            ["china_main", "north_europe_main", "NLRTM", "CNSHA", "SRV001", "china_main", "north_europe_main",
+             "2024-01-03T08:00:00+00:00", 25000],
+        ))
+        body = gzip.compress(json.dumps(record).encode() + b"\n")
+
+        response = app_client.post(
+            "/sailings/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+        )
+
+        assert response.status_code == 200
+        assert (response.json()["inserted"], response.json()["updated"]) == (0, 1)
+
+    def test_invalid_row_aborts_or_is_skipped(self, app_client):
+        body = HEADER + ROW.format(teu=100) + ROW.format(teu="many")
+
+        aborted = app_client.post("/sailings/bulk", content=body, headers={"Content-Type": "text/csv"})
+        assert aborted.status_code == 400
+        assert aborted.json()["message"].startswith("Row 2:")
+
+        skipped = app_client.post(
+            "/sailings/bulk?on_error=skip", content=body, headers={"Content-Type": "text/csv"}
+        )
+        assert skipped.status_code == 200
+        assert (skipped.json()["inserted"], skipped.json()["rejected"]) == (1, 1)
+        assert skipped.json()["errors"][0].startswith("Row 2:")
+
+    def test_unsupported_media_type(self, app_client):
+        response = app_client.post("/sailings/bulk", content=b"{}", headers={"Content-Type": "application/json"})
+        assert response.status_code == 415
+
+        response = app_client.post(
+            "/sailings/bulk", content=b"", headers={"Content-Type": "text/csv", "Content-Encoding": "br"}
+        )
+        assert response.status_code == 415
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import date, datetime
+
+import pytest
+
+from app.cache.invalidation import CAPACITY_CHANGES_CHANNEL, parse_capacity_change
+from app.db.pool import DatabasePool, DBConfig
+from app.repositories.capacity_repository import Corridor
+from conftest import setup_db
+
+
+class TestParseCapacityChange:
+
+    def test_corridor_and_week_range(self):
+        change = parse_capacity_change(
+            '{"origin": "china_main", "destination": "med_main", "from": "2024-01-01", "to": "2024-02-05"}'
+        )
+
+        assert change == (Corridor("china_main", "med_main"), date(2024, 1, 1), date(2024, 2, 5))
+
+    def test_everything_changed(self):
+        assert parse_capacity_change('{"all": true}') is None
+
+    @pytest.mark.parametrize("payload", [
+        "",
+        "[]",
+        '{"origin": "china_main"}',
+        '{"origin": "a", "destination": "b", "from": "x", "to": "y"}',
+    ])
+    def test_malformed(self, payload):
+        with pytest.raises(ValueError):
+            parse_capacity_change(payload)
+
+
+@pytest.mark.asyncio
+class TestChangeNotifications:
+
+    async def test_committed_writes_notify_touched_corridor_weeks(self, database_url):
+        await setup_db(database_url)
+        database = DatabasePool()
+        await database.initialize(DBConfig(dsn=database_url, min_size=1, max_size=2))
+        received: asyncio.Queue = asyncio.Queue()
+
+        async def on_changes(payloads):
+            for payload in payloads:
+                received.put_nowait(payload)
+
+        try:
+            await database.listen(CAPACITY_CHANGES_CHANNEL, on_changes)
+            async with database.pool.acquire() as conn:
+                # Rolled back: nothing is announced
+                transaction = conn.transaction()
+                await transaction.start()
+                await conn.execute("UPDATE sailings SET offered_capacity_teu = 1")
+                await transaction.rollback()
+                await conn.execute(
+                    "UPDATE sailings SET offered_capacity_teu = offered_capacity_teu + 1 WHERE origin_at_utc < $1",
+                    datetime.fromisoformat("2024-01-20T00:00:00+00:00"),
+                )
+
+            payload = await asyncio.wait_for(received.get(), timeout=5)
+            # The two January voyages are retracted and re-elected in one statement each
+            assert parse_capacity_change(payload) == (
+                Corridor("china_main", "north_europe_main"), date(2024, 1, 1), date(2024, 1, 15)
+            )
+            await asyncio.sleep(0.1)
+            assert received.empty()
+        finally:
+            await database.close()
+
+        assert database._listeners == []
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.api.limits import ConcurrencyLimitConfig, ConcurrencyLimiter
+from app.db.pool import get_read_conn
+from app.exceptions import CapacityUnavailableException
+from app.main import app
+
+
+def _shed(route: str) -> float:
+    return REGISTRY.get_sample_value("capacity_route_shed_requests_total", {"route": route}) or 0.0
+
+
+class TestConcurrencyLimitConfig:
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("ROUTE_CONCURRENCY_LIMITS", "capacity=200, sailings_bulk=2")
+        monkeypatch.setenv("ROUTE_RETRY_AFTER_SECONDS", "5")
+
+        config = ConcurrencyLimitConfig.from_env()
+
+        assert config.limits == {"capacity": 200, "sailings_bulk": 2}
+        assert config.retry_after == 5
+
+
+@pytest.mark.asyncio
+class TestConcurrencyLimiter:
+
+    async def test_requests_beyond_the_limit_are_shed(self):
+        limiter = ConcurrencyLimiter("test_limited", limit=1, retry_after=3)
+        shed = _shed("test_limited")
+
+        admitted = limiter()
+        await admitted.__anext__()
+        with pytest.raises(CapacityUnavailableException) as exc_info:
+            await limiter().__anext__()
+        await admitted.aclose()
+
+        assert exc_info.value.retry_after == 3
+        assert _shed("test_limited") - shed == 1
+        assert limiter.in_flight == 0
+        await limiter().__anext__()
+        assert limiter.in_flight == 1
+
+    async def test_unlimited_route_is_not_counted(self):
+        limiter = ConcurrencyLimiter("test_unlimited", limit=None)
+
+        await asyncio.gather(*(limiter().__anext__() for _ in range(10)))
+
+        assert limiter.in_flight == 0
+
+
+class TestOverloadResponse:
+
+    def test_exhausted_pool_answers_503_with_retry_after(self, app_client):
+        async def exhausted():
+            raise CapacityUnavailableException("Database connections exhausted, retry later", retry_after=2)
+            yield
+
+        app.dependency_overrides[get_read_conn] = exhausted
+        try:
+            response = app_client.get("/capacity?date_from=2024-01-01&date_to=2024-03-31")
+        finally:
+            app.dependency_overrides.pop(get_read_conn)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
@@ -0,0 +1,59 @@
+from app.cache.local import LocalCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLocalCache:
+
+    def test_evicts_least_recently_used_entries_beyond_byte_budget(self):
+        cache = LocalCache(max_bytes=300, ttl=60)
+        cache.set("a", 1, size=100)
+        cache.set("b", 2, size=100)
+        cache.set("c", 3, size=100)
+        assert cache.get("a") == 1  # "b" is now the least recently used
+
+        cache.set("d", 4, size=100)
+
+        assert cache.get("b") is None
+        assert [cache.get(k) for k in "acd"] == [1, 3, 4]
+        assert cache.bytes == 300
+
+    def test_entries_expire_after_ttl(self):
+        clock = _Clock()
+        cache = LocalCache(max_bytes=1000, ttl=10, clock=clock)
+        cache.set("a", 1, size=10)
+
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10.0
+        assert cache.get("a") is None
+        assert cache.bytes == 0
+
+    def test_invalidate_and_oversized_entries(self):
+        cache = LocalCache(max_bytes=100, ttl=60)
+        cache.set("a", 1, size=10)
+        cache.set("b", 2, size=10)
+        cache.set("huge", 3, size=101)
+
+        assert cache.invalidate(["a", "missing"]) == 1
+        assert cache.get("huge") is None
+        assert len(cache) == 1
+        assert cache.hits == 0 and cache.misses == 1
+
+    def test_derived_entries_follow_their_sources(self):
+        cache = LocalCache(max_bytes=1000, ttl=60)
+        cache.set("week:1", "w1", size=10)
+        cache.set("week:2", "w2", size=10)
+        cache.set("body", b"[]", size=10, tags=["week:1", "week:2"])
+
+        cache.set("week:2", "w2-new", size=10)
+
+        assert cache.peek("body") is None
+        assert cache.peek("week:1") == "w1"
+        assert cache.bytes == 20
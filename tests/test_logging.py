@@ -0,0 +1,73 @@
+import json
+import queue
+import logging as std_logging
+from datetime import date
+from decimal import Decimal
+
+from prometheus_client import REGISTRY
+
+from app.core import logging
+from app.core.logging import JsonFormatter, NonBlockingQueueHandler
+
+
+def _record(msg="hello %s", args=("world",), **extra) -> std_logging.LogRecord:
+    record = std_logging.LogRecord("test.logger", std_logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def _dropped() -> float:
+    return REGISTRY.get_sample_value("capacity_log_records_dropped_total") or 0.0
+
+
+class TestJsonLogging:
+
+    def test_formatter_renders_extras_and_non_json_values(self):
+        line = JsonFormatter().format(_record(week=date(2024, 1, 1), teu=Decimal("1.5"), request_id="abc"))
+
+        data = json.loads(line)
+        assert data["message"] == "hello world"
+        assert data["level"] == "INFO"
+        assert data["logger"] == "test.logger"
+        assert (data["week"], data["teu"], data["request_id"]) == ("2024-01-01", "1.5", "abc")
+        assert data["timestamp"].endswith("Z")
+        assert "args" not in data and "lineno" not in data
+
+    def test_queue_handler_drops_and_counts_when_full(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        before = _dropped()
+
+        handler.handle(_record())
+        handler.handle(_record())
+
+        assert handler.queue.qsize() == 1
+        assert _dropped() == before + 1
+
+    def test_queued_record_has_its_message_frozen(self):
+        handler = NonBlockingQueueHandler(queue.Queue())
+        args = ["before"]
+
+        handler.handle(_record("value=%s", tuple(args)))
+        queued = handler.queue.get_nowait()
+
+        assert (queued.msg, queued.args) == ("value=before", None)
+
+    def test_get_logger_never_stacks_handlers(self):
+        first = logging.get_logger("test.idempotent")
+        second = logging.get_logger("test.idempotent")
+
+        assert first is second
+        assert first.handlers == []
+        assert first.propagate
+
+    def test_setup_leaves_interpreter_logging_switches_alone_unless_asked(self, monkeypatch):
+        for name in ("_srcfile", "logThreads", "logProcesses", "logMultiprocessing", "logAsyncioTasks"):
+            # Restored (or removed: logAsyncioTasks is new in 3.12) after the test
+            monkeypatch.setattr(std_logging, name, getattr(std_logging, name, None), raising=False)
+        srcfile = std_logging._srcfile
+
+        logging.setup_logging("INFO")
+        assert (std_logging._srcfile, std_logging.logThreads) == (srcfile, True)
+
+        logging.setup_logging("INFO", lean_records=True)
+        assert (std_logging._srcfile, std_logging.logThreads) == (None, False)
@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.middleware.instrumentation import InstrumentationConfig, InstrumentationMiddleware
+
+
+def _build_app(**config) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware, config=InstrumentationConfig(**config))
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int, request: Request):
+        return {"item_id": item_id, "request_id": request.state.request_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def _count(path: str, status_code: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "capacity_request_total", {"method": "GET", "path": path, "status_code": status_code}
+    )
+    return value or 0.0
+
+
+class TestInstrumentationMiddleware:
+
+    def test_assigns_request_id_and_returns_it(self):
+        client = TestClient(_build_app())
+
+        response = client.get("/items/1")
+
+        assert response.headers["X-Request-ID"] == response.json()["request_id"]
+        assert len(response.headers["X-Request-ID"]) == 32
+
+    def test_reuses_well_formed_incoming_request_id(self):
+        client = TestClient(_build_app())
+
+        assert client.get("/items/1", headers={"X-Request-ID": "abc-123"}).headers["X-Request-ID"] == "abc-123"
+        assert client.get("/items/1", headers={"X-Request-ID": "a b\tc"}).headers["X-Request-ID"] != "a b\tc"
+
+    def test_metrics_are_labelled_with_route_templates(self):
+        client = TestClient(_build_app())
+        before = _count("/items/{item_id}", "200")
+        unmatched_before = _count("unmatched", "404")
+
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/no/such/path")
+
+        assert _count("/items/{item_id}", "200") == before + 2
+        assert _count("/items/1", "200") == 0
+        assert _count("unmatched", "404") == unmatched_before + 1
+
+    def test_unhandled_errors_are_counted_as_500(self):
+        client = TestClient(_build_app(), raise_server_exceptions=False)
+        before = _count("/boom", "500")
+
+        assert client.get("/boom").status_code == 500
+        assert _count("/boom", "500") == before + 1
+
+    @pytest.mark.parametrize("sample_rate, logged", [(1.0, 2), (0.0, 1)])
+    def test_access_log_sampling_keeps_errors(self, sample_rate, logged):
+        client = TestClient(_build_app(log_sample_rate=sample_rate), raise_server_exceptions=False)
+
+        with patch("app.middleware.instrumentation.logger") as logger:
+            client.get("/items/1")
+            client.get("/boom")
+
+        assert logger.info.call_count == logged
+        assert logger.info.call_args.kwargs["extra"]["route"] == "/boom"
@@ -0,0 +1,161 @@
+import asyncio
+from datetime import date, datetime
+
+import asyncpg
+import pytest
+
+from app.repositories.sailings_repository import SailingsRepository
+from app.services.sailings_partitions import PartitionMaintenanceConfig, SailingsPartitionMaintainer
+from conftest import setup_db
+
+HEADER = (
+    "ORIGIN,DESTINATION,ORIGIN_PORT_CODE,DESTINATION_PORT_CODE,SERVICE_VERSION_AND_ROUNDTRIP_IDENTFIERS,"
+    "ORIGIN_SERVICE_VERSION_AND_MASTER,DESTINATION_SERVICE_VERSION_AND_MASTER,ORIGIN_AT_UTC,OFFERED_CAPACITY_TEU\n"
+)
+
+
+async def _partition_counts(conn: asyncpg.Connection) -> dict[str, int]:
+    rows = await conn.fetch("SELECT tableoid::regclass::text AS name, count(*) FROM sailings GROUP BY 1")
+    return {r["name"]: r["count"] for r in rows}
+
+
+async def _summary(conn: asyncpg.Connection) -> list[tuple]:
+    rows = await conn.fetch("SELECT * FROM weekly_capacity ORDER BY 1, 2, 3")
+    return [tuple(r.values()) for r in rows]
+
+
+@pytest.mark.asyncio
+class TestSailingsPartitions:
+
+    async def test_creating_a_partition_moves_rows_out_of_default(self, database_url):
+        await setup_db(database_url)
+        conn = await asyncpg.connect(database_url)
+        try:
+            summary = await _summary(conn)
+            assert await _partition_counts(conn) == {"sailings_default": 5}
+
+            created = await conn.fetchval(
+                "SELECT create_sailings_partitions($1, $2)",
+                datetime.fromisoformat("2024-01-31T23:00:00-05:00"),  # February in UTC
+                datetime.fromisoformat("2024-03-01T00:00:00+00:00"),
+            )
+
+            assert created == 2
+            assert await _partition_counts(conn) == {
+                "sailings_default": 2, "sailings_p2024_02": 1, "sailings_p2024_03": 2,
+            }
+            assert await _summary(conn) == summary
+            plan = "\n".join(r[0] for r in await conn.fetch(
+                "EXPLAIN SELECT * FROM sailings WHERE origin_at_utc >= '2024-03-01' AND origin_at_utc < '2024-03-15'"
+            ))
+            assert "sailings_p2024_03" in plan
+            assert "sailings_default" not in plan and "sailings_p2024_02" not in plan
+        finally:
+            await conn.close()
+
+    async def test_detached_months_keep_their_capacity(self, database_url):
+        await setup_db(database_url)
+        conn = await asyncpg.connect(database_url)
+        try:
+            await conn.fetchval(
+                "SELECT create_sailings_partitions($1, $2)",
+                datetime.fromisoformat("2024-01-01T00:00:00+00:00"),
+                datetime.fromisoformat("2024-03-01T00:00:00+00:00"),
+            )
+            summary = await _summary(conn)
+
+            detached = await SailingsRepository().detach_partitions(conn, date(2024, 3, 1))
+
+            assert detached == ["sailings_p2024_01", "sailings_p2024_02"]
+            assert await _partition_counts(conn) == {"sailings_p2024_03": 2}
+            assert await conn.fetchval("SELECT count(*) FROM sailings_p2024_01") == 2
+            assert await _summary(conn) == summary
+        finally:
+            await conn.execute("DROP TABLE IF EXISTS sailings_p2024_01, sailings_p2024_02")
+            await conn.close()
+
+    async def test_later_sailings_of_archived_voyages_leave_the_summary_alone(self, database_url):
+        await setup_db(database_url)
+        conn = await asyncpg.connect(database_url)
+        try:
+            await conn.fetchval(
+                "SELECT create_sailings_partitions($1, $2)",
+                datetime.fromisoformat("2024-01-01T00:00:00+00:00"),
+                datetime.fromisoformat("2024-03-01T00:00:00+00:00"),
+            )
+            repository = SailingsRepository()
+            assert await repository.detach_partitions(conn, date(2024, 2, 1)) == ["sailings_p2024_01"]
+            summary = await _summary(conn)
+            voyages = await conn.fetch("SELECT * FROM sailing_voyages ORDER BY sailing_id")
+
+            # SRV001 (archived with January) is revised to March; SRV006 is a new voyage
+            counts = await repository.bulk_upsert(conn, [
+                (1, "china_main", "north_europe_main", "NLRTM", "CNSHA", "SRV001", "china_main",
+                 "north_europe_main", datetime.fromisoformat("2024-03-12T08:00:00+00:00"), 21000),
+                (2, "china_main", "north_europe_main", "NLRTM", "CNSHA", "SRV006", "china_main",
+                 "north_europe_main", datetime.fromisoformat("2024-03-26T08:00:00+00:00"), 18000),
+            ])
+
+            assert (counts["distinct"], counts["archived"], counts["inserted"]) == (2, 1, 1)
+            assert await conn.fetchval(
+                "SELECT count(*) FROM sailings WHERE service_version_and_roundtrip_identfiers = 'SRV001'"
+            ) == 0
+            assert await _summary(conn) == summary + [
+                ("china_main", "north_europe_main", date(2024, 3, 25), 18000, 1),
+            ]
+
+            # Writes bypassing the load do not re-elect the voyage either
+            await conn.execute(
+                """
+                INSERT INTO sailings (origin, destination, origin_port_code, destination_port_code,
+                    service_version_and_roundtrip_identfiers, origin_service_version_and_master,
+                    destination_service_version_and_master, origin_at_utc, offered_capacity_teu)
+                VALUES ('china_main', 'north_europe_main', 'NLRTM', 'CNSHA', 'SRV001', 'china_main',
+                        'north_europe_main', '2024-03-12T08:00:00+00:00', 21000)
+                """
+            )
+            await conn.execute("DELETE FROM sailings WHERE service_version_and_roundtrip_identfiers = 'SRV006'")
+
+            assert await _summary(conn) == summary + [
+                ("china_main", "north_europe_main", date(2024, 3, 25), 0, 0),
+            ]
+            assert await conn.fetch("SELECT * FROM sailing_voyages ORDER BY sailing_id") == voyages
+        finally:
+            await conn.execute("DROP TABLE IF EXISTS sailings_p2024_01")
+            await conn.close()
+
+    async def test_maintainer_creates_the_coming_months(self, database_url):
+        await setup_db(database_url)
+        database = await asyncpg.create_pool(database_url, min_size=1, max_size=1)
+        try:
+            # Migration 006 already created the current month and the next three
+            maintainer = SailingsPartitionMaintainer(database, PartitionMaintenanceConfig(months_ahead=5))
+
+            assert await maintainer.run_once() == 2
+            assert await maintainer.run_once() == 0
+        finally:
+            await database.close()
+
+
+class TestBulkIngestPartitions:
+
+    def test_upload_creates_the_partitions_of_its_months(self, app_client, database_url):
+        body = HEADER + (
+            "china_main,north_europe_main,CNSHA,NLRTM,SRV900,china_main,north_europe_main,2030-05-06 08:00:00,100\n"
+        )
+
+        response = app_client.post("/sailings/bulk", content=body, headers={"Content-Type": "text/csv"})
+
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 1
+        capacity = app_client.get("/capacity?date_from=2030-05-06&date_to=2030-05-12").json()
+        assert capacity[0]["offered_capacity_teu"] == 100
+
+        async def partition_counts():
+            conn = await asyncpg.connect(database_url)
+            try:
+                return await _partition_counts(conn)
+            finally:
+                await conn.close()
+
+        assert asyncio.run(partition_counts())["sailings_p2030_05"] == 1
@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core import monitoring
+from app.core.monitoring import QueryPlanCapture, SlowQueryConfig, plan_node_times
+from app.db.pool import DatabasePool, DBConfig
+from app.repositories.capacity_repository import CapacityRepository
+from conftest import setup_db
+
+
+def _captured(query_name: str, reason: str) -> float:
+    return REGISTRY.get_sample_value(
+        "capacity_query_plans_captured_total", {"query_name": query_name, "reason": reason}
+    ) or 0.0
+
+
+class TestPlanNodeTimes:
+
+    def test_node_time_excludes_children_and_counts_loops(self):
+        plan = {
+            "Node Type": "Nested Loop", "Actual Total Time": 10.0, "Actual Loops": 1,
+            "Plans": [
+                {"Node Type": "Seq Scan", "Actual Total Time": 2.0, "Actual Loops": 1},
+                {"Node Type": "Index Scan", "Actual Total Time": 0.5, "Actual Loops": 10},
+            ],
+        }
+
+        times = dict(plan_node_times(plan))
+
+        assert times["Nested Loop"] == pytest.approx(0.003)
+        assert times["Seq Scan"] == pytest.approx(0.002)
+        assert times["Index Scan"] == pytest.approx(0.005)
+
+
+@pytest.mark.asyncio
+class TestQueryPlanCapture:
+
+    async def test_sampled_call_is_explained_out_of_band(self, monkeypatch, database_url):
+        await setup_db(database_url)
+        database = DatabasePool()
+        await database.initialize(DBConfig(dsn=database_url, min_size=1, max_size=2))
+        capture = QueryPlanCapture(SlowQueryConfig(sample_rate=1.0))
+        capture.bind(database.acquire)
+        monkeypatch.setattr(monitoring, "query_plans", capture)
+        try:
+            captured = _captured("fetch_capacity", "sampled")
+            async with database.acquire() as conn:
+                rows = await CapacityRepository().fetch_capacity(conn, date(2024, 1, 1), date(2024, 3, 31))
+            await capture._task
+
+            entry = capture.recent[-1]
+            assert entry["query_name"] == "fetch_capacity"
+            assert entry["reason"] == "sampled"
+            assert entry["rows"] == len(rows)
+            assert entry["parameters"][:4] == ["china_main", "north_europe_main", "2024-01-01", "2024-03-31"]
+            assert "Shared Hit Blocks" in entry["plan"]["Plan"]
+            assert _captured("fetch_capacity", "sampled") - captured == 1
+
+            # Rate-limited per query
+            async with database.acquire() as conn:
+                await CapacityRepository().fetch_capacity(conn, date(2024, 1, 1), date(2024, 3, 31))
+            assert capture._task is None
+            assert len(capture.recent) == 1
+        finally:
+            await capture.aclose()
+            await database.close()
+
+    async def test_fast_unsampled_calls_are_not_explained(self):
+        capture = QueryPlanCapture(SlowQueryConfig(threshold_seconds=1.0))
+        capture.bind(lambda: pytest.fail("no connection should be acquired"))
+
+        capture.maybe_capture("fetch_capacity", 0.01, [("SELECT 1", ())])
+
+        assert capture._task is None
+
+
+class TestSlowQueriesEndpoint:
+
+    def test_lists_recent_plans_newest_first(self, monkeypatch, app_client):
+        capture = QueryPlanCapture(SlowQueryConfig(threshold_seconds=0.5, debug_endpoint=True))
+        plan = {"Plan": {"Node Type": "Seq Scan", "Actual Total Time": 1.0, "Actual Rows": 3, "Plan Width": 8},
+                "Execution Time": 1.2}
+        capture.record("fetch_capacity", "slow", 0.8, ("china_main",), plan)
+        capture.record("fetch_weekly_voyages", "slow", 0.9, ([], [], []), plan)
+        monkeypatch.setattr(monitoring, "query_plans", capture)
+
+        body = app_client.get("/debug/slow-queries?limit=1").json()
+
+        assert body["threshold_seconds"] == 0.5
+        assert [p["query_name"] for p in body["plans"]] == ["fetch_weekly_voyages"]
+        assert body["plans"][0]["result_bytes"] == 24
+
+    def test_is_not_found_unless_enabled(self, monkeypatch, app_client):
+        capture = QueryPlanCapture(SlowQueryConfig())
+        capture.record("fetch_capacity", "slow", 0.8, ("china_main",), {"Plan": {"Node Type": "Seq Scan"}})
+        monkeypatch.setattr(monitoring, "query_plans", capture)
+
+        assert app_client.get("/debug/slow-queries").status_code == 404
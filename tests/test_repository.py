@@ -3,10 +3,52 @@ import asyncpg
 from datetime import date, timedelta
 from unittest.mock import AsyncMock, patch
 from decimal import Decimal
-from app.repositories.capacity_repository import CapacityRepository
+from prometheus_client import REGISTRY
+from app.repositories.capacity_repository import CAPACITY_COLUMNS, CapacityRepository, Corridor, DEFAULT_CORRIDOR
 from app.exceptions import CapacityDatabaseException
+from app.services.capacity_service import CapacityService
+from app.services.capacity_export import EXPORT_FORMATS
+from app.services.weekly_capacity import compose_weekly_capacity, compose_weekly_columns, weeks_in_range
 from conftest import setup_db
 
+# The original capacity query (before the summary tables), for the default corridor: each
+# voyage counts at its latest sailing within the range
+BASELINE_CAPACITY_QUERY = """
+WITH base AS (
+    SELECT
+        date_trunc('week', origin_at_utc) AS week_start_date,
+        offered_capacity_teu,
+        ROW_NUMBER() OVER (
+            PARTITION BY
+                service_version_and_roundtrip_identfiers,
+                origin_service_version_and_master,
+                destination_service_version_and_master
+            ORDER BY origin_at_utc DESC
+        ) AS rn
+    FROM sailings
+    WHERE
+        origin = 'china_main'
+        AND destination = 'north_europe_main'
+        AND origin_at_utc BETWEEN $1 AND $2
+),
+weekly_capacity AS (
+    SELECT week_start_date, SUM(offered_capacity_teu) AS offered_capacity_teu
+    FROM base
+    WHERE rn = 1
+    GROUP BY week_start_date
+)
+SELECT
+    week_start_date::date AS week_start_date,
+    EXTRACT(WEEK FROM week_start_date)::int AS week_no,
+    offered_capacity_teu,
+    AVG(offered_capacity_teu) OVER (
+        ORDER BY week_start_date
+        ROWS BETWEEN 3 PRECEDING AND CURRENT ROW
+    )::integer AS offered_capacity_teu_4w_rolling_avg
+FROM weekly_capacity
+ORDER BY week_start_date;
+"""
+
 
 @pytest.mark.asyncio
 class TestCapacityRepository:
@@ -76,6 +118,241 @@ class TestCapacityRepository:
         finally:
             await conn.close()
 
+    async def test_weekly_voyages_compose_to_capacity_query_result(self, database_url):
+        """Ranges composed from cached weeks must equal the SQL aggregation, edges included."""
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            # Later revisions of existing voyages, crossing week boundaries
+            await conn.execute(
+                """
+                INSERT INTO sailings (origin, destination, origin_port_code, destination_port_code,
+                    service_version_and_roundtrip_identfiers, origin_service_version_and_master,
+                    destination_service_version_and_master, origin_at_utc, offered_capacity_teu)
+                VALUES
+                    ('china_main', 'north_europe_main', 'NLRTM', 'CNSHA', 'SRV001', 'china_main',
+                     'north_europe_main', '2024-01-09T08:00:00+00:00', 21000),
+                    ('china_main', 'north_europe_main', 'DEHAM', 'CNSHA', 'SRV003', 'china_main',
+                     'north_europe_main', '2024-03-01T08:00:00+00:00', 25000)
+                """
+            )
+            service = CapacityService()
+            for start, end in [
+                (date(2024, 1, 1), date(2024, 3, 31)),
+                (date(2024, 1, 4), date(2024, 1, 9)),
+                (date(2024, 2, 20), date(2024, 2, 29)),
+            ]:
+                expected = await service.repo.fetch_capacity(conn, start, end)
+                weeks = await service._fetch_weeks(
+                    conn, [(DEFAULT_CORRIDOR, w) for w in weeks_in_range(start, end)]
+                )
+                composed = compose_weekly_capacity(
+                    [v for voyages in weeks.values() for v in voyages], start, end
+                )
+                assert composed == expected
+        finally:
+            await conn.close()
+
+    async def test_voyage_revised_outside_the_range_still_counts_within_it(self, database_url):
+        """Ranges match the original query when a voyage has later sailings past their end."""
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            # SRV001 sails on 2024-01-03, then is revised to 2024-01-17 and 2024-02-07
+            await conn.execute(
+                """
+                INSERT INTO sailings (origin, destination, origin_port_code, destination_port_code,
+                    service_version_and_roundtrip_identfiers, origin_service_version_and_master,
+                    destination_service_version_and_master, origin_at_utc, offered_capacity_teu)
+                VALUES
+                    ('china_main', 'north_europe_main', 'NLRTM', 'CNSHA', 'SRV001', 'china_main',
+                     'north_europe_main', '2024-01-17T08:00:00+00:00', 21000),
+                    ('china_main', 'north_europe_main', 'NLRTM', 'CNSHA', 'SRV001', 'china_main',
+                     'north_europe_main', '2024-02-07T08:00:00+00:00', 23000)
+                """
+            )
+            service = CapacityService()
+            for start, end in [
+                (date(2024, 1, 1), date(2024, 1, 14)),
+                (date(2024, 1, 1), date(2024, 1, 31)),
+                (date(2024, 1, 2), date(2024, 1, 20)),
+                (date(2024, 1, 1), date(2024, 3, 31)),
+            ]:
+                expected = [dict(r) for r in await conn.fetch(BASELINE_CAPACITY_QUERY, start, end)]
+                weeks = await service._fetch_weeks(conn, [(DEFAULT_CORRIDOR, w) for w in weeks_in_range(start, end)])
+                composed = compose_weekly_capacity([v for voyages in weeks.values() for v in voyages], start, end)
+
+                assert await service.repo.fetch_capacity(conn, start, end) == expected
+                assert composed == expected
+
+            first = await service.repo.fetch_capacity(conn, date(2024, 1, 1), date(2024, 1, 14))
+            assert [r["offered_capacity_teu"] for r in first] == [20000]
+        finally:
+            await conn.close()
+
+    async def test_range_within_one_week_counts_only_its_own_days(self, database_url):
+        """A range inside one week, not starting on Monday, must not pick up the rest of the week."""
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            service = CapacityService()
+            # Sailing on Wednesday 2024-01-03 08:00 (week of 2024-01-01)
+            for start, end, teu in [
+                (date(2024, 1, 2), date(2024, 1, 4), [20000]),
+                (date(2024, 1, 4), date(2024, 1, 5), []),
+                (date(2024, 1, 2), date(2024, 1, 2), []),
+            ]:
+                expected = await service.repo.fetch_capacity(conn, start, end)
+                weeks = await service._fetch_weeks(conn, [(DEFAULT_CORRIDOR, w) for w in weeks_in_range(start, end)])
+                composed = compose_weekly_capacity([v for voyages in weeks.values() for v in voyages], start, end)
+
+                assert [r["offered_capacity_teu"] for r in expected] == teu
+                assert composed == expected
+        finally:
+            await conn.close()
+
+    async def test_export_of_a_range_within_one_week_matches_composed_columns(self, database_url):
+        """Without Redis, exports are encoded from the capacity query's columns."""
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            service = CapacityService()
+            csv = EXPORT_FORMATS["csv"]
+            for start, end, teu in [
+                (date(2024, 1, 2), date(2024, 1, 4), [20000]),
+                (date(2024, 1, 4), date(2024, 1, 5), []),
+            ]:
+                columns = await service.repo.fetch_capacity_columns(conn, start, end)
+                weeks = await service._fetch_weeks(conn, [(DEFAULT_CORRIDOR, w) for w in weeks_in_range(start, end)])
+                composed = compose_weekly_columns([v for voyages in weeks.values() for v in voyages], start, end)
+
+                assert list(columns["offered_capacity_teu"]) == composed["offered_capacity_teu"] == teu
+                assert await service.get_capacity_export(conn, start, end, csv) == csv.encode(composed)
+        finally:
+            await conn.close()
+
+    async def test_weekly_capacity_summary_follows_sailing_writes(self, database_url):
+        """Triggers move a voyage's TEU to the week of its latest sailing on insert/delete."""
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            async def summary():
+                rows = await conn.fetch(
+                    "SELECT week_start_date, offered_capacity_teu FROM weekly_capacity "
+                    "WHERE voyage_count > 0 AND week_start_date < '2024-02-01' ORDER BY 1"
+                )
+                return [(r["week_start_date"], r["offered_capacity_teu"]) for r in rows]
+
+            assert await summary() == [(date(2024, 1, 1), 20000), (date(2024, 1, 15), 22000)]
+
+            revision_id = await conn.fetchval(
+                """
+                INSERT INTO sailings (origin, destination, origin_port_code, destination_port_code,
+                    service_version_and_roundtrip_identfiers, origin_service_version_and_master,
+                    destination_service_version_and_master, origin_at_utc, offered_capacity_teu)
+                VALUES ('china_main', 'north_europe_main', 'NLRTM', 'CNSHA', 'SRV001', 'china_main',
+                        'north_europe_main', '2024-01-09T08:00:00+00:00', 21000)
+                RETURNING id
+                """
+            )
+            assert await summary() == [(date(2024, 1, 8), 21000), (date(2024, 1, 15), 22000)]
+
+            await conn.execute("DELETE FROM sailings WHERE id = $1", revision_id)
+            assert await summary() == [(date(2024, 1, 1), 20000), (date(2024, 1, 15), 22000)]
+        finally:
+            await conn.close()
+
+    async def test_sailing_natural_key_is_unique(self, database_url):
+        """A sailing repeated with the same voyage, departure and ports is rejected."""
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            with pytest.raises(asyncpg.UniqueViolationError):
+                await conn.execute(
+                    """
+                    INSERT INTO sailings (origin, destination, origin_port_code, destination_port_code,
+                        service_version_and_roundtrip_identfiers, origin_service_version_and_master,
+                        destination_service_version_and_master, origin_at_utc, offered_capacity_teu)
+                    SELECT origin, destination, origin_port_code, destination_port_code,
+                        service_version_and_roundtrip_identfiers, origin_service_version_and_master,
+                        destination_service_version_and_master, origin_at_utc, offered_capacity_teu + 1
+                    FROM sailings
+                    LIMIT 1
+                    """
+                )
+
+            voyages, keys = await conn.fetchrow(
+                "SELECT count(*), count(DISTINCT voyage_key) FROM sailing_voyages"
+            )
+            assert voyages == keys
+        finally:
+            await conn.close()
+
+    async def test_fetch_capacity_filters_by_corridor(self, database_url):
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            await conn.execute(
+                """
+                INSERT INTO sailings (origin, destination, origin_port_code, destination_port_code,
+                    service_version_and_roundtrip_identfiers, origin_service_version_and_master,
+                    destination_service_version_and_master, origin_at_utc, offered_capacity_teu)
+                VALUES ('china_main', 'med_main', 'CNSHA', 'ITGOA', 'SRV101', 'china_main',
+                        'med_main', '2024-01-03T08:00:00+00:00', 9000)
+                """
+            )
+            repo = CapacityRepository()
+            med = await repo.fetch_capacity(
+                conn, date(2024, 1, 1), date(2024, 3, 31), Corridor("china_main", "med_main")
+            )
+            default = await repo.fetch_capacity(conn, date(2024, 1, 1), date(2024, 3, 31))
+
+            assert [r["offered_capacity_teu"] for r in med] == [9000]
+            assert default[0]["offered_capacity_teu"] == 20000
+        finally:
+            await conn.close()
+
+    async def test_stream_capacity_yields_fetch_capacity_rows_in_batches(self, database_url):
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            repo = CapacityRepository()
+            expected = await repo.fetch_capacity(conn, date(2024, 1, 1), date(2024, 3, 31))
+            batches = [
+                batch async for batch in repo.stream_capacity(conn, date(2024, 1, 1), date(2024, 3, 31), batch_rows=2)
+            ]
+
+            assert len(expected) > 2
+            assert [len(batch) for batch in batches[:-1]] == [2] * (len(batches) - 1)
+            assert [row for batch in batches for row in batch] == expected
+            assert not conn.is_in_transaction()
+        finally:
+            await conn.close()
+
+    async def test_fetch_capacity_columns_transposes_fetch_capacity(self, database_url):
+        await self._prepare_db(database_url)
+
+        conn = await asyncpg.connect(database_url)
+        try:
+            repo = CapacityRepository()
+            rows = await repo.fetch_capacity(conn, date(2024, 1, 1), date(2024, 3, 31))
+            columns = await repo.fetch_capacity_columns(conn, date(2024, 1, 1), date(2024, 3, 31))
+            empty = await repo.fetch_capacity_columns(conn, date(2030, 1, 1), date(2030, 3, 31))
+
+            assert tuple(columns) == CAPACITY_COLUMNS
+            assert columns == {name: tuple(r[name] for r in rows) for name in CAPACITY_COLUMNS}
+            assert empty == {name: () for name in CAPACITY_COLUMNS}
+        finally:
+            await conn.close()
+
     async def test_fetch_capacity_connection_error(self, database_url):
         repo = CapacityRepository()
         conn = await asyncpg.connect(database_url)
@@ -98,6 +375,22 @@ class TestCapacityRepository:
         assert len(results) == 1
         assert results[0]["week_no"] == 1
 
+    async def test_monitor_counts_the_rows_of_column_results(self):
+        repo = CapacityRepository()
+        mock_conn = AsyncMock()
+        mock_conn.fetch.return_value = [
+            (date(2024, 1, 1), 1, 20000, 20000),
+            (date(2024, 1, 8), 2, 18000, 19000),
+        ]
+        rows = REGISTRY.get_sample_value("capacity_query_rows_sum", {"query_name": "fetch_capacity_columns"}) or 0
+
+        columns = await repo.fetch_capacity_columns(mock_conn, date(2024, 1, 1), date(2024, 1, 14))
+
+        assert columns["offered_capacity_teu"] == (20000, 18000)
+        assert REGISTRY.get_sample_value(
+            "capacity_query_rows_sum", {"query_name": "fetch_capacity_columns"}
+        ) - rows == 2
+
     async def test_fetch_capacity_monitor_decorator_slow(self):
         """Simulate a slow query without real sleep — ensure monitor logs slow queries safely."""
         repo = CapacityRepository()
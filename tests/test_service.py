@@ -1,10 +1,40 @@
+import json
+import time
+import asyncio
 import pytest
-from datetime import date
-from unittest.mock import Mock, AsyncMock
+from datetime import date, datetime, timezone
+from unittest.mock import Mock, AsyncMock, patch
+from app.cache.codec import CacheCodecConfig, EntryCodec
+from app.cache.policy import CachePolicy
+from app.cache.single_flight import CacheLockConfig
+from app.services.capacity_export import EXPORT_FORMATS
 from app.services.capacity_service import CapacityService
+from app.services.weekly_capacity import NOT_SUPERSEDED
+from app.repositories.capacity_repository import Corridor, DEFAULT_CORRIDOR
 from app.exceptions import CapacityValidationException, CapacityDatabaseException, CapacityUnexpectedException
 
 
+def _week(voyages, age=0.0, duration=0.01):
+    """A cached week, computed `age` seconds ago."""
+    return {"t": time.time() - age, "d": duration, "v": voyages}
+
+
+def _entry(voyages, age=0.0, duration=0.01):
+    """A cached week as written to Redis by the service."""
+    return EntryCodec(CacheCodecConfig(codec="json")).encode(_week(voyages, age, duration))
+
+
+def _mock_pipeline(mock_redis):
+    """Attach a pipeline mock (queued commands are sync, execute is async) to a Redis mock."""
+    pipeline = AsyncMock()
+    mock_redis.pipeline = Mock(return_value=pipeline)
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.setex = Mock()
+    pipeline.publish = Mock()
+    pipeline.unlink = Mock()
+    return pipeline
+
+
 @pytest.mark.asyncio
 class TestCapacityService:
 
@@ -57,3 +87,372 @@ class TestCapacityService:
                 end=date(2024, 3, 31)
             )
         assert "Database operation failed" in str(exc_info.value)
+
+    async def test_get_capacity_uses_injected_redis_client(self):
+        mock_redis = AsyncMock()
+        # 2024-01-03T08:00Z as epoch microseconds
+        mock_redis.mget.return_value = [_entry([[1704268800000000, 20000, NOT_SUPERSEDED]])]
+        mock_repo = Mock()
+        mock_repo.fetch_capacity = AsyncMock()
+        mock_repo.fetch_weekly_voyages = AsyncMock()
+
+        service = CapacityService(redis=mock_redis, repo=mock_repo)
+        result = await service.get_capacity_rolling_average(
+            conn=AsyncMock(),
+            start=date(2024, 1, 1),
+            end=date(2024, 1, 7)
+        )
+
+        assert result == [{
+            "week_start_date": date(2024, 1, 1),
+            "week_no": 1,
+            "offered_capacity_teu": 20000,
+            "offered_capacity_teu_4w_rolling_avg": 20000,
+        }]
+        mock_redis.mget.assert_awaited_once_with(["capacity:voyages:china_main:north_europe_main:2024-01-01"])
+        mock_repo.fetch_capacity.assert_not_called()
+        mock_repo.fetch_weekly_voyages.assert_not_called()
+
+    async def test_get_capacity_fetches_only_missing_weeks(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [_entry([]), None, _entry([])]
+        pipeline = _mock_pipeline(mock_redis)
+        mock_repo = Mock()
+        mock_repo.fetch_weekly_voyages = AsyncMock(return_value=[
+            {
+                "origin": "china_main",
+                "destination": "north_europe_main",
+                "week_start_date": date(2024, 1, 8),
+                "origin_at_utc": datetime(2024, 1, 10, 8, tzinfo=timezone.utc),
+                "offered_capacity_teu": 18000,
+                "superseded_at": None,
+            }
+        ])
+
+        service = CapacityService(redis=mock_redis, repo=mock_repo)
+        result = await service.get_capacity_rolling_average(
+            conn=AsyncMock(),
+            start=date(2024, 1, 1),
+            end=date(2024, 1, 15)
+        )
+
+        assert [r["offered_capacity_teu"] for r in result] == [18000]
+        mock_repo.fetch_weekly_voyages.assert_awaited_once()
+        assert mock_repo.fetch_weekly_voyages.await_args.args[1] == [(DEFAULT_CORRIDOR, date(2024, 1, 8))]
+        pipeline.setex.assert_called_once()
+        assert pipeline.setex.call_args.args[0] == "capacity:voyages:china_main:north_europe_main:2024-01-08"
+
+    async def test_get_capacity_cache_keys_include_corridor(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [_entry([])]
+
+        service = CapacityService(redis=mock_redis, repo=Mock())
+        await service.get_capacity_rolling_average(
+            conn=AsyncMock(),
+            start=date(2024, 1, 1),
+            end=date(2024, 1, 7),
+            corridor=Corridor("china_main", "med_main"),
+        )
+
+        mock_redis.mget.assert_awaited_once_with(["capacity:voyages:china_main:med_main:2024-01-01"])
+
+    async def test_get_capacity_batch_single_round_trip_per_tier(self):
+        mock_redis = AsyncMock()
+        # Slots in first-seen order: med 01-01, med 01-08, north_europe 01-08
+        mock_redis.mget.return_value = [_entry([]), None, None]
+        pipeline = _mock_pipeline(mock_redis)
+        mock_repo = Mock()
+        mock_repo.fetch_weekly_voyages = AsyncMock(return_value=[
+            {
+                "origin": "china_main",
+                "destination": "med_main",
+                "week_start_date": date(2024, 1, 8),
+                "origin_at_utc": datetime(2024, 1, 10, 8, tzinfo=timezone.utc),
+                "offered_capacity_teu": 9000,
+                "superseded_at": None,
+            },
+            {
+                "origin": "china_main",
+                "destination": "north_europe_main",
+                "week_start_date": date(2024, 1, 8),
+                "origin_at_utc": datetime(2024, 1, 9, 8, tzinfo=timezone.utc),
+                "offered_capacity_teu": 18000,
+                "superseded_at": None,
+            },
+        ])
+        med = Corridor("china_main", "med_main")
+
+        service = CapacityService(redis=mock_redis, repo=mock_repo)
+        results = await service.get_capacity_batch(
+            conn=AsyncMock(),
+            items=[
+                (med, date(2024, 1, 1), date(2024, 1, 14)),
+                (DEFAULT_CORRIDOR, date(2024, 1, 8), date(2024, 1, 14)),
+                (med, date(2024, 1, 8), date(2024, 1, 9)),
+            ],
+        )
+
+        assert [[r["offered_capacity_teu"] for r in rows] for rows in results] == [[9000], [18000], []]
+        mock_redis.mget.assert_awaited_once_with([
+            "capacity:voyages:china_main:med_main:2024-01-01",
+            "capacity:voyages:china_main:med_main:2024-01-08",
+            "capacity:voyages:china_main:north_europe_main:2024-01-08",
+        ])
+        mock_repo.fetch_weekly_voyages.assert_awaited_once()
+        assert mock_repo.fetch_weekly_voyages.await_args.args[1] == [
+            (med, date(2024, 1, 8)),
+            (DEFAULT_CORRIDOR, date(2024, 1, 8)),
+        ]
+        assert pipeline.setex.call_count == 2
+
+    async def test_get_capacity_batch_validation(self):
+        service = CapacityService(repo=Mock())
+        with pytest.raises(CapacityValidationException):
+            await service.get_capacity_batch(
+                conn=AsyncMock(),
+                items=[(DEFAULT_CORRIDOR, date(2024, 3, 31), date(2024, 1, 1))],
+            )
+
+    async def test_concurrent_identical_misses_run_one_query(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [None]
+        pipeline = _mock_pipeline(mock_redis)
+        mock_repo = Mock()
+
+        async def fetch_weekly_voyages(conn, slots):
+            await asyncio.sleep(0.01)
+            return []
+        mock_repo.fetch_weekly_voyages = AsyncMock(side_effect=fetch_weekly_voyages)
+
+        service = CapacityService(redis=mock_redis, repo=mock_repo)
+        await asyncio.gather(*(
+            service.get_capacity_rolling_average(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7))
+            for _ in range(10)
+        ))
+
+        mock_repo.fetch_weekly_voyages.assert_awaited_once()
+        # ...and write the week to Redis once
+        pipeline.setex.assert_called_once()
+        pipeline.execute.assert_awaited_once()
+
+    async def test_locked_miss_waits_for_other_worker(self):
+        mock_redis = AsyncMock()
+        # Miss on first read, then the lock holder's result shows up
+        mock_redis.mget.side_effect = [[None], [None], [_entry([[1704268800000000, 20000, NOT_SUPERSEDED]])]]
+        mock_redis.set.return_value = None  # lock held by another worker
+        mock_repo = Mock()
+        mock_repo.fetch_weekly_voyages = AsyncMock()
+
+        service = CapacityService(
+            redis=mock_redis,
+            repo=mock_repo,
+            lock_config=CacheLockConfig(enabled=True, poll_interval=0.001),
+        )
+        result = await service.get_capacity_rolling_average(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7))
+
+        assert [r["offered_capacity_teu"] for r in result] == [20000]
+        mock_repo.fetch_weekly_voyages.assert_not_called()
+        assert mock_redis.set.await_args.kwargs["nx"] is True
+
+    async def test_stale_week_is_served_and_refreshed_in_background(self):
+        policy = CachePolicy(ttl=60, grace=60, beta=0)
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [_entry([[1704268800000000, 20000, NOT_SUPERSEDED]], age=90)]
+        pipeline = _mock_pipeline(mock_redis)
+        mock_repo = Mock()
+        mock_repo.fetch_weekly_voyages = AsyncMock(return_value=[])
+        db_pool = Mock()
+        db_pool.acquire.return_value.__aenter__ = AsyncMock(return_value=AsyncMock())
+        db_pool.acquire.return_value.__aexit__ = AsyncMock(return_value=None)
+
+        service = CapacityService(redis=mock_redis, repo=mock_repo, db_pool=db_pool)
+        request_conn = AsyncMock()
+        result = await service.get_capacity_rolling_average(
+            request_conn, date(2024, 1, 1), date(2024, 1, 7), policy=policy
+        )
+
+        # Stale data is answered immediately...
+        assert [r["offered_capacity_teu"] for r in result] == [20000]
+        # ...and recomputed on a connection of its own
+        await asyncio.gather(*service._refreshes.values())
+        mock_repo.fetch_weekly_voyages.assert_awaited_once()
+        assert mock_repo.fetch_weekly_voyages.await_args.args[0] is not request_conn
+        key, ttl, value = pipeline.setex.call_args.args
+        assert ttl == policy.hard_ttl
+        assert service._deserialize_week(value)["v"] == []
+
+    async def test_week_past_grace_is_a_miss(self):
+        policy = CachePolicy(ttl=60, grace=60, beta=0)
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [_entry([[1704268800000000, 20000, NOT_SUPERSEDED]], age=150)]
+        pipeline = _mock_pipeline(mock_redis)
+        mock_repo = Mock()
+        mock_repo.fetch_weekly_voyages = AsyncMock(return_value=[])
+
+        service = CapacityService(redis=mock_redis, repo=mock_repo)
+        result = await service.get_capacity_rolling_average(
+            AsyncMock(), date(2024, 1, 1), date(2024, 1, 7), policy=policy
+        )
+
+        assert result == []
+        mock_repo.fetch_weekly_voyages.assert_awaited_once()
+        # The reloaded week replaces the expired entry
+        _, ttl, value = pipeline.setex.call_args.args
+        assert ttl == policy.hard_ttl
+        assert service._deserialize_week(value)["v"] == []
+
+    async def test_l1_cache_serves_repeated_reads_without_redis(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [_entry([[1704268800000000, 20000, NOT_SUPERSEDED]])]
+
+        service = CapacityService(redis=mock_redis, repo=Mock())
+        for _ in range(3):
+            result = await service.get_capacity_rolling_average(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7))
+            assert [r["offered_capacity_teu"] for r in result] == [20000]
+
+        mock_redis.mget.assert_awaited_once()
+
+    async def test_writes_announce_invalidation_to_other_workers(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [None]
+        pipeline = _mock_pipeline(mock_redis)
+        mock_repo = Mock()
+        mock_repo.fetch_weekly_voyages = AsyncMock(return_value=[])
+        writer = CapacityService(redis=mock_redis, repo=mock_repo)
+        reader = CapacityService(redis=AsyncMock(), repo=Mock())
+        key = "capacity:voyages:china_main:north_europe_main:2024-01-01"
+        reader.local.set(key, _week([]), size=100)
+
+        await writer.get_capacity_rolling_average(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7))
+        channel, message = pipeline.publish.call_args.args
+        reader._apply_invalidation(message)
+        writer._apply_invalidation(message)
+
+        assert channel == "capacity:invalidate"
+        assert reader.local.get(key) is None
+        # The writer ignores its own message and keeps the week it just cached
+        assert writer.local.get(key) is not None
+
+    async def test_capacity_json_is_served_from_cached_body(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [_entry([[1704268800000000, 20000, NOT_SUPERSEDED]])]
+        service = CapacityService(redis=mock_redis, repo=Mock())
+
+        first = await service.get_capacity_json(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7))
+        with patch("app.services.capacity_service.compose_weekly_capacity") as compose:
+            second = await service.get_capacity_json(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7))
+            compose.assert_not_called()
+
+        assert first == second
+        assert json.loads(first) == [{
+            "week_start_date": "2024-01-01",
+            "week_no": 1,
+            "offered_capacity_teu": 20000,
+            "offered_capacity_teu_4w_rolling_avg": 20000,
+        }]
+
+        # A new version of a source week drops the cached body
+        service.local.invalidate(["capacity:voyages:china_main:north_europe_main:2024-01-01"])
+        assert service.local.peek("capacity:response:china_main:north_europe_main:2024-01-01:2024-01-07") is None
+
+    async def test_capacity_export_is_cached_as_a_blob_per_format(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [_entry([[1704268800000000, 20000, NOT_SUPERSEDED]])]
+        service = CapacityService(redis=mock_redis, repo=Mock())
+        csv_format, parquet_format = EXPORT_FORMATS["csv"], EXPORT_FORMATS["parquet"]
+
+        body = await service.get_capacity_export(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7), csv_format)
+        with patch("app.services.capacity_service.compose_weekly_columns") as compose:
+            assert await service.get_capacity_export(
+                AsyncMock(), date(2024, 1, 1), date(2024, 1, 7), csv_format
+            ) == body
+            compose.assert_not_called()
+        parquet = await service.get_capacity_export(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7), parquet_format)
+
+        assert body == (
+            b"week_start_date,week_no,offered_capacity_teu,offered_capacity_teu_4w_rolling_avg\n"
+            b"2024-01-01,1,20000,20000\n"
+        )
+        assert parquet.startswith(b"PAR1")
+        service.local.invalidate(["capacity:voyages:china_main:north_europe_main:2024-01-01"])
+        assert service.local.peek("capacity:response:china_main:north_europe_main:2024-01-01:2024-01-07:csv") is None
+
+    async def test_change_notification_evicts_only_overlapping_weeks(self):
+        mock_redis = AsyncMock()
+        pipeline = _mock_pipeline(mock_redis)
+        service = CapacityService(redis=mock_redis, repo=Mock())
+        keys = [
+            "capacity:voyages:china_main:north_europe_main:2024-01-01",
+            "capacity:voyages:china_main:north_europe_main:2024-01-08",
+            "capacity:voyages:china_main:north_europe_main:2024-01-15",
+            "capacity:voyages:china_main:med_main:2024-01-08",
+        ]
+        for key in keys:
+            service.local.set(key, _week([]), size=100)
+
+        await service.apply_capacity_changes([json.dumps({
+            "origin": "china_main", "destination": "north_europe_main", "from": "2024-01-08", "to": "2024-01-15",
+        })])
+
+        assert [key for key in keys if service.local.peek(key) is not None] == [keys[0], keys[3]]
+        pipeline.unlink.assert_called_once_with(keys[1], keys[2])
+
+    async def test_load_started_before_change_is_not_cached(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [None]
+        pipeline = _mock_pipeline(mock_redis)
+        mock_repo = Mock()
+        service = CapacityService(redis=mock_redis, repo=mock_repo)
+
+        async def fetch_while_data_changes(conn, slots):
+            # The notification of a concurrent write arrives while the query runs
+            await service.apply_capacity_changes([json.dumps({
+                "origin": "china_main", "destination": "north_europe_main", "from": "2024-01-01", "to": "2024-01-01",
+            })])
+            return []
+
+        mock_repo.fetch_weekly_voyages = fetch_while_data_changes
+        await service.get_capacity_rolling_average(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7))
+
+        pipeline.setex.assert_not_called()
+        assert service.local.peek("capacity:voyages:china_main:north_europe_main:2024-01-01") is None
+
+    async def test_replica_load_is_not_cached_over_a_recent_change(self):
+        mock_redis = AsyncMock()
+        mock_redis.mget.return_value = [None]
+        pipeline = _mock_pipeline(mock_redis)
+        mock_repo = Mock()
+        mock_repo.fetch_weekly_voyages = AsyncMock(return_value=[])
+        service = CapacityService(redis=mock_redis, repo=mock_repo)
+        await service.apply_capacity_changes([json.dumps({
+            "origin": "china_main", "destination": "north_europe_main", "from": "2024-01-01", "to": "2024-01-01",
+        })])
+        replica_conn = AsyncMock()
+        # The replica may still miss writes committed in the last 7 seconds
+        replica_conn.max_staleness = 7.0
+
+        await service.get_capacity_rolling_average(replica_conn, date(2024, 1, 1), date(2024, 1, 7))
+
+        pipeline.setex.assert_not_called()
+        await service.get_capacity_rolling_average(AsyncMock(), date(2024, 1, 1), date(2024, 1, 7))
+        pipeline.setex.assert_called_once()
+
+    async def test_truncate_notification_purges_every_week(self):
+        mock_redis = AsyncMock()
+        _mock_pipeline(mock_redis)
+
+        async def scan_iter(**kwargs):
+            for key in (b"capacity:voyages:a:b:2024-01-01", b"capacity:voyages:a:c:2024-01-01"):
+                yield key
+
+        mock_redis.scan_iter = scan_iter
+        mock_redis.unlink.return_value = 2
+        service = CapacityService(redis=mock_redis, repo=Mock())
+        service.local.set("capacity:voyages:a:b:2024-01-01", _week([]), size=100)
+
+        await service.apply_capacity_changes(['{"all": true}'])
+
+        assert len(service.local) == 0
+        mock_redis.unlink.assert_awaited_once_with(
+            b"capacity:voyages:a:b:2024-01-01", b"capacity:voyages:a:c:2024-01-01"
+        )
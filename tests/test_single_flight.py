@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from app.cache.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+
+    async def test_concurrent_identical_calls_share_one_load(self):
+        flights = SingleFlight()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flights.do("k", load) for _ in range(5)))
+
+        assert results == [1] * 5
+        assert calls == 1
+        assert len(flights) == 0
+
+    async def test_errors_are_shared_with_waiters(self):
+        flights = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flights.do("k", load) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(r, ValueError) for r in results)
+
+    async def test_waiter_takes_over_when_leader_is_cancelled(self):
+        flights = SingleFlight()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "fresh"
+
+        leader = asyncio.create_task(flights.do("k", slow))
+        await started.wait()
+        waiter = asyncio.create_task(flights.do("k", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await waiter == "fresh"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
@@ -0,0 +1,32 @@
+import itertools
+
+from benchmarks.synthetic_sailings import generate, lane_shares, lanes, load_profile
+
+
+class TestSyntheticSailings:
+
+    def test_generation_is_deterministic_and_exact(self):
+        profile = load_profile()
+
+        first = list(generate(5000, lane_count=6, seed=3, profile=profile))
+        again = list(generate(5000, lane_count=6, seed=3, profile=profile))
+        other = list(itertools.islice(generate(5000, lane_count=6, seed=4, profile=profile), 100))
+
+        assert first == again
+        assert first[:100] != other
+        assert len(first) == 5000
+        assert {(r[0], r[1]) for r in first} == set(lanes(6))
+
+    def test_voyages_are_unique_per_port_pair(self):
+        rows = list(generate(20000, lane_count=3))
+
+        legs = {(r[0], r[1], r[2], r[3], r[4], r[5], r[6]) for r in rows}
+
+        assert len(legs) == len(rows)
+        assert rows[0][:2] == ("china_main", "north_europe_main")
+        assert rows[0][2] in load_profile().origin_ports
+
+    def test_lane_shares_follow_the_skew(self):
+        assert lane_shares(100, 4, 0) == [25, 25, 25, 25]
+        assert lane_shares(1100, 3, 1.0) == [600, 300, 200]
+        assert sum(lane_shares(1000, 7, 1.3)) == 1000
@@ -0,0 +1,120 @@
+import time
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app.cache.codec import EntryCodec
+from app.core.tracing import TracingConfig, close_tracing, init_tracing, tracing
+from app.middleware.instrumentation import InstrumentationMiddleware
+from app.services.capacity_service import CapacityService
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    init_tracing(TracingConfig(enabled=True, sample_ratio=1.0), exporter=exporter)
+    yield exporter
+    close_tracing()
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        with tracing.span("work"):
+            return {"item_id": item_id}
+
+    return app
+
+
+def _by_name(exporter: InMemorySpanExporter) -> dict:
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+class TestRequestSpans:
+
+    def test_server_span_is_named_after_route_and_tagged_with_request_id(self, exporter):
+        client = TestClient(_build_app())
+
+        client.get("/items/1", headers={"X-Request-ID": "abc-123"})
+
+        spans = _by_name(exporter)
+        server, work = spans["GET /items/{item_id}"], spans["work"]
+        assert server.attributes["http.route"] == "/items/{item_id}"
+        assert server.attributes["http.response.status_code"] == 200
+        assert server.attributes["request.id"] == work.attributes["request.id"] == "abc-123"
+        assert work.parent.span_id == server.context.span_id
+
+    def test_unsampled_requests_export_nothing_unless_the_caller_sampled_them(self, exporter):
+        exporter = InMemorySpanExporter()
+        init_tracing(TracingConfig(enabled=True, sample_ratio=0.0), exporter=exporter)
+        client = TestClient(_build_app())
+
+        client.get("/items/1")
+        assert exporter.get_finished_spans() == ()
+
+        client.get("/items/1", headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"})
+        assert {span.context.trace_id for span in exporter.get_finished_spans()} == {int(TRACE_ID, 16)}
+
+    def test_disabled_tracing_starts_no_spans(self):
+        assert not tracing.enabled
+        with tracing.span("work") as span:
+            assert not span.is_recording()
+
+
+@pytest.mark.asyncio
+class TestCapacitySpans:
+
+    async def test_cache_read_db_fetch_and_cache_write_are_separate_spans(self, exporter):
+        redis = AsyncMock()
+        redis.mget.return_value = [EntryCodec().encode({"t": time.time(), "d": 0.01, "v": []}), None]
+        pipeline = AsyncMock()
+        pipeline.__aenter__.return_value = pipeline
+        pipeline.setex, pipeline.publish = Mock(), Mock()
+        redis.pipeline = Mock(return_value=pipeline)
+        repo = Mock()
+        repo.fetch_weekly_voyages = AsyncMock(return_value=[{
+            "origin": "china_main",
+            "destination": "north_europe_main",
+            "week_start_date": date(2024, 1, 8),
+            "origin_at_utc": datetime(2024, 1, 10, 8, tzinfo=timezone.utc),
+            "offered_capacity_teu": 18000,
+            "superseded_at": None,
+        }])
+
+        service = CapacityService(redis=redis, repo=repo)
+        await service.get_capacity_rolling_average(AsyncMock(), date(2024, 1, 1), date(2024, 1, 14))
+
+        spans = _by_name(exporter)
+        parent = spans["capacity.rolling_average"]
+        assert parent.attributes["capacity.weeks"] == 2
+        assert spans["cache.read"].attributes["cache.hits"] == 1
+        assert spans["db.fetch"].attributes["capacity.weeks"] == 1
+        for name in ("cache.read", "db.fetch", "cache.write"):
+            assert spans[name].parent.span_id == parent.context.span_id
+
+
+class TestCapacityEndpointSpans:
+
+    def test_request_is_traced_down_to_the_query(self, app_client, exporter):
+        response = app_client.get(
+            "/capacity?date_from=2024-01-01&date_to=2024-03-31", headers={"X-Request-ID": "trace-me"}
+        )
+
+        spans = _by_name(exporter)
+        assert response.status_code == 200
+        assert {
+            "GET /capacity", "db.pool.acquire", "capacity.rolling_average", "db.fetch", "capacity.serialize"
+        } <= spans.keys()
+        assert len({span.context.trace_id for span in spans.values()}) == 1
+        assert all(span.attributes["request.id"] == "trace-me" for span in spans.values())
+        assert spans["db.query"].attributes["db.response.returned_rows"] > 0
+        assert spans["db.execute"].parent.span_id == spans["db.query"].context.span_id
@@ -0,0 +1,70 @@
+from datetime import date, datetime, timezone
+from app.services.weekly_capacity import (
+    NOT_SUPERSEDED,
+    compose_weekly_capacity,
+    compose_weekly_columns,
+    rolling_average,
+    to_epoch_us,
+    week_start,
+    weeks_in_range,
+)
+
+
+def _us(*args):
+    return to_epoch_us(datetime(*args, tzinfo=timezone.utc))
+
+
+class TestWeeklyCapacity:
+
+    def test_weeks_in_range_covers_partial_weeks(self):
+        assert week_start(date(2024, 1, 7)) == date(2024, 1, 1)
+        assert weeks_in_range(date(2024, 1, 3), date(2024, 1, 15)) == [
+            date(2024, 1, 1), date(2024, 1, 8), date(2024, 1, 15)
+        ]
+
+    def test_compose_filters_voyages_to_range_and_sums_per_week(self):
+        voyages = [
+            (_us(2024, 1, 3, 8), 10000, NOT_SUPERSEDED),
+            (_us(2024, 1, 4, 8), 5000, NOT_SUPERSEDED),
+            (_us(2024, 1, 10, 8), 12000, NOT_SUPERSEDED),
+        ]
+
+        full = compose_weekly_capacity(voyages, date(2024, 1, 1), date(2024, 1, 31))
+        assert [(r["week_start_date"], r["offered_capacity_teu"]) for r in full] == [
+            (date(2024, 1, 1), 15000), (date(2024, 1, 8), 12000)
+        ]
+
+        # Partial weeks only count voyages departing inside the range
+        cut = compose_weekly_capacity(voyages, date(2024, 1, 4), date(2024, 1, 8))
+        assert [(r["week_start_date"], r["offered_capacity_teu"]) for r in cut] == [
+            (date(2024, 1, 1), 5000)
+        ]
+
+    def test_superseded_sailings_count_only_in_ranges_ending_before_their_successor(self):
+        # A voyage sailing on 2024-01-03, revised to 2024-01-17
+        voyages = [
+            (_us(2024, 1, 3, 8), 10000, _us(2024, 1, 17, 8)),
+            (_us(2024, 1, 17, 8), 11000, NOT_SUPERSEDED),
+        ]
+
+        before = compose_weekly_capacity(voyages, date(2024, 1, 1), date(2024, 1, 14))
+        across = compose_weekly_capacity(voyages, date(2024, 1, 1), date(2024, 1, 31))
+
+        assert [(r["week_start_date"], r["offered_capacity_teu"]) for r in before] == [(date(2024, 1, 1), 10000)]
+        assert [(r["week_start_date"], r["offered_capacity_teu"]) for r in across] == [(date(2024, 1, 15), 11000)]
+
+    def test_rolling_average_rounds_half_away_from_zero(self):
+        rows = rolling_average([(date(2024, 1, 1), 1), (date(2024, 1, 8), 2)])
+        assert [r["offered_capacity_teu_4w_rolling_avg"] for r in rows] == [1, 2]
+        assert rows[1]["week_no"] == 2
+
+    def test_columns_match_rows(self):
+        week_us = 7 * 86_400_000_000
+        voyages = [(_us(2024, 1, 3, 8) + i * week_us, 1000 * (i % 3) + 1, NOT_SUPERSEDED) for i in range(9)]
+
+        rows = compose_weekly_capacity(voyages, date(2024, 1, 1), date(2024, 3, 31))
+        columns = compose_weekly_columns(voyages, date(2024, 1, 1), date(2024, 3, 31))
+
+        assert list(columns) == list(rows[0])
+        assert columns == {name: [r[name] for r in rows] for name in rows[0]}
+        assert compose_weekly_columns([], date(2024, 1, 1), date(2024, 1, 7))["week_no"] == []